@@ -0,0 +1,423 @@
+"""Набор замеров скорости: построитель, разбор G-кода и ответов, эмулятор, копирование настроек
+и полный обмен через WriterInterface с эмулятором на псевдотерминале.
+
+Каждый замер повторяется --rounds раз на одних и тех же данных. Сравнивается лучший повтор: посторонняя
+нагрузка на машину может замер только замедлить, поэтому лучший повтор устойчивее медианы. Результаты
+сохраняются в JSON (--output) и сравниваются с сохранёнными ранее (--baseline): замер, ставший медленнее
+больше чем на --tolerance, считается регрессией, и набор завершается с кодом 1.
+
+Запуск: python benchmarks/suite.py [--filter parse] [--output results.json] [--baseline benchmarks/baseline.json]
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / 'growbox')]
+
+from growbox.adapters.buff_emulator import BuffEmulator  # noqa: E402
+from sygrowbox.base_adapter import BaseAdapter  # noqa: E402
+from sygrowbox.gcode_builder import GrowboxGCodeBuilder, answer_to_int  # noqa: E402
+from sygrowbox.gcode_parser import GCodeLine, iter_gcode_lines, parse_answer, parse_gcode_line  # noqa: E402
+from sygrowbox.instrumentation import CommandMetrics  # noqa: E402
+
+EXAMPLES_PATH = ROOT_PATH / 'examples'
+# замер -> (функция подготовки, единица); функция подготовки возвращает замеряемую функцию,
+# а та - число выполненных операций
+BENCHMARKS = {}
+CALIBRATION = 'calibration'
+ANSWERS = (b'V:25.50\r\nok\r\n', b'B:1.00\r\nok\r\n', b'H:12.00\r\nM:30.00\r\nok\r\n', b'ok\r\n')
+
+
+def benchmark(name: str, unit: str = 'строк/с'):
+    def decorator(function):
+        BENCHMARKS[name] = (function, unit)
+        return function
+
+    return decorator
+
+
+class NullAdapter(BaseAdapter):
+    """Адаптер, который ничего не отправляет: замеряется только построитель"""
+    def write(self, data: bytes):
+        pass
+
+    def close(self):
+        pass
+
+
+def example_lines(scale: int) -> list[str]:
+    return (EXAMPLES_PATH / 'default.gcode').read_text().splitlines() * 1000 * scale
+
+
+def legacy_parse_gcode_line(gcode_line):
+    gcode_parts = gcode_line.split()
+    if not gcode_parts:
+        return GCodeLine(command='', cletter='', cvalue=0)
+
+    gcode_parts[0] = gcode_parts[0].upper()
+    gcode_line = GCodeLine(command=gcode_parts[0], cletter=gcode_parts[0][0], cvalue=int(gcode_parts[0][1:]))
+    for part in gcode_parts[1:]:
+        gcode_line.params[part[0].upper()] = int(part[1:])
+
+    return gcode_line
+
+
+def parse_each(parse, items) -> int:
+    for item in items:
+        parse(item)
+
+    return len(items)
+
+
+def write_profile(growbox: GrowboxGCodeBuilder, count_repeats: int) -> int:
+    """Записывает настройки всех автоматик count_repeats раз; возвращает число команд"""
+    count_commands = 0
+    for repeat in range(count_repeats):
+        for actuator in growbox.actuators.values():
+            actuator.set(repeat % 256)
+            for period in growbox.cycle_hard.PERIODS:
+                growbox.cycle_hard.set_value(actuator, period, 255)
+                growbox.cycle_hard.set_duration(actuator, period, 720)
+
+            for period in growbox.cycle_soft.PERIODS:
+                growbox.cycle_soft.set_value(actuator, period, 128)
+                growbox.cycle_soft.set_duration(actuator, period, 360)
+
+            growbox.climate_control.set_min(actuator, 60)
+            growbox.climate_control.set_max(actuator, 70)
+            count_commands += 1 + 2 * len(growbox.cycle_hard.PERIODS) + 2 * len(growbox.cycle_soft.PERIODS) + 2
+
+    return count_commands
+
+
+@benchmark(CALIBRATION, 'операций/с')
+def bench_calibration(scale):
+    """Чистый Python без кода sygrowbox: показывает, насколько быстрее или медленнее сама машина"""
+    keys = [f'E{index % 300} A{index % 3}' for index in range(300000 * scale)]
+
+    def run():
+        counts = {}
+        for key in keys:
+            counts[key] = counts.get(key, 0) + len(key.split())
+
+        return len(keys)
+
+    return run
+
+
+@benchmark('builder.write', 'команд/с')
+def bench_builder_write(scale):
+    growbox = GrowboxGCodeBuilder(NullAdapter())
+    return lambda: write_profile(growbox, 1000 * scale)
+
+
+@benchmark('builder.batch', 'команд/с')
+def bench_builder_batch(scale):
+    growbox = GrowboxGCodeBuilder(NullAdapter())
+
+    def run():
+        with growbox.batch():
+            return write_profile(growbox, 1000 * scale)
+
+    return run
+
+
+@benchmark('parser.legacy_parse_gcode_line')
+def bench_legacy_parse(scale):
+    gcode_lines = example_lines(scale)
+    return lambda: parse_each(legacy_parse_gcode_line, gcode_lines)
+
+
+@benchmark('parser.parse_gcode_line')
+def bench_parse_gcode_line(scale):
+    gcode_lines = example_lines(scale)
+    return lambda: parse_each(parse_gcode_line, gcode_lines)
+
+
+@benchmark('parser.iter_gcode_lines')
+def bench_iter_gcode_lines(scale):
+    gcode_lines = example_lines(scale)
+    buffer = '\n'.join(gcode_lines) + '\n'
+    return lambda: len(list(iter_gcode_lines(buffer)))
+
+
+@benchmark('parser.parse_answer', 'ответов/с')
+def bench_parse_answer(scale):
+    answers = ANSWERS * 10000 * scale
+    return lambda: parse_each(parse_answer, answers)
+
+
+@benchmark('emulator.write')
+def bench_emulator_write(scale):
+    gcode_lines = example_lines(scale)
+    data = ('\n'.join(gcode_lines) + '\n').encode('utf-8')
+
+    def run():
+        BuffEmulator().write(data)
+        return len(gcode_lines)
+
+    return run
+
+
+@benchmark('emulator.load_gcode')
+def bench_emulator_load_gcode(scale):
+    gcode_lines = example_lines(scale)
+
+    def run():
+        BuffEmulator().load_gcode(gcode_lines)
+        return len(gcode_lines)
+
+    return run
+
+
+@benchmark('copy_growbox_settings', 'копий/с')
+def bench_copy_growbox_settings(scale):
+    # функция GUI: без PyQt6 замер пропускается
+    from growbox.gui import copy_growbox_settings
+
+    emulator_from = BuffEmulator()
+    emulator_from.set_buff(json.loads((EXAMPLES_PATH / 'default.json').read_text()))
+    growbox_from = GrowboxGCodeBuilder(emulator_from, need_wait_answer=True)
+    count_copies = 20 * scale
+
+    def run():
+        for _ in range(count_copies):
+            copy_growbox_settings(growbox_from, GrowboxGCodeBuilder(BuffEmulator(), need_wait_answer=True))
+
+        return count_copies
+
+    return run
+
+
+@benchmark('round_trip.emulator', 'команд/с')
+def bench_round_trip_emulator(scale):
+    """Чтение с ожиданием ответа через WriterInterface прямо из эмулятора: накладные расходы построителя"""
+    growbox = GrowboxGCodeBuilder(BuffEmulator(), need_wait_answer=True)
+    count_commands = 5000 * scale
+
+    def run():
+        for index in range(count_commands):
+            growbox.output.write_and_parse(f'E1 A{index % 3}', answer_to_int)
+
+        return count_commands
+
+    return run
+
+
+@benchmark('round_trip.emulator_metrics', 'команд/с')
+def bench_round_trip_emulator_metrics(scale):
+    """То же с CommandMetrics: разница с round_trip.emulator - цена замеров"""
+    growbox = GrowboxGCodeBuilder(BuffEmulator(), need_wait_answer=True, metrics=CommandMetrics())
+    count_commands = 5000 * scale
+
+    def run():
+        for index in range(count_commands):
+            growbox.output.write_and_parse(f'E1 A{index % 3}', answer_to_int)
+
+        return count_commands
+
+    return run
+
+
+def _pty_growbox(wire_kwargs=None):
+    """Построитель на SerialAdapter, подключённом к эмулятору на псевдотерминале, и функция, закрывающая оба"""
+    from growbox.adapters.serial_adapter import SerialAdapter
+    from growbox.emulator_server import EmulatedBox, PtyEndpoint, Wire
+
+    endpoint = PtyEndpoint(EmulatedBox(BuffEmulator(), Wire(**(wire_kwargs or {}))))
+    endpoint.start()
+    growbox = GrowboxGCodeBuilder(
+        SerialAdapter(endpoint.path, 9600, 2, 2),
+        need_wait_answer=True,
+        rx_buffer_size=SerialAdapter.RX_BUFFER_SIZE,
+    )
+
+    def close():
+        growbox.output.output.close()
+        endpoint.close()
+
+    return growbox, close
+
+
+@benchmark('round_trip.pty', 'команд/с')
+def bench_round_trip_pty(scale):
+    """Чтение с ожиданием ответа через SerialAdapter и псевдотерминал: по команде за раз"""
+    growbox, close = _pty_growbox()
+    count_commands = 1000 * scale
+
+    def run():
+        for index in range(count_commands):
+            growbox.output.write_and_parse(f'E1 A{index % 3}', answer_to_int)
+
+        return count_commands
+
+    run.close = close
+    return run
+
+
+@benchmark('round_trip.pty_stream', 'команд/с')
+def bench_round_trip_pty_stream(scale):
+    """Поток команд через псевдотерминал с ограничением приёмного буфера гроубокса (write_many)"""
+    growbox, close = _pty_growbox()
+    gcode_lines = example_lines(scale)[:2000 * scale]
+
+    def run():
+        return len(growbox.output.write_many(gcode_lines))
+
+    run.close = close
+    return run
+
+
+@benchmark('round_trip.pty_9600', 'команд/с')
+def bench_round_trip_pty_9600(scale):
+    """Тот же поток на скорости 9600 бод: упирается в провод, показывает, насколько он загружен"""
+    growbox, close = _pty_growbox({'baudrate': 9600})
+    gcode_lines = example_lines(scale)[:50 * scale]
+
+    def run():
+        return len(growbox.output.write_many(gcode_lines))
+
+    run.close = close
+    return run
+
+
+def measure(setup, scale: int, rounds: int) -> list[float]:
+    """Скорость (операций в секунду) в каждом из rounds повторов; первый прогон - разогрев, не учитывается"""
+    run = setup(scale)
+    try:
+        run()
+        rates = []
+        for _ in range(rounds):
+            time_start = time.perf_counter()
+            count = run()
+            rates.append(count / (time.perf_counter() - time_start))
+    finally:
+        if hasattr(run, 'close'):
+            run.close()
+
+    return rates
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_PATH, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+
+def run_suite(names, scale: int = 1, rounds: int = 7, callback_result=None) -> dict:
+    results = {}
+    for name in names:
+        setup, unit = BENCHMARKS[name]
+        try:
+            rates = measure(setup, scale, rounds)
+        except Exception as error:
+            # например, нет псевдотерминалов или pyserial: замер пропускается, остальные выполняются
+            results[name] = {'unit': unit, 'skipped': f'{type(error).__name__}: {error}'}
+        else:
+            results[name] = {
+                'unit': unit,
+                'median': statistics.median(rates),
+                'best': max(rates),
+                'stdev': statistics.stdev(rates) if len(rates) > 1 else 0,
+                'rates': rates,
+            }
+
+        if callback_result:
+            callback_result(name, results[name])
+
+    return results
+
+
+def compare(results: dict, baseline: dict, normalize: bool = True) -> dict[str, float]:
+    """Относительное изменение лучшего повтора к базовому: `{замер: изменение}`, -0.2 - стало на 20 % медленнее.
+
+    Если normalize и в обоих результатах есть замер CALIBRATION, изменения делятся на изменение скорости
+    самой машины: результаты, снятые на загруженной или другой машине, остаются сравнимыми.
+    """
+    def ratio(name):
+        result, base_result = results.get(name, {}), baseline.get(name, {})
+        if 'best' in result and base_result.get('best'):
+            return result['best'] / base_result['best']
+
+        return None
+
+    machine_ratio = ratio(CALIBRATION) if normalize else None
+    changes = {}
+    for name in results:
+        name_ratio = ratio(name)
+        if name_ratio is not None and name != CALIBRATION:
+            changes[name] = name_ratio / (machine_ratio or 1) - 1
+
+    return changes
+
+
+def run():
+    parser = argparse.ArgumentParser(description='Замеры скорости sygrowbox')
+    parser.add_argument('--filter', action='append', help='выполнять только замеры, в имени которых есть подстрока')
+    parser.add_argument('--list', action='store_true', help='вывести имена замеров')
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--scale', type=int, default=1, help='во сколько раз увеличить объём данных замеров')
+    parser.add_argument('--output', type=Path, help='сохранить результаты в JSON')
+    parser.add_argument('--baseline', type=Path, help='JSON с результатами, с которыми сравнивать')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='допустимое замедление, доля')
+    parser.add_argument('--no-normalize', action='store_true', help='не делить изменения на изменение замера calibration')
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.filter or any(part in name for part in args.filter)]
+    if args.list:
+        print('\n'.join(names))
+        return
+
+    normalize = not args.no_normalize
+    if (args.baseline or args.output) and CALIBRATION not in names:
+        # без замера самой машины результаты нельзя будет нормировать
+        names.insert(0, CALIBRATION)
+
+    baseline = json.loads(args.baseline.read_text())['results'] if args.baseline else {}
+    results = {}
+
+    def print_result(name, result):
+        results[name] = result
+        if 'skipped' in result:
+            print(f'{name:<32} пропущен: {result["skipped"]}')
+            return
+
+        line = f'{name:<32} {result["best"]:>14,.0f} {result["unit"]:<10} ±{result["stdev"] / result["median"]:.0%}'
+        change = compare(results, baseline, normalize).get(name)
+        if change is not None:
+            line += f'  {change:+.1%}' + ('  РЕГРЕССИЯ' if change < -args.tolerance else '')
+
+        print(line)
+
+    run_suite(names, args.scale, args.rounds, print_result)
+    if args.output:
+        data = {'environment': environment(), 'scale': args.scale, 'rounds': args.rounds, 'results': results}
+        args.output.write_text(json.dumps(data, indent=2, ensure_ascii=False) + '\n')
+
+    changes = compare(results, baseline, normalize)
+    regressions = [name for name, change in changes.items() if change < -args.tolerance]
+    if regressions:
+        print(f'регрессии: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    run()
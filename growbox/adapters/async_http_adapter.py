@@ -0,0 +1,93 @@
+import asyncio
+import json
+from urllib.parse import urlencode, urlsplit
+
+from growbox.sygrowbox.base_adapter import AsyncBaseAdapter
+
+
+class AsyncHttpAdapter(AsyncBaseAdapter):
+    """Асинхронный HttpAdapter: запросы к `api.c` гроубокса через одно keep-alive соединение"""
+    def __init__(self, url, timeout_read: int, timeout_write):
+        url_parts = urlsplit(url)
+        self.host = url_parts.hostname
+        # https - через TLS; путь в url сохраняется, как у HttpAdapter: `http://host:8080/3` -> `/3/api.c`
+        self.is_tls = url_parts.scheme == 'https'
+        self.port = url_parts.port or (443 if self.is_tls else 80)
+        self.netloc = url_parts.netloc
+        self.path = url_parts.path.rstrip('/')
+        self.url = url
+        self.timeout_read = int(timeout_read)
+        self.timeout_write = timeout_write
+        self.timeout = None
+        self.response_data = bytearray()
+        self.reader = None
+        self.writer = None
+
+    async def _connect(self):
+        if self.writer is None or self.writer.is_closing():
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.is_tls or None)
+
+    async def _read_response(self) -> tuple[int, bytes]:
+        status_line = await self.reader.readline()
+        status_code = int(status_line.split()[1])
+        headers = {}
+        while True:
+            header_line = await self.reader.readline()
+            if header_line in (b'\r\n', b'\n', b''):
+                break
+
+            name, _, value = header_line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+
+        if headers.get('connection', '').lower() == 'close' or 'content-length' not in headers:
+            self._disconnect()
+
+        return status_code, body
+
+    async def _post(self, str_data: str) -> tuple[int, bytes]:
+        params = {'action': 'send_to_serial', 'string_data': str_data, 'timeout_read': self.timeout_read}
+        request = (
+            f'POST {self.path}/api.c?{urlencode(params)} HTTP/1.1\r\n'
+            f'Host: {self.netloc}\r\n'
+            'Connection: keep-alive\r\n'
+            'Content-Length: 0\r\n'
+            '\r\n'
+        )
+        await self._connect()
+        self.writer.write(request.encode('latin-1'))
+        await self.writer.drain()
+        return await self._read_response()
+
+    async def write(self, data: bytes):
+        str_data = data.decode('utf-8')
+        try:
+            # как у HttpAdapter: гроубокс может ждать ответа timeout_read мс, и только потом отвечает
+            deadline = self.timeout_read / 1000 + self.timeout_write
+            status_code, body = await asyncio.wait_for(self._post(str_data), deadline)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as error:
+            self._disconnect()
+            print('http error:', repr(error), 'gcode:', str_data)
+        else:
+            if status_code == 200:
+                string_response_data = json.loads(body)['data']['string_response_data']
+                self.response_data += string_response_data.encode('utf-8')
+
+    async def read_available(self, length: int, timeout: float | None = None) -> bytes:
+        # ответ целиком приходит вместе с ответом на запрос в write()
+        data = bytes(self.response_data[:length])
+        del self.response_data[:length]
+        return data
+
+    def _disconnect(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.reader = None
+
+    def close(self):
+        self._disconnect()
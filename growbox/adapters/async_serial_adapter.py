@@ -0,0 +1,76 @@
+import asyncio
+import os
+
+import serial
+
+from growbox.sygrowbox.base_adapter import AsyncBaseAdapter
+
+
+class AsyncSerialAdapter(AsyncBaseAdapter):
+    """Неблокирующий последовательный порт на цикле событий asyncio (только POSIX).
+
+    Подходит и для псевдотерминала (pty), поэтому эмулятор можно подключить вместо устройства.
+    Создавать нужно внутри работающего цикла событий.
+    """
+    RX_BUFFER_SIZE = 64
+
+    def __init__(self, port: str, baudrate: int, timeout_read: float, chunk_size: int = 4096):
+        self.serial = serial.Serial(port, baudrate=baudrate, timeout=0, write_timeout=0)
+        self.fd = self.serial.fileno()
+        self.timeout = timeout_read
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.data_received = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, self.chunk_size)
+        except BlockingIOError:
+            return
+        except OSError:
+            # другая сторона pty закрыта
+            data = b''
+
+        if data:
+            self.buffer += data
+            self.data_received.set()
+        else:
+            self.loop.remove_reader(self.fd)
+
+    async def _wait_writable(self):
+        future = self.loop.create_future()
+        self.loop.add_writer(self.fd, future.set_result, None)
+        try:
+            await future
+        finally:
+            self.loop.remove_writer(self.fd)
+
+    async def write(self, data: bytes):
+        data = memoryview(data)
+        while data:
+            try:
+                count_written = os.write(self.fd, data)
+            except BlockingIOError:
+                count_written = 0
+
+            data = data[count_written:]
+            if data:
+                await self._wait_writable()
+
+    async def read_available(self, length: int, timeout: float | None = None) -> bytes:
+        if not self.buffer:
+            self.data_received.clear()
+            try:
+                await asyncio.wait_for(self.data_received.wait(), self.timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                return b''
+
+        data = bytes(self.buffer[:length])
+        del self.buffer[:length]
+        return data
+
+    def close(self):
+        self.loop.remove_reader(self.fd)
+        self.serial.close()
@@ -1,24 +1,33 @@
 from sygrowbox.gcode_builder import AutoCycleHard, AutoCycleSoft, AutoClimateControl, AutoTimer
 from sygrowbox.base_emulator import BaseEmulator
+from sygrowbox.settings import SETTINGS_BY_SETTER
 
 
 class BuffEmulator(BaseEmulator):
+    # команды записи настроек и E8 (установка времени): команды чтения состояние не меняют
+    STATE_COMMANDS = frozenset([*SETTINGS_BY_SETTER, 'E8'])
+
     def __init__(self):
         super().__init__()
-        self.buff = {}
+        self.set_buff({})
+        self.mode = 'w'
+        # показания датчиков {код датчика: значение} - отдаются командой E2, без показания отвечаем NAN
+        self.sensor_values = {}
+        # текущие периоды циклических автоматик {(код автоматики, устройство): (период, минут прошло)}
+        self.currents = {}
+
+    def set_buff(self, buff: dict):
+        """Заменяет состояние эмулятора, например, на загруженное из JSON"""
+        self.buff = buff
         self.a_cycle_hard = self.buff.setdefault(str(AutoCycleHard.CODE), {})
         self.a_cycle_soft = self.buff.setdefault(str(AutoCycleSoft.CODE), {})
         self.a_climate_control = self.buff.setdefault(str(AutoClimateControl.CODE), {})
         self.a_timer = self.buff.setdefault(str(AutoTimer.CODE), {})
         self.time = self.buff.setdefault('time', {})
-        self.mode = 'w'
 
     def get_default_time_bytes(self):
         return [0] * 12
 
-    def get_default_time_flags(self):
-        return [[0] * 4] * 24
-
     ## Датчики и исполнительные устройства, общие команды
 
     def e0(self, g):
@@ -28,7 +37,11 @@ class BuffEmulator(BaseEmulator):
         self.comment('V', self.buff.get('actuators', {}).get(str(g['A']), {}).get('value', 255))
 
     def e2(self, g):
-        pass
+        value = self.sensor_values.get(g['S'])
+        if value is None:
+            self.println('V:NAN')
+        else:
+            self.comment('V', value)
 
     def e3(self, g):
         if 'R' in g and 'A' in g:
@@ -48,7 +61,9 @@ class BuffEmulator(BaseEmulator):
         self.time['time'] = (g['H'], g['M'])
 
     def e81(self, g):
-        pass
+        hours, minutes = self.time.get('time', (0, 0))
+        self.comment('H', hours)
+        self.comment('M', minutes)
 
     def e9(self, g):
         self.time['source'] = g['T']
@@ -66,7 +81,9 @@ class BuffEmulator(BaseEmulator):
         self.comment('D', int(period_json.get('duration', '0')))
 
     def e102(self, g):
-        pass
+        period, minutes = self.currents.get((AutoCycleHard.CODE, g['A']), (AutoCycleHard.PERIODS[0], 0))
+        self.comment('B', period)
+        self.comment('D', minutes)
 
     def e103(self, g):
         self.a_cycle_hard.setdefault(str(g['A']), {}).setdefault(str(g['B']), {})['value'] = str(g['V'])
@@ -85,7 +102,9 @@ class BuffEmulator(BaseEmulator):
         self.comment('D', int(period_json.get('duration', '0')))
 
     def e152(self, g):
-        pass
+        period, minutes = self.currents.get((AutoCycleSoft.CODE, g['A']), (AutoCycleSoft.PERIODS[0], 0))
+        self.comment('P', period)
+        self.comment('D', minutes)
 
     def e153(self, g):
         self.a_cycle_soft.setdefault(str(g['A']), {}).setdefault(str(g['P']), {})['value'] = str(g['V'])
@@ -116,45 +135,40 @@ class BuffEmulator(BaseEmulator):
 
     ## Автоматика по таймеру
 
-    def e251(self, g):
-        actuator_data = self.a_timer.setdefault(str(g['A']), {})
+    def get_timer_bytes(self, actuator_code):
+        actuator_data = self.a_timer.setdefault(str(actuator_code), {})
         bytes_list = actuator_data.get('bytes')
         if not bytes_list:
             bytes_list = self.get_default_time_bytes()
             actuator_data['bytes'] = bytes_list
 
-        bytes_list[g['B']] = g['V']
+        return bytes_list
 
-    def e2511(self, g):
-        actuator_data = self.a_timer.setdefault(str(g['A']), {})
-        bytes_list = actuator_data.get('bytes')
-        if not bytes_list:
-            bytes_list = self.get_default_time_bytes()
-            actuator_data['bytes'] = bytes_list
+    def set_timer_bit(self, actuator_code, hour_index, minute_index, value):
+        bytes_list = self.get_timer_bytes(actuator_code)
+        index_bit = AutoTimer.PARTS_PER_HOUR * hour_index + minute_index
+        mask = 1 << (7 - index_bit % 8)
+        if value:
+            bytes_list[index_bit // 8] |= mask
+        else:
+            bytes_list[index_bit // 8] &= ~mask
+
+    def e251(self, g):
+        self.get_timer_bytes(g['A'])[g['B']] = g['V']
 
-        for byte_value in bytes_list:
+    def e2511(self, g):
+        for byte_value in self.get_timer_bytes(g['A']):
             self.comment('V', byte_value)
 
+    # флаги хранятся в тех же байтах, что читает и пишет E251/E2511
     def e252(self, g):
-        actuator_data = self.a_timer.setdefault(str(g['A']), {})
-        flags_list = actuator_data.get('flags')
-        if not flags_list:
-            flags_list = self.get_default_time_flags()
-            actuator_data['flags'] = flags_list
-
-        if 'M' in g:
-            flags_list[g['H']][g['M']] = g['B']
-        else:
-            flags_list[g['H']] = [g['B']] * 4
+        minute_indexes = [g['M']] if 'M' in g else range(AutoTimer.PARTS_PER_HOUR)
+        for minute_index in minute_indexes:
+            self.set_timer_bit(g['A'], g['H'], minute_index, g['B'])
 
     def e2521(self, g):
-        actuator_data = self.a_timer.setdefault(str(g['A']), {})
-        flags_list = actuator_data.get('flags')
-        if not flags_list:
-            flags_list = self.get_default_time_flags()
-            actuator_data['flags'] = flags_list
-
-        self.comment('B', flags_list[g['H']][g['M']])
+        index_bit = AutoTimer.PARTS_PER_HOUR * g['H'] + g['M']
+        self.comment('B', self.get_timer_bytes(g['A'])[index_bit // 8] >> (7 - index_bit % 8) & 1)
 
 #     gcode = parse_gcode_line(gcode_line)
 #     # from gcode_builder import commands
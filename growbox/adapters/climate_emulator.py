@@ -0,0 +1,179 @@
+import threading
+
+import numpy as np
+
+from sygrowbox.gcode_builder import GrowboxGCodeBuilder
+from growbox.adapters.simulator import AutomationSimulator
+
+SECONDS_PER_MINUTE = 60
+# устройства, на которые откликается модель: столбцы ClimateModel.outputs
+MODEL_ACTUATORS = (GrowboxGCodeBuilder.A_HUMID, GrowboxGCodeBuilder.A_EXTRACTOR, GrowboxGCodeBuilder.A_WHITE_LIGHT)
+SENSOR_TEMPERATURE = 0
+SENSOR_HUMIDITY = 1
+
+
+class ClimateModel:
+    """Упрощённая модель климата count_boxes виртуальных гроубоксов, которые шагают вместе массивами NumPy.
+
+    Бокс обменивается воздухом с комнатой: медленно через щели (leak_rate), быстро через вытяжку (extract_rate
+    при полной мощности). Свет нагревает воздух, увлажнитель поднимает влажность, а нагрев при той же влажности
+    воздуха снижает относительную влажность на HUMIDITY_PER_DEGREE процентов на градус. Уравнения решаются
+    точно для постоянных в течение шага значений устройств, поэтому шаг может быть любой длины.
+
+    Параметры - массивы по боксам: при spread > 0 боксы немного различаются, как настоящие. Каждому боксу
+    соответствует адаптер `emulators[index]`, на котором работают и GrowboxGCodeBuilder, и автоматики.
+    """
+    LEAK_RATE = 1 / 3600  # доля воздуха, обменивающаяся за секунду без вытяжки
+    EXTRACT_RATE = 1 / 300
+    LIGHT_HEAT = 8 / 3600  # °C в секунду при полном свете: без вытяжки бокс нагревается на 8 °C
+    HUMID_RATE = 60 / 3600  # % в секунду при полной мощности увлажнителя: без вытяжки влажность поднимается на 60 %
+    HUMIDITY_PER_DEGREE = 2
+    TEMPERATURE_NOISE = 0.1  # разброс показаний датчиков
+    HUMIDITY_NOISE = 0.5
+
+    def __init__(
+            self,
+            count_boxes: int,
+            room_temperature: float = 22,
+            room_humidity: float = 40,
+            spread: float = 0.1,
+            seed=None,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.room_temperature = room_temperature
+        self.room_humidity = room_humidity
+
+        def parameter(value):
+            return value * self.rng.uniform(1 - spread, 1 + spread, count_boxes)
+
+        self.leak_rate = parameter(self.LEAK_RATE)
+        self.extract_rate = parameter(self.EXTRACT_RATE)
+        self.light_heat = parameter(self.LIGHT_HEAT)
+        self.humid_rate = parameter(self.HUMID_RATE)
+
+        self.temperature = np.full(count_boxes, float(room_temperature))
+        self.humidity = np.full(count_boxes, float(room_humidity))
+        # значения устройств MODEL_ACTUATORS, 0..255
+        self.outputs = np.zeros((count_boxes, len(MODEL_ACTUATORS)))
+        # показания датчиков с шумом {код датчика: массив по боксам}, обновляются на каждом шаге
+        self.readings = {}
+        self.update_readings()
+
+        # модель и эмуляторы меняются только под этой блокировкой: боксы можно опрашивать из других потоков
+        self.lock = threading.RLock()
+        self.emulators = [ClimateEmulator(self, index) for index in range(count_boxes)]
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def __len__(self):
+        return self.temperature.size
+
+    def update_readings(self):
+        size = self.temperature.size
+        self.readings = {
+            SENSOR_TEMPERATURE: self.temperature + self.rng.normal(0, self.TEMPERATURE_NOISE, size),
+            SENSOR_HUMIDITY: np.clip(self.humidity + self.rng.normal(0, self.HUMIDITY_NOISE, size), 0, 100),
+        }
+
+    def step(self, seconds: float = SECONDS_PER_MINUTE):
+        """Переводит климат всех боксов на seconds вперёд при текущих значениях устройств"""
+        humid, extractor, light = (self.outputs / 255).T
+        exchange_rate = self.leak_rate + self.extract_rate * extractor
+        decay = np.exp(-exchange_rate * seconds)
+
+        temperature_balance = self.room_temperature + self.light_heat * light / exchange_rate
+        temperature = temperature_balance + (self.temperature - temperature_balance) * decay
+
+        humidity_balance = (
+            self.room_humidity
+            + self.humid_rate * humid / exchange_rate
+            - self.HUMIDITY_PER_DEGREE * (temperature - self.room_temperature)
+        )
+        humidity = humidity_balance + (self.humidity - humidity_balance) * decay
+
+        self.temperature = temperature
+        self.humidity = np.clip(humidity, 0, 100)
+        self.update_readings()
+
+    def advance(self, minutes: int = 1):
+        """Поминутно шагает моделью и выполняет автоматики всех боксов по их виртуальным часам"""
+        for _ in range(minutes):
+            with self.lock:
+                self.step(SECONDS_PER_MINUTE)
+                for emulator in self.emulators:
+                    emulator.step()
+
+    def run(self, speed: float = 1):
+        """Шагает в реальном времени, ускоренном в speed раз, пока не вызван stop()"""
+        while not self.stop_event.wait(SECONDS_PER_MINUTE / speed):
+            self.advance()
+
+    def start(self, speed: float = 1):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(speed,), name='climate-model', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+            self.thread = None
+
+
+class ClimateEmulator(AutomationSimulator):
+    """Адаптер одного бокса ClimateModel: E2 отдаёт показания модели, значения устройств уходят в модель"""
+    def __init__(self, model: ClimateModel, index: int):
+        super().__init__(sensors=self.read_sensors)
+        self.model = model
+        self.index = index
+        # настройки автоматик, прочитанные для step(); сбрасываются любой командой
+        self.automations = None
+
+    def read_sensors(self, simulator=None) -> dict[int, float]:
+        return {code: float(values[self.index]) for code, values in self.model.readings.items()}
+
+    def push_outputs(self):
+        actuators_buff = self.buff.get('actuators', {})
+        row = self.model.outputs[self.index]
+        for column, actuator in enumerate(MODEL_ACTUATORS):
+            row[column] = int(actuators_buff.get(str(actuator), {}).get('value', 0))
+
+    def step(self, cycles: dict | None = None, turns: dict | None = None):
+        if cycles is None and turns is None:
+            if self.automations is None:
+                self.automations = self.read_automations()
+
+            cycles, turns = self.automations
+
+        if any(turns.values()):
+            super().step(cycles, turns)
+            self.push_outputs()
+        else:
+            # автоматики выключены: значения устройств меняются только командой E0
+            self.tick_clock()
+
+    def e0(self, g):
+        super().e0(g)
+        self.push_outputs()
+
+    def e2(self, g):
+        self.sensor_values.update(self.read_sensors())
+        super().e2(g)
+
+    def write(self, data: bytes):
+        with self.model.lock:
+            self.automations = None
+            super().write(data)
+
+    def load_gcode(self, gcode_lines) -> int:
+        with self.model.lock:
+            self.automations = None
+            return super().load_gcode(gcode_lines)
+
+    def set_buff(self, buff: dict):
+        self.automations = None
+        super().set_buff(buff)
+
+    def read(self, length):
+        with self.model.lock:
+            return super().read(length)
@@ -1,20 +1,62 @@
 import requests
+from requests.adapters import HTTPAdapter
 
 from growbox.sygrowbox.base_adapter import BaseAdapter
 
 
 class HttpAdapter(BaseAdapter):
-    def __init__(self, url, timeout_read: int, timeout_write):
+    """Адаптер к `api.c` гроубокса.
+
+    Соединения переиспользуются (keep-alive). Записанные строки копятся и уходят одним запросом
+    `send_to_serial` при чтении ответа, вызове flush() или при достижении max_lines_per_request.
+    """
+    def __init__(
+            self,
+            url,
+            timeout_read: int,
+            timeout_write,
+            timeout_connect=None,
+            pool_connections: int = 1,
+            pool_maxsize: int = 1,
+            max_lines_per_request: int = 32,
+    ):
         self.url = url
         self.response_data = ''
+        self.pending_data = []
+        self.count_pending_lines = 0
         self.timeout_read = int(timeout_read)
+        # таймаут, запрошенный на время команды (WriterInterface._timeout), мс; меньше настроенного не бывает
+        self.requested_timeout_read = None
         self.timeout_write = timeout_write
+        self.timeout_connect = timeout_connect or timeout_write
+        self.max_lines_per_request = max_lines_per_request
+        self.session = requests.Session()
+        http_adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', http_adapter)
+        self.session.mount('https://', http_adapter)
 
-    def write(self, data: bytes):
-        str_data = data.decode('utf-8')
-        params = {'action': 'send_to_serial', 'string_data': str_data, 'timeout_read': self.timeout_read}
+    @property
+    def timeout(self):
+        """Сколько гроубокс ждёт ответ на отправленные строки, в секундах"""
+        return max(self.timeout_read, self.requested_timeout_read or 0) / 1000
+
+    @timeout.setter
+    def timeout(self, value):
+        # команда может попросить ждать дольше настроенного timeout_read, но не меньше
+        self.requested_timeout_read = int(value * 1000)  # timeout_read - only integer, not float
+
+    def flush(self):
+        if not self.pending_data:
+            return
+
+        str_data = ''.join(self.pending_data)
+        self.pending_data = []
+        self.count_pending_lines = 0
+        params = {'action': 'send_to_serial', 'string_data': str_data, 'timeout_read': int(self.timeout * 1000)}
+        # запрос длится не меньше, чем гроубокс ждёт ответ
+        timeout = (self.timeout_connect, self.timeout + self.timeout_write)
         try:
-            response = requests.post(f'{self.url}/api.c', params=params, timeout=self.timeout_write)
+            response = self.session.post(f'{self.url}/api.c', params=params, timeout=timeout)
         except requests.ReadTimeout as error:
             print('read:', str(error), 'gcode:', str_data)
         except requests.ConnectTimeout as error:
@@ -26,10 +68,21 @@ class HttpAdapter(BaseAdapter):
                 string_response_data = response.json()['data']['string_response_data']
                 self.response_data = f'{self.response_data}{string_response_data}'
 
+    def write(self, data: bytes):
+        self.pending_data.append(data.decode('utf-8'))
+        self.count_pending_lines += data.count(b'\n')
+        if self.count_pending_lines >= self.max_lines_per_request:
+            self.flush()
+
     def read(self, length):
+        self.flush()
         data_to_return = self.response_data[:length]
         self.response_data = self.response_data[length:]
         return data_to_return.encode('utf-8')
 
+    def read_available(self, length):
+        return self.read(length)
+
     def close(self):
-        pass
+        self.flush()
+        self.session.close()
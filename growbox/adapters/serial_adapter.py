@@ -4,6 +4,8 @@ from growbox.sygrowbox.base_adapter import BaseAdapter
 
 
 class SerialAdapter(BaseAdapter):
+    RX_BUFFER_SIZE = 64  # размер приёмного буфера Serial в Arduino
+
     def __init__(self, port: str, baudrate: int, timeout_read: int, timeout_write: int):
         self.serial = serial.Serial(
             port,
@@ -15,8 +17,19 @@ class SerialAdapter(BaseAdapter):
     def write(self, data: bytes):
         self.serial.write(data)
     
+    @property
+    def timeout(self):
+        return self.serial.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.serial.timeout = value
+
     def read(self, length: int):
         return self.serial.read(length)
 
+    def read_available(self, length: int):
+        return self.serial.read(min(max(self.serial.in_waiting, 1), length))
+
     def close(self):
         self.serial.close()
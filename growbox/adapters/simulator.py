@@ -0,0 +1,196 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from sygrowbox.gcode_builder import AutoClimateControl, AutoCycleHard, AutoCycleSoft, AutoTimer
+from growbox.adapters.buff_emulator import BuffEmulator
+
+MINUTES_PER_DAY = 24 * 60
+VALUE_ON = 255
+VALUE_OFF = 0
+
+
+@dataclass()
+class SimulationResult:
+    """Значения исполнительных устройств и показания датчиков поминутно, начиная с минуты start виртуальных часов"""
+    start: int
+    outputs: dict[int, np.ndarray] = field(default_factory=dict)
+    sensors: dict[int, np.ndarray] = field(default_factory=dict)
+
+    def changes(self, actuator: int) -> list[tuple[int, int]]:
+        """Моменты смены значения устройства: `[(минута, значение), ...]`, первая запись - начальное значение"""
+        values = self.outputs[actuator]
+        indexes = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        return [(self.start + int(index), int(values[index])) for index in indexes]
+
+
+class AutomationSimulator(BuffEmulator):
+    """Эмулятор, который выполняет автоматики гроубокса по виртуальным часам, а не только хранит настройки.
+
+    `run(minutes)` проходит заданное число минут за доли секунды и возвращает SimulationResult. Так профиль можно
+    проверить до отправки в гроубокс: настройки задаются G-кодом (`load_gcode`, построитель) или JSON (`set_buff`).
+
+    Поведение автоматик:
+    - циклические проходят периоды по порядку PERIODS, пропуская периоды нулевой длительности; плавная на рассвете
+      и закате линейно меняет значение между ночным и дневным;
+    - климат-контроль включает устройство, когда показание датчика ниже min, и выключает, когда выше max;
+    - таймер включает устройство в отмеченные четверти часа;
+    - если на устройстве включено несколько автоматик, действует автоматика с большим кодом.
+
+    sensors(simulator) вызывается каждую минуту и возвращает показания `{код датчика: значение}`, например,
+    из модели климата, которая учитывает текущие значения устройств. Без него показания берутся из sensor_values.
+    """
+    ACTUATORS = (0, 1, 2)
+
+    def __init__(self, sensors=None):
+        super().__init__()
+        self.sensors = sensors
+        self.minute = 0  # минут виртуального времени с начала моделирования
+
+    @property
+    def minute_of_day(self) -> int:
+        hours, minutes = self.time.get('time', (0, 0))
+        return hours * 60 + minutes
+
+    def tick_clock(self):
+        self.minute += 1
+        minute_of_day = (self.minute_of_day + 1) % MINUTES_PER_DAY
+        self.time['time'] = (minute_of_day // 60, minute_of_day % 60)
+
+    def is_turn(self, auto_code: int, actuator: int) -> bool:
+        return bool(self.buff.get(str(auto_code), {}).get(str(actuator), {}).get('turn', False))
+
+    def cycle_periods(self, auto_code: int, actuator: int) -> list[tuple[int, int, int]]:
+        """Периоды циклической автоматики `(период, длительность, значение)` с теми же умолчаниями, что у E1031/E1531"""
+        auto_buff = self.a_cycle_hard if auto_code == AutoCycleHard.CODE else self.a_cycle_soft
+        periods_buff = auto_buff.get(str(actuator), {})
+        periods = []
+        for period in (AutoCycleHard.PERIODS if auto_code == AutoCycleHard.CODE else AutoCycleSoft.PERIODS):
+            period_buff = periods_buff.get(str(period), {})
+            default_value = '255' if auto_code == AutoCycleHard.CODE and period else '0'
+            periods.append((period, int(period_buff.get('duration', '0')), int(period_buff.get('value', default_value))))
+
+        return periods
+
+    def cycle_value(self, auto_code: int, actuator: int, periods) -> int | None:
+        """Значение циклической автоматики в текущую минуту; затем сдвигает её текущий период на минуту"""
+        if not any(duration for _, duration, _ in periods):
+            return None
+
+        period_codes = [period for period, _, _ in periods]
+        period, elapsed = self.currents.get((auto_code, actuator), (period_codes[0], 0))
+        index = period_codes.index(period)
+        while elapsed >= periods[index][1]:
+            elapsed -= periods[index][1]
+            index = (index + 1) % len(periods)
+
+        period, duration, value = periods[index]
+        if auto_code == AutoCycleSoft.CODE and period in (AutoCycleSoft.SUNRISE, AutoCycleSoft.SUNSET):
+            day_value = periods[period_codes.index(AutoCycleSoft.DAY)][2]
+            night_value = periods[period_codes.index(AutoCycleSoft.NIGHT)][2]
+            value_from, value_to = (night_value, day_value) if period == AutoCycleSoft.SUNRISE else (day_value, night_value)
+            value = round(value_from + (value_to - value_from) * elapsed / duration)
+
+        self.currents[auto_code, actuator] = (period, elapsed + 1)
+        return value
+
+    def climate_value(self, actuator: int) -> int | None:
+        climate_buff = self.a_climate_control.get(str(actuator), {})
+        sensor_value = self.sensor_values.get(int(climate_buff.get('sensor', '0')))
+        if sensor_value is None:
+            return None
+
+        if sensor_value < int(climate_buff.get('min', '0')):
+            return VALUE_ON
+
+        if sensor_value > int(climate_buff.get('max', '0')):
+            return VALUE_OFF
+
+        # между min и max устройство остаётся как было
+        return None
+
+    def timer_value(self, actuator: int) -> int:
+        index_bit = self.minute_of_day * AutoTimer.PARTS_PER_HOUR // 60
+        bytes_list = self.a_timer.get(str(actuator), {}).get('bytes') or self.get_default_time_bytes()
+        return VALUE_ON if bytes_list[index_bit // 8] >> (7 - index_bit % 8) & 1 else VALUE_OFF
+
+    def step(self, cycles: dict | None = None, turns: dict | None = None):
+        """Одна минута: обновляет показания датчиков, выполняет автоматики и переводит часы.
+
+        cycles - периоды циклических автоматик `{(код автоматики, устройство): cycle_periods(...)}`, turns -
+        включённость автоматик `{(код автоматики, устройство): is_turn(...)}`, если они уже прочитаны из настроек
+        (настройки не меняются, пока идёт run).
+        """
+        is_turn = (lambda auto_code, actuator: turns[auto_code, actuator]) if turns else self.is_turn
+        if self.sensors:
+            self.sensor_values.update(self.sensors(self))
+
+        actuators_buff = self.buff.setdefault('actuators', {})
+        for actuator in self.ACTUATORS:
+            value = None
+            for auto_code in (AutoCycleHard.CODE, AutoCycleSoft.CODE):
+                if is_turn(auto_code, actuator):
+                    periods = cycles[auto_code, actuator] if cycles else self.cycle_periods(auto_code, actuator)
+                    cycle_value = self.cycle_value(auto_code, actuator, periods)
+                    value = value if cycle_value is None else cycle_value
+                else:
+                    # выключенная циклическая автоматика при включении начнёт с первого периода
+                    self.currents.pop((auto_code, actuator), None)
+
+            if is_turn(AutoClimateControl.CODE, actuator):
+                climate_value = self.climate_value(actuator)
+                value = value if climate_value is None else climate_value
+
+            if is_turn(AutoTimer.CODE, actuator):
+                value = self.timer_value(actuator)
+
+            if value is not None:
+                actuators_buff.setdefault(str(actuator), {})['value'] = value
+
+        self.tick_clock()
+
+    def read_automations(self) -> tuple[dict, dict]:
+        """Аргументы cycles и turns для step() по текущим настройкам"""
+        cycles = {
+            (auto_code, actuator): self.cycle_periods(auto_code, actuator)
+            for auto_code in (AutoCycleHard.CODE, AutoCycleSoft.CODE) for actuator in self.ACTUATORS
+        }
+        auto_codes = (AutoCycleHard.CODE, AutoCycleSoft.CODE, AutoClimateControl.CODE, AutoTimer.CODE)
+        turns = {
+            (auto_code, actuator): self.is_turn(auto_code, actuator)
+            for auto_code in auto_codes for actuator in self.ACTUATORS
+        }
+        return cycles, turns
+
+    def run(self, minutes: int) -> SimulationResult:
+        result = SimulationResult(self.minute)
+        outputs = {actuator: np.zeros(minutes, np.uint8) for actuator in self.ACTUATORS}
+        sensors = {}
+        actuators_buff = self.buff.setdefault('actuators', {})
+        cycles, turns = self.read_automations()
+        for index in range(minutes):
+            self.step(cycles, turns)
+            for actuator in self.ACTUATORS:
+                outputs[actuator][index] = actuators_buff.get(str(actuator), {}).get('value', VALUE_OFF)
+
+            for code, value in self.sensor_values.items():
+                if code not in sensors:
+                    sensors[code] = np.full(minutes, np.nan)
+
+                sensors[code][index] = np.nan if value is None else value
+
+        result.outputs = outputs
+        result.sensors = sensors
+        return result
+
+
+def simulate(gcode_lines=None, buff: dict | None = None, days: float = 30, sensors=None) -> SimulationResult:
+    """Выполняет профиль (G-код и/или состояние BuffEmulator) days суток виртуального времени"""
+    simulator = AutomationSimulator(sensors)
+    if buff is not None:
+        simulator.set_buff(buff)
+
+    if gcode_lines is not None:
+        simulator.load_gcode(gcode_lines)
+
+    return simulator.run(round(days * MINUTES_PER_DAY))
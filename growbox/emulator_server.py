@@ -0,0 +1,285 @@
+"""Эмулятор гроубоксов, доступный так же, как настоящие: по HTTP (`api.c?action=send_to_serial`)
+и на псевдотерминалах (pty), которые открываются SerialAdapter как обычный последовательный порт.
+
+Запуск: python -m growbox.emulator_server --port 8080
+        python -m growbox.emulator_server --boxes 10 --pty --baudrate 9600 --latency 0.02 --jitter 0.01
+"""
+import argparse
+import json
+import os
+import random
+import select
+import threading
+import time
+import sys
+import tty
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+# модули sygrowbox импортируют друг друга как `sygrowbox.*`: при запуске через `python -m` из корня репозитория
+# каталога growbox в sys.path нет
+GROWBOX_PATH = str(Path(__file__).resolve().parent)
+if GROWBOX_PATH not in sys.path:
+    sys.path.append(GROWBOX_PATH)
+
+from growbox.adapters.buff_emulator import BuffEmulator  # noqa: E402
+
+BITS_PER_BYTE = 10  # 8N1: стартовый бит, 8 бит данных и стоповый бит
+PTY_CHUNK_SIZE = 4096
+
+
+class Wire:
+    """Канал до гроубокса: время передачи байтов на скорости baudrate (None - мгновенно)
+    и задержка ответа latency плюс случайная добавка до jitter секунд"""
+    def __init__(self, baudrate: int | None = None, latency: float = 0, jitter: float = 0, seed=None):
+        self.baudrate = baudrate
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+
+    def transfer_time(self, count_bytes: int) -> float:
+        return count_bytes * BITS_PER_BYTE / self.baudrate if self.baudrate else 0
+
+    def delay(self) -> float:
+        return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+
+
+class EmulatedBox:
+    """Эмулятор одного гроубокса за каналом wire. Команды выполняются по одной, как в настоящем гроубоксе"""
+    def __init__(self, emulator=None, wire: Wire | None = None):
+        self.emulator = emulator or BuffEmulator()
+        self.wire = wire or Wire()
+        self.lock = threading.Lock()
+
+    def execute(self, data: bytes) -> bytes:
+        """Выполняет строки и возвращает ответ, выжидая задержку канала (но не время передачи)"""
+        with self.lock:
+            self.emulator.write(data)
+            answer = self.emulator.read(len(self.emulator.answer))
+            delay = self.wire.delay()
+
+        if delay:
+            time.sleep(delay)
+
+        return answer
+
+    def send_to_serial(self, string_data: str) -> str:
+        """Запрос `api.c`: время передачи строк и ответа по последовательному порту входит в ответ"""
+        data = string_data.encode('utf-8')
+        answer = self.execute(data)
+        transfer_time = self.wire.transfer_time(len(data) + len(answer))
+        if transfer_time:
+            time.sleep(transfer_time)
+
+        return answer.decode('utf-8')
+
+
+class PtyEndpoint:
+    """Гроубокс на псевдотерминале: `path` - устройство для SerialAdapter (например, /dev/pts/5).
+
+    Строки принимаются и ответы отдаются не быстрее, чем позволяет wire.baudrate, поэтому можно проверять
+    управление потоком и приёмный буфер построителя. Только POSIX.
+    """
+    def __init__(self, box: EmulatedBox):
+        self.box = box
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        # slave остаётся открытым у нас: клиент может переподключаться, не закрывая канал
+        self.path = os.ttyname(self.slave_fd)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.rx_time = 0  # когда последний принятый байт закончит передаваться по проводу
+        self.tx_time = 0
+
+    def _wait_until(self, moment: float):
+        delay = moment - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send(self, answer: bytes):
+        wire = self.box.wire
+        if not wire.baudrate:
+            os.write(self.master_fd, answer)
+            return
+
+        # отдаём ответ кусками по ~10 мс передачи, чтобы клиент видел поток байтов, а не один пакет
+        chunk_size = max(1, wire.baudrate // BITS_PER_BYTE // 100)
+        self.tx_time = max(self.tx_time, time.monotonic())
+        for index in range(0, len(answer), chunk_size):
+            chunk = answer[index:index + chunk_size]
+            self.tx_time += wire.transfer_time(len(chunk))
+            self._wait_until(self.tx_time)
+            os.write(self.master_fd, chunk)
+
+    def run(self):
+        buffer = b''
+        while not self.stop_event.is_set():
+            readable, _, _ = select.select([self.master_fd], [], [], 0.1)
+            if not readable:
+                continue
+
+            try:
+                data = os.read(self.master_fd, PTY_CHUNK_SIZE)
+            except OSError:
+                break
+
+            self.rx_time = max(self.rx_time, time.monotonic()) + self.box.wire.transfer_time(len(data))
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            if not lines:
+                continue
+
+            self._wait_until(self.rx_time)
+            for line in lines:
+                self._send(self.box.execute(line + b'\n'))
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name=f'pty {self.path}', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def close(self):
+        self.stop()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def send_json(self, status_code, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url_parts = urlsplit(self.path)
+        params = parse_qs(url_parts.query)
+        content_length = int(self.headers.get('Content-Length') or 0)
+        if content_length:
+            params.update(parse_qs(self.rfile.read(content_length).decode('utf-8')))
+
+        # `/api.c` - первый гроубокс, `/<номер>/api.c` - любой (HttpAdapter с url `http://host:port/<номер>`)
+        path_parts = url_parts.path.strip('/').split('/')
+        box_index = int(path_parts[0]) if len(path_parts) == 2 and path_parts[0].isdigit() else 0
+        action = params.get('action', [''])[0]
+        if path_parts[-1] != 'api.c' or len(path_parts) > 2 or action != 'send_to_serial':
+            self.send_json(404, {'status': 'error', 'message': 'unknown action'})
+            return
+
+        if box_index >= len(self.server.boxes):
+            self.send_json(404, {'status': 'error', 'message': 'unknown growbox'})
+            return
+
+        string_data = params.get('string_data', [''])[0]
+        string_response_data = self.server.send_to_serial(string_data, box_index)
+        self.send_json(200, {'status': 'success', 'data': {'string_response_data': string_response_data}})
+
+    do_GET = do_POST
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class EmulatorHttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, emulator=None, verbose=False, boxes: list[EmulatedBox] | None = None):
+        super().__init__(server_address, ApiRequestHandler)
+        self.boxes = boxes or [EmulatedBox(emulator)]
+        self.verbose = verbose
+
+    @property
+    def emulator(self):
+        return self.boxes[0].emulator
+
+    def send_to_serial(self, string_data: str, box_index: int = 0) -> str:
+        return self.boxes[box_index].send_to_serial(string_data)
+
+
+def create_boxes(count_boxes: int, emulator_name: str = 'buff', wire_kwargs=None, seed=None):
+    """Гроубоксы с отдельными каналами; для 'climate' - ещё и общая ClimateModel (иначе None)"""
+    wire_kwargs = wire_kwargs or {}
+    model = None
+    if emulator_name == 'climate':
+        from growbox.adapters.climate_emulator import ClimateModel
+
+        model = ClimateModel(count_boxes, seed=seed)
+        emulators = model.emulators
+    else:
+        emulators = [BuffEmulator() for _ in range(count_boxes)]
+
+    boxes = [
+        EmulatedBox(emulator, Wire(seed=None if seed is None else seed + index, **wire_kwargs))
+        for index, emulator in enumerate(emulators)
+    ]
+    return boxes, model
+
+
+def run():
+    parser = argparse.ArgumentParser(description='Эмулятор гроубоксов с HTTP-интерфейсом api.c и на псевдотерминалах')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--no-http', action='store_true', help='не запускать HTTP-сервер')
+    parser.add_argument('--pty', action='store_true', help='открыть псевдотерминал на каждый гроубокс')
+    parser.add_argument('--boxes', type=int, default=1, help='число гроубоксов')
+    parser.add_argument('--emulator', choices=('buff', 'climate'), default='buff')
+    parser.add_argument('--speed', type=float, default=1, help='ускорение времени модели климата')
+    parser.add_argument('--baudrate', type=int, help='скорость, с которой передаются байты (например, 9600)')
+    parser.add_argument('--latency', type=float, default=0, help='задержка ответа, с')
+    parser.add_argument('--jitter', type=float, default=0, help='наибольшая случайная добавка к задержке, с')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    wire_kwargs = {'baudrate': args.baudrate, 'latency': args.latency, 'jitter': args.jitter}
+    boxes, model = create_boxes(args.boxes, args.emulator, wire_kwargs, args.seed)
+    if model is not None:
+        model.start(args.speed)
+
+    endpoints = []
+    if args.pty:
+        for index, box in enumerate(boxes):
+            endpoint = PtyEndpoint(box)
+            endpoint.start()
+            endpoints.append(endpoint)
+            print(f'{index}: {endpoint.path}')
+
+    server = None
+    if not args.no_http:
+        server = EmulatorHttpServer((args.host, args.port), verbose=args.verbose, boxes=boxes)
+        url = f'http://{args.host}:{server.server_port}'
+        print(url if len(boxes) == 1 else f'{url}/<0..{len(boxes) - 1}>')
+
+    try:
+        if server is not None:
+            server.serve_forever()
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.server_close()
+
+        for endpoint in endpoints:
+            endpoint.close()
+
+        if model is not None:
+            model.stop()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,66 @@
+"""Выгрузка истории показаний и журнала команд в CSV или Parquet без GUI.
+
+Запуск:
+    python -m growbox.exporter history --path history --output history.csv.gz --compression gzip
+    python -m growbox.exporter commands --path commands --output commands.parquet --format parquet --box box1
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# модули sygrowbox импортируют друг друга как `sygrowbox.*`: при запуске через `python -m` из корня репозитория
+# каталога growbox в sys.path нет
+GROWBOX_PATH = str(Path(__file__).resolve().parent)
+if GROWBOX_PATH not in sys.path:
+    sys.path.append(GROWBOX_PATH)
+
+from growbox.sygrowbox.command_log import CommandLog  # noqa: E402
+from growbox.sygrowbox.export import export_commands, export_history  # noqa: E402
+from growbox.sygrowbox.history import HistoryStore  # noqa: E402
+
+
+def parse_time(value: str) -> float:
+    """Дата и время ISO 8601; без часового пояса считается UTC"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+
+    return moment.timestamp()
+
+
+def print_progress(result):
+    print(f'\r{result.count_rows} строк, {result.rows_per_second:,.0f} строк/с', end='', flush=True)
+
+
+def run():
+    parser = argparse.ArgumentParser(description='Выгрузка истории показаний и журнала команд гроубоксов')
+    parser.add_argument('source', choices=('history', 'commands'))
+    parser.add_argument('--path', required=True, help='каталог HistoryStore или CommandLog')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv')
+    parser.add_argument('--compression', help='csv: gzip, bz2, xz; parquet: snappy, gzip, zstd...')
+    parser.add_argument('--box', action='append', help='можно указать несколько раз')
+    parser.add_argument('--channel', action='append', help='только для history, например, sensor_0')
+    parser.add_argument('--direction', action='append', choices=('write', 'answer'), help='только для commands')
+    parser.add_argument('--start', type=parse_time)
+    parser.add_argument('--end', type=parse_time)
+    args = parser.parse_args()
+
+    filters = {'boxes': args.box, 'time_start': args.start, 'time_end': args.end}
+    if args.source == 'history':
+        result = export_history(
+            HistoryStore(args.path), args.output, args.format, args.compression, print_progress,
+            channels=args.channel, **filters,
+        )
+    else:
+        result = export_commands(
+            CommandLog(args.path), args.output, args.format, args.compression, print_progress,
+            directions=args.direction, **filters,
+        )
+
+    print(f'\n{result.count_rows} строк за {result.duration:.1f} с, {result.rows_per_second:,.0f} строк/с')
+
+
+if __name__ == '__main__':
+    run()
@@ -4,7 +4,7 @@ from pathlib import Path
 
 
 import yaml
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QLabel, QLineEdit, QGroupBox, QGridLayout,
@@ -16,6 +16,11 @@ from serial.tools.list_ports import comports
 from growbox.adapters.http_adapter import HttpAdapter
 from growbox.adapters.serial_adapter import SerialAdapter
 from growbox.sygrowbox.gcode_builder import GrowboxGCodeBuilder
+from growbox.sygrowbox.state_mirror import StateMirror
+from growbox.sygrowbox.sync import read_settings, sync
+from growbox.sygrowbox.scheduler import LANE_BULK
+from growbox.sygrowbox.telemetry import TelemetryPoller
+from growbox.sygrowbox.uploader import GCodeUploader, UploadProgress
 from growbox.adapters.buff_emulator import BuffEmulator
 from growbox.thread_tools import SerialWorkersManager
 from growbox.set_value_windows import SetValueIntegerDialog, SetValueListDialog, SetValueTimeDialog
@@ -30,49 +35,52 @@ DAY_NEUTRAL = 3
 VEGETATIVE_GROWING = 1
 GENERATIVE_GROWING = 2
 
+MIRROR_TTL = 60  # сколько секунд настройки гроубокса берутся из копии, а не читаются заново
+
 
 def copy_growbox_settings(growbox_from: GrowboxGCodeBuilder, growbox_to: GrowboxGCodeBuilder):
-    # stop all autos
-    growbox_to.turn_off_all_autos()
-
-    # set time
-    growbox_to.set_time_source(growbox_from.get_time_source())
-
-    # set values on actuators
-    for actuator in growbox_to.actuators.values():
-        actuator.set(growbox_from.actuators[actuator.code].get())
-
-    # set autos
-    for actuator in growbox_to.actuators.values():
-        for auto in growbox_to.autos.values():
-            auto_buff = growbox_from.autos[auto.CODE]
-            if auto.CODE == 0:
-                for period in auto.PERIODS:
-                    auto.set_value(actuator, period, auto_buff.get_value(actuator, period))
-                    auto.set_duration(actuator, period, auto_buff.get_duration(actuator, period))
-            elif auto.CODE == 1:
-                for period in auto.PERIODS:
-                    if period % 2 != 0:
+    with growbox_to.batch():
+        # stop all autos
+        growbox_to.turn_off_all_autos()
+
+        # set time
+        growbox_to.set_time_source(growbox_from.get_time_source())
+
+        # set values on actuators
+        for actuator in growbox_to.actuators.values():
+            actuator.set(growbox_from.actuators[actuator.code].get())
+
+        # set autos
+        for actuator in growbox_to.actuators.values():
+            for auto in growbox_to.autos.values():
+                auto_buff = growbox_from.autos[auto.CODE]
+                if auto.CODE == 0:
+                    for period in auto.PERIODS:
                         auto.set_value(actuator, period, auto_buff.get_value(actuator, period))
-
-                    auto.set_duration(actuator, period, auto_buff.get_duration(actuator, period))
-            elif auto.CODE == 2:
-                auto.set_min(actuator, auto_buff.get_min(actuator))
-                auto.set_max(actuator, auto_buff.get_max(actuator))
-                sensor = auto_buff.get_sensor(actuator)
-                auto.set_sensor(actuator, sensor)
-            elif auto.CODE == 3:
-                bytes_list = auto_buff.get_minute_bits(actuator)
-                for byte_index, byte_value in enumerate(bytes_list):
-                    auto.set_minute_bits(actuator, byte_index, byte_value)
-
-    # start autos if we need they
-    for actuator in growbox_to.actuators.values():
-        for auto in growbox_to.autos.values():
-            auto_buff = growbox_from.autos[auto.CODE]
-            value = auto_buff.is_turn(actuator)
-            if value:
-                auto.turn(actuator, value)
+                        auto.set_duration(actuator, period, auto_buff.get_duration(actuator, period))
+                elif auto.CODE == 1:
+                    for period in auto.PERIODS:
+                        if period % 2 != 0:
+                            auto.set_value(actuator, period, auto_buff.get_value(actuator, period))
+
+                        auto.set_duration(actuator, period, auto_buff.get_duration(actuator, period))
+                elif auto.CODE == 2:
+                    auto.set_min(actuator, auto_buff.get_min(actuator))
+                    auto.set_max(actuator, auto_buff.get_max(actuator))
+                    sensor = auto_buff.get_sensor(actuator)
+                    auto.set_sensor(actuator, sensor)
+                elif auto.CODE == 3:
+                    bytes_list = auto_buff.get_minute_bits(actuator)
+                    for byte_index, byte_value in enumerate(bytes_list):
+                        auto.set_minute_bits(actuator, byte_index, byte_value)
+
+        # start autos if we need they
+        for actuator in growbox_to.actuators.values():
+            for auto in growbox_to.autos.values():
+                auto_buff = growbox_from.autos[auto.CODE]
+                value = auto_buff.is_turn(actuator)
+                if value:
+                    auto.turn(actuator, value)
 
 
 def generate_gcode(gcode: GrowboxGCodeBuilder, profile_data: dict, grow_mode: int):
@@ -100,16 +108,17 @@ def generate_gcode(gcode: GrowboxGCodeBuilder, profile_data: dict, grow_mode: in
         else:
             len_light_day = 14 * 60
 
-    gcode.turn_off_all_autos()
+    with gcode.batch():
+        gcode.turn_off_all_autos()
 
-    # Настройка белого света
-    cycle_soft.set_value(a_white_light, cycle_soft.DAY, 255)
-    cycle_soft.set_value(a_white_light, cycle_soft.NIGHT, 0)
-    cycle_soft.set_duration(a_white_light, cycle_soft.SUNRISE, len_sunrise_day)
-    cycle_soft.set_duration(a_white_light, cycle_soft.DAY, len_light_day - len_sunrise_day)
-    cycle_soft.set_duration(a_white_light, cycle_soft.SUNSET, 10)
-    cycle_soft.set_duration(a_white_light, cycle_soft.NIGHT, 590)
-    cycle_soft.turn(a_white_light, True)
+        # Настройка белого света
+        cycle_soft.set_value(a_white_light, cycle_soft.DAY, 255)
+        cycle_soft.set_value(a_white_light, cycle_soft.NIGHT, 0)
+        cycle_soft.set_duration(a_white_light, cycle_soft.SUNRISE, len_sunrise_day)
+        cycle_soft.set_duration(a_white_light, cycle_soft.DAY, len_light_day - len_sunrise_day)
+        cycle_soft.set_duration(a_white_light, cycle_soft.SUNSET, 10)
+        cycle_soft.set_duration(a_white_light, cycle_soft.NIGHT, 590)
+        cycle_soft.turn(a_white_light, True)
 
     # Настройка дальнего красного света
 
@@ -120,6 +129,8 @@ class BaseAutoWindow(QWidget):
     def closeEvent(self, *args, **kwargs):
         super().closeEvent(*args, **kwargs)
         self.is_closed = True
+        # окно закрыто - его чтения из гроубокса больше не нужны
+        self.worker_manager.cancel_group(self)
 
     def __init__(
             self,
@@ -151,9 +162,14 @@ class BaseAutoWindow(QWidget):
         self.checkbox_turn.setChecked(self.auto_buff.is_turn(actuator_code))
 
     def btn_toggle_auto_clicked(self, checked):
-        self.gcode_auto.turn(actuator=self.actuator_code, status=checked)
+        self.worker_manager.send(self.gcode_auto.turn, actuator=self.actuator_code, status=checked)
         self.turn_checkboxes[f'{self.code}-{self.actuator_code}'].setChecked(checked)
 
+    def btn_update_clicked(self, checked):
+        # по кнопке настройки перечитываются из гроубокса, а не из копии
+        self.gcode.invalidate_mirror()
+        self.update()
+
     @staticmethod
     def format_duration(duration):
         hours = duration // 60
@@ -181,7 +197,7 @@ class AutoCycleHardWindow(BaseAutoWindow):
         if dlg.exec():
             value = dlg.value
             getattr(self, f'set_{what_set}')(period_code, value)
-            getattr(self.gcode_auto, f'set_{what_set}')(self.actuator_code, period_code, value)
+            self.worker_manager.send(getattr(self.gcode_auto, f'set_{what_set}'), self.actuator_code, period_code, value)
 
     def build_btn_set_value(self, layout, period_code, text, y, value):
         label_value = QLabel(value)
@@ -219,9 +235,9 @@ class AutoCycleHardWindow(BaseAutoWindow):
         def task_current():
             return self.gcode_auto.get_current(self.actuator_code)
 
-        self.worker_manager.add_and_start_worker(result_current, task_current)
+        self.worker_manager.add_and_start_worker(result_current, task_current, group=self)
         for period_code in self.gcode_auto.PERIODS:
-            self.worker_manager.add_and_start_worker(result_update, task_update, period_code)
+            self.worker_manager.add_and_start_worker(result_update, task_update, period_code, group=self)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -248,7 +264,7 @@ class AutoCycleHardWindow(BaseAutoWindow):
         if self.open_type == 'connect':
             self.label_current = QLabel('')
             button_update = QPushButton('Обновить')
-            button_update.clicked.connect(self.update)
+            button_update.clicked.connect(self.btn_update_clicked)
             layout.addWidget(self.label_current)
             layout.addWidget(button_update)
             self.update()
@@ -272,7 +288,7 @@ class AutoCycleSoftWindow(BaseAutoWindow):
         if dlg.exec():
             value = dlg.value
             getattr(self, f'set_{what_set}')(period_code, value)
-            getattr(self.gcode_auto, f'set_{what_set}')(self.actuator_code, period_code, value)
+            self.worker_manager.send(getattr(self.gcode_auto, f'set_{what_set}'), self.actuator_code, period_code, value)
 
     def build_btn_set_value(self, layout, period_code, text, y, value):
         label_value = QLabel(value)
@@ -313,9 +329,9 @@ class AutoCycleSoftWindow(BaseAutoWindow):
         def task_current():
             return self.gcode_auto.get_current(self.actuator_code)
 
-        self.worker_manager.add_and_start_worker(result_current, task_current)
+        self.worker_manager.add_and_start_worker(result_current, task_current, group=self)
         for period_code in self.gcode_auto.PERIODS:
-            self.worker_manager.add_and_start_worker(result_update, task_update, period_code)
+            self.worker_manager.add_and_start_worker(result_update, task_update, period_code, group=self)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -344,7 +360,7 @@ class AutoCycleSoftWindow(BaseAutoWindow):
         if self.open_type == 'connect':
             self.label_current = QLabel('')
             button_update = QPushButton('Обновить')
-            button_update.clicked.connect(self.update)
+            button_update.clicked.connect(self.btn_update_clicked)
             layout.addWidget(self.label_current)
             layout.addWidget(button_update)
             self.update()
@@ -402,7 +418,7 @@ class AutoClimateControlWindow(BaseAutoWindow):
         self.setLayout(layout)
         if self.open_type == 'connect':
             button_update = QPushButton('Обновить')
-            button_update.clicked.connect(self.update)
+            button_update.clicked.connect(self.btn_update_clicked)
             layout.addWidget(button_update)
             self.update()
 
@@ -421,15 +437,15 @@ class AutoClimateControlWindow(BaseAutoWindow):
             if what_set == 'min':
                 value = dlg.value
                 label_value.setText(self.format_value(value))
-                self.gcode_auto.set_min(self.actuator_code, value)
+                self.worker_manager.send(self.gcode_auto.set_min, self.actuator_code, value)
             elif what_set == 'max':
                 value = dlg.value
                 label_value.setText(self.format_value(value))
-                self.gcode_auto.set_max(self.actuator_code, value)
+                self.worker_manager.send(self.gcode_auto.set_max, self.actuator_code, value)
             elif what_set == 'sensor':
                 value = dlg.value
                 label_value.setText(self.sensors[value])
-                self.gcode_auto.set_sensor(self.actuator_code, value)
+                self.worker_manager.send(self.gcode_auto.set_sensor, self.actuator_code, value)
                 self.sensor_code = value
                 self.label_value_min.setText(self.format_value(self.label_value_min.text().split()[0]))
                 self.label_value_max.setText(self.format_value(self.label_value_max.text().split()[0]))
@@ -453,7 +469,7 @@ class AutoClimateControlWindow(BaseAutoWindow):
                 self.gcode_auto.get_sensor(self.actuator_code),
             )
 
-        self.worker_manager.add_and_start_worker(result_update, task_update)
+        self.worker_manager.add_and_start_worker(result_update, task_update, group=self)
 
 
 class AutoTimerWindow(BaseAutoWindow):
@@ -494,7 +510,7 @@ class AutoTimerWindow(BaseAutoWindow):
         def task_update():
             return self.gcode_auto.get_minute_flags(self.actuator_code)
 
-        self.worker_manager.add_and_start_worker(result_update, task_update)
+        self.worker_manager.add_and_start_worker(result_update, task_update, group=self)
 
     def hour_btn_clicked(self, btn):
         hour = btn.property('hour')
@@ -503,7 +519,7 @@ class AutoTimerWindow(BaseAutoWindow):
         for minute_btn in self.minute_btns_by_hours[hour]:
             self.toggle_btn(minute_btn, is_checked)
 
-        self.gcode_auto.set_minute_flag(self.actuator_code, hour, None, is_checked)
+        self.worker_manager.send(self.gcode_auto.set_minute_flag, self.actuator_code, hour, None, is_checked)
         self.auto_buff.set_minute_flag(self.actuator_code, hour, None, is_checked)
 
     def minute_btn_clicked(self, btn):
@@ -512,7 +528,7 @@ class AutoTimerWindow(BaseAutoWindow):
         is_checked = not btn.property('is_checked')
         self.toggle_btn(btn, is_checked)
 
-        self.gcode_auto.set_minute_flag(self.actuator_code, hour, minute_index, is_checked)
+        self.worker_manager.send(self.gcode_auto.set_minute_flag, self.actuator_code, hour, minute_index, is_checked)
         self.auto_buff.set_minute_flag(self.actuator_code, hour, minute_index, is_checked)
 
         count_checked = sum(self.minutes_flags[hour][minute_index] for minute_index in range(0, self.PARTS_PER_HOUR))
@@ -574,7 +590,7 @@ class AutoTimerWindow(BaseAutoWindow):
 
         if self.open_type == 'connect':
             button_update = QPushButton('Обновить')
-            button_update.clicked.connect(self.update)
+            button_update.clicked.connect(self.btn_update_clicked)
             layout.addWidget(button_update)
             self.update()
 
@@ -591,6 +607,7 @@ class TimeWindow(QWidget):
     def closeEvent(self, *args, **kwargs):
         super().closeEvent(*args, **kwargs)
         self.is_closed = True
+        self.worker_manager.cancel_group(self)
 
     def update(self, checked=None):
 
@@ -602,7 +619,11 @@ class TimeWindow(QWidget):
         def get_time():
             return self.gcode.get_time(), self.gcode.get_time_source()
 
-        self.worker_manager.add_and_start_worker(result_time, get_time)
+        self.worker_manager.add_and_start_worker(result_time, get_time, group=self)
+
+    def btn_update_clicked(self, checked):
+        self.gcode.invalidate_mirror()
+        self.update()
 
     def btn_select_source_time_clicked(self, _):
         current_source_code = -1
@@ -615,13 +636,13 @@ class TimeWindow(QWidget):
             value = dlg.value
             self.label_time_source.setText(self.source_times[value])
             self.growbox_buff.set_time_source(value)
-            self.gcode.set_time_source(value)
+            self.worker_manager.send(self.gcode.set_time_source, value)
 
     def btn_set_time_clicked(self, _):
         dlg = SetValueTimeDialog(self, 'Время', self.hours * 60 + self.minutes)
         if dlg.exec():
             self.set_time(dlg.hours, dlg.minutes)
-            self.gcode.set_time(dlg.hours, dlg.minutes)
+            self.worker_manager.send(self.gcode.set_time, dlg.hours, dlg.minutes)
 
     def __init__(
             self,
@@ -669,7 +690,7 @@ class TimeWindow(QWidget):
 
         if self.open_type == 'connect':
             button_update = QPushButton('Обновить')
-            button_update.clicked.connect(self.update)
+            button_update.clicked.connect(self.btn_update_clicked)
             layout.addWidget(button_update)
             self.update()
 
@@ -692,19 +713,47 @@ class YesNoDialog(QDialog):
 
 
 class GCodeSendWindow(QWidget):
-    def start_sending(self, checked):
-        def result_send(line_index):
-            self.label_progress.setText(self.progress_mask.format(line_index, self.count_lines))
+    progress = pyqtSignal(object)
+    is_closed = False
+    # строк за одно задание: между заданиями выполняется опрос показаний. Действие пользователя не ждёт
+    # конца задания: отправка прерывается, как только оно встаёт в очередь
+    LINES_PER_JOB = 64
 
-        def task_send(gcode_line, line_index):
-            self.gcode.write(gcode_line)
-            return line_index
+    def closeEvent(self, *args, **kwargs):
+        super().closeEvent(*args, **kwargs)
+        self.is_closed = True
+        self.uploader.stop()
+        self.worker_manager.cancel_group(self)
+
+    def show_progress(self, progress: UploadProgress):
+        self.label_progress.setText(self.progress_mask.format(progress.percent, progress.count_lines))
+        if progress.is_finished:
+            self.label_progress.setText(f'{self.label_progress.text()}. Готово')
+
+        if progress.count_errors:
+            self.label_progress.setText(f'{self.label_progress.text()}. Ошибок: {progress.count_errors}')
+
+    def send_next_lines(self, progress: UploadProgress | None = None):
+        if progress is not None:
+            self.progress.emit(progress)
+            is_sent = progress.count_lines > self.count_sent_lines
+            self.count_sent_lines = progress.count_lines
+            if progress.is_finished or not is_sent or self.is_closed:
+                self.button_start.setEnabled(not progress.is_finished)
+                return
+
+        self.worker_manager.add_and_start_worker(
+            self.send_next_lines,
+            self.uploader.run,
+            max_lines=self.LINES_PER_JOB,
+            should_pause=self.worker_manager.is_interactive_waiting,
+            lane=LANE_BULK,
+            group=self,
+        )
 
-        with self.file_path.open() as file_gcode:
-            line_index = 1
-            for gcode_line in file_gcode:
-                self.worker_manager.add_and_start_worker(result_send, task_send, gcode_line, line_index)
-                line_index += 1
+    def start_sending(self, checked):
+        self.button_start.setEnabled(False)
+        self.send_next_lines()
 
     def __init__(self, parent, gcode, file_path, worker_manager):
         super().__init__()
@@ -712,28 +761,37 @@ class GCodeSendWindow(QWidget):
         self.gcode = gcode
         self.file_path = file_path
         self.worker_manager = worker_manager
+        # прогресс приходит из потока отправки, поэтому через сигнал
+        self.progress.connect(self.show_progress)
+        self.uploader = GCodeUploader(gcode, file_path, callback_progress=self.progress.emit)
 
-        self.progress_mask = 'Отправлено {} строк из {}'
+        self.progress_mask = 'Отправлено {:.1f}% ({} строк)'
         self.label_progress = QLabel()
-        button_start = QPushButton('Начать')
-        button_start.clicked.connect(self.start_sending)
+        self.button_start = QPushButton('Начать')
+        self.button_start.clicked.connect(self.start_sending)
 
         layout = QVBoxLayout()
         layout.addWidget(self.label_progress)
-        layout.addWidget(button_start)
+        layout.addWidget(self.button_start)
         self.setLayout(layout)
 
-        with file_path.open() as file_gcode:
-            self.count_lines = 0
-            for _ in file_gcode:
-                self.count_lines += 1
-
-        self.label_progress.setText(self.progress_mask.format(0, self.count_lines))
+        offset, count_lines = self.uploader.load_checkpoint()
+        self.count_sent_lines = count_lines
+        self.show_progress(UploadProgress(offset, file_path.stat().st_size, count_lines))
+        if offset:
+            self.button_start.setText('Продолжить')
 
 
 class MainPanelWindow(QMainWindow):
+    is_closed = False
+
     def closeEvent(self, *args, **kwargs):
         super().closeEvent(*args, **kwargs)
+        self.is_closed = True
+        if self.telemetry:
+            self.timer_telemetry.stop()
+            self.worker_manager.cancel_group(self.telemetry)
+
         for obj in self.objects_to_close:
             obj.close()
 
@@ -770,6 +828,22 @@ class MainPanelWindow(QMainWindow):
             with open(file_path, 'wb') as output_file:
                 copy_growbox_settings(self.gcode, GrowboxGCodeBuilder(output_file))
 
+    def btn_send_json(self, checked):
+        file_path, mask = QFileDialog.getOpenFileName(self, 'Открытие JSON', '~', '*.json')
+        if file_path:
+            with open(file_path) as json_file:
+                emulator = BuffEmulator()
+                emulator.set_buff(json.load(json_file))
+
+            desired = read_settings(GrowboxGCodeBuilder(emulator, need_wait_answer=True))
+
+            def result_sync(commands):
+                if commands is not None:
+                    self.print_to_status_bar(f'Изменено настроек: {len(commands)}')
+
+            # чтение и запись настроек гроубокса идут через очередь заданий, а не в потоке окна
+            self.worker_manager.add_and_start_worker(result_sync, sync, self.gcode, desired, lane=LANE_BULK)
+
     def btn_save_json(self, checked):
         default_file_name = self.file_path.stem if self.file_path else ''
         file_path, mask = QFileDialog.getSaveFileName(self, 'Сохранение JSON', default_file_name, '*.json')
@@ -793,12 +867,13 @@ class MainPanelWindow(QMainWindow):
             menu_file.addAction(button_action_save)
             # menu_file.addAction(button_action_save_json)
         if self.open_type == 'connect':
-            # button_action_send_json = QAction('Открыть JSON и послать в гроубокс', self)
+            button_action_send_json = QAction('Открыть JSON и послать в гроубокс', self)
+            button_action_send_json.triggered.connect(self.btn_send_json)
             button_action_send_gcode = QAction('Открыть и загрузить в гроубокс', self)
             button_action_send_gcode.triggered.connect(self.btn_send_gcode)
             button_action_save_gcode = QAction('Выгрузить из гроубокса и сохранить', self)
             button_action_save_gcode.triggered.connect(self.btn_load_and_save_gcode)
-            # menu_file.addAction(button_action_send_json)
+            menu_file.addAction(button_action_send_json)
             menu_file.addAction(button_action_send_gcode)
             menu_file.addAction(button_action_save_gcode)
 
@@ -856,7 +931,7 @@ class MainPanelWindow(QMainWindow):
         if dlg.exec():
             value = dlg.value
             label_value.setText(str(value))
-            self.gcode.actuators[actuator_code].set(value)
+            self.worker_manager.send(self.gcode.actuators[actuator_code].set, value)
 
     def btn_open_auto_clicked(self, checked, gcode_auto, actuator_code: int, actuator_name: str):
         auto_windows_classes = {
@@ -883,7 +958,7 @@ class MainPanelWindow(QMainWindow):
             opened_window.show()
 
     def btn_toggle_auto_clicked(self, checked, gcode_auto, actuator_code):
-        gcode_auto.turn(actuator_code, checked)
+        self.worker_manager.send(gcode_auto.turn, actuator_code, checked)
 
     def btn_turn_off_all_autos_clicked(self, checked):
         self.growbox_buff.turn_off_all_autos()
@@ -891,7 +966,7 @@ class MainPanelWindow(QMainWindow):
             if checkbox.isChecked():
                 checkbox.setChecked(False)
 
-        self.gcode.turn_off_all_autos()
+        self.worker_manager.send(self.gcode.turn_off_all_autos)
 
     def build_btn_set_value(self, layout, actuator_code: int, text, y):
         value = self.growbox_buff.actuators[actuator_code].get()
@@ -989,51 +1064,59 @@ class MainPanelWindow(QMainWindow):
             self.worker_manager.current_worker.signals.callback_write.emit(gcode_line)
         else:
             self.print_to_log(gcode_line)
-            self.growbox_buff.write(gcode_line)
-            self.growbox_buff.output.output.answer = ''
+            self.growbox_buff.output.output.load_gcode([gcode_line])
+
+    def btn_update_clicked(self, checked):
+        self.gcode.invalidate_mirror()
+        self.worker_update_from_growbox()
 
     def worker_update_from_growbox(self):
-        def result_autos(data):
-            auto_code, actuator_code, is_turned = data
-            self.growbox_buff.autos[int(auto_code)].turn(actuator_code, is_turned)
-            self.turn_checkboxes[f'{auto_code}-{actuator_code}'].setChecked(is_turned)
-
-        def get_autos(key):
-            auto_code, actuator_code = key.split('-')
-            return auto_code, actuator_code, self.gcode.autos[int(auto_code)].is_turn(actuator_code)
-
-        def result_sensors(data):
-            sensor_code, value = data
-            if value is None:
-                self.sensor_widgets[int(sensor_code)].setText('Не удалось получить')
-            else:
-                self.sensor_widgets[int(sensor_code)].setText(str(value))
-
-        def get_sensors(sensor_code):
-            data = sensor_code, self.gcode.sensors[int(sensor_code)].get()
-            return data
+        def result_snapshot(snapshot):
+            if snapshot is None:
+                return
 
-        def result_time(data):
-            self.label_time.setText(f'{data[0]:02}:{data[1]:02}')
+            # копия настроек для окон автоматик, чтобы им не читать гроубокс заново
+            self.growbox_buff.output.output.set_buff(snapshot.to_buff())
+            if snapshot.time is not None:
+                self.label_time.setText(f'{snapshot.time[0]:02}:{snapshot.time[1]:02}')
 
-        def get_time():
-            return self.gcode.get_time()
+            for sensor_code, sensor_widget in self.sensor_widgets.items():
+                value = snapshot.sensors.get(sensor_code)
+                sensor_widget.setText('Не удалось получить' if value is None else str(value))
 
-        def result_actuators(data):
             for actuator_code, actuator_widget in self.actuator_widgets.items():
-                actuator_widget.setText(str(data[actuator_code]))
+                actuator_widget.setText(str(snapshot.actuator_value(actuator_code)))
+
+            for key, checkbox in self.turn_checkboxes.items():
+                auto_code, actuator_code = key.split('-')
+                checkbox.setChecked(snapshot.is_turn(auto_code, actuator_code))
+
+        self.worker_manager.add_and_start_worker(result_snapshot, self.gcode.snapshot)
+
+    def show_sample(self, sample):
+        if sample.channel == 'time':
+            if sample.value is not None:
+                self.label_time.setText(f'{sample.value[0]:02}:{sample.value[1]:02}')
+        elif sample.channel.startswith('sensor_'):
+            sensor_widget = self.sensor_widgets.get(int(sample.channel[7:]))
+            if sensor_widget:
+                sensor_widget.setText('Не удалось получить' if sample.value is None else str(sample.value))
+
+    def poll_telemetry(self):
+        if self.is_closed:
+            return
 
-        def get_actuators():
-            return {actuator_code: actuator.get() for actuator_code, actuator in self.gcode.actuators.items()}
+        def result_poll(samples):
+            # опрос, начатый до закрытия окна, не должен снова запускать таймер: адаптеры уже закрыты
+            if self.is_closed:
+                return
 
-        self.worker_manager.add_and_start_worker(result_time, get_time)
-        self.worker_manager.add_and_start_worker(result_actuators, get_actuators)
+            for sample in samples or []:
+                self.show_sample(sample)
 
-        for sensor_code, sensor in self.gcode.sensors.items():
-            self.worker_manager.add_and_start_worker(result_sensors, get_sensors, sensor.code)
+            self.timer_telemetry.start(int(self.telemetry.delay() * 1000))
 
-        for key, checkbox in self.turn_checkboxes.items():
-            self.worker_manager.add_and_start_worker(result_autos, get_autos, key)
+        self.worker_manager.add_and_start_worker(result_poll, self.telemetry.poll, group=self.telemetry)
 
     def __init__(
             self,
@@ -1056,6 +1139,10 @@ class MainPanelWindow(QMainWindow):
         )
         self.label_time = None
         self.window_time = None
+        self.telemetry = None
+        self.timer_telemetry = QTimer(self)
+        self.timer_telemetry.setSingleShot(True)
+        self.timer_telemetry.timeout.connect(self.poll_telemetry)
 
         self.setWindowTitle('Управляющая программа')
 
@@ -1064,15 +1151,13 @@ class MainPanelWindow(QMainWindow):
         if open_type == 'open' and open_subtype == 'json':
             self.print_to_status_bar(str(file_path), 1)
             with file_path.open() as json_file:
-                self.growbox_buff.output.output.buff = json.load(json_file)
+                self.growbox_buff.output.output.set_buff(json.load(json_file))
                 self.gcode = GrowboxGCodeBuilder(callback_write=self.callback_write)
         elif open_type == 'open' and open_subtype == 'gcode':
             self.print_to_status_bar(str(file_path), 1)
             self.gcode = GrowboxGCodeBuilder(callback_write=self.callback_write)
             with file_path.open() as gcode_file:
-                for gcode_line in gcode_file:
-                    self.growbox_buff.write(gcode_line)
-                    self.growbox_buff.output.output.answer = ''
+                self.growbox_buff.output.output.load_gcode(gcode_file)
         elif open_type == 'create':
             self.print_to_status_bar('Новый файл', 1)
             self.gcode = GrowboxGCodeBuilder(callback_write=self.callback_write)
@@ -1089,6 +1174,8 @@ class MainPanelWindow(QMainWindow):
                 callback_answer=lambda s: self.print_to_log(s, True),
                 callback_write=lambda s: self.callback_write(s, True),
                 need_wait_answer=True,
+                rx_buffer_size=SerialAdapter.RX_BUFFER_SIZE,
+                mirror=StateMirror(ttl=MIRROR_TTL),
             )
             self.objects_to_close.append(serial_adapter)
         elif open_type == 'connect' and open_subtype == 'http':
@@ -1099,6 +1186,7 @@ class MainPanelWindow(QMainWindow):
                 callback_answer=lambda s: self.print_to_log(s, True),
                 callback_write=lambda s: self.callback_write(s, True),
                 need_wait_answer=True,
+                mirror=StateMirror(ttl=MIRROR_TTL),
             )
 
         layout = QVBoxLayout()
@@ -1126,12 +1214,15 @@ class MainPanelWindow(QMainWindow):
         if open_type == 'connect':
             # layout.addWidget(QLabel('Секунд с момента включения:'))
             button_update = QPushButton('Обновить показания')
-            button_update.clicked.connect(lambda s: self.worker_update_from_growbox())
+            button_update.clicked.connect(self.btn_update_clicked)
             layout.addWidget(button_update)
             if open_subtype == 'serial':
                 self.worker_manager.add_and_start_worker(None, self.gcode.output.write, '')
 
             self.worker_update_from_growbox()
+            # показания датчиков и время дальше обновляются сами, занимая не больше пятой части времени линии
+            self.telemetry = TelemetryPoller(self.gcode)
+            self.timer_telemetry.start(int(self.telemetry.delay() * 1000))
 
 
 class SelectSerialPortDialog(QDialog):
@@ -0,0 +1,163 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from sygrowbox.history import HistoryStore, slice_by_time
+
+# окна свёрток: самое длинное не длиннее суток, поэтому окно никогда не попадает в два сегмента истории
+TIERS = {'minute': 60, 'hour': 3600, 'day': 86400}
+PERCENTILES = (5, 50, 95)
+# температура и влажность (Sensor 0 и 1 в GrowboxGCodeBuilder)
+SENSOR_CHANNELS = ('sensor_0', 'sensor_1')
+ROLLUP_DTYPE = np.dtype(
+    [('time', '<f8'), ('count', '<u4'), ('min', '<f4'), ('max', '<f4'), ('mean', '<f4')]
+    + [(f'p{percentile}', '<f4') for percentile in PERCENTILES]
+)
+
+
+def aggregate(records: np.ndarray, window: float) -> np.ndarray:
+    """Сворачивает упорядоченные по времени записи (RECORD_DTYPE) в окна по window секунд.
+
+    Записи без значения (NaN) не учитываются, пустые окна не попадают в результат. Процентили считаются
+    с линейной интерполяцией, как numpy.percentile.
+    """
+    records = records[~np.isnan(records['value'])]
+    if not records.size:
+        return np.empty(0, ROLLUP_DTYPE)
+
+    values = records['value'].astype(np.float64)
+    window_times = records['time'] // window * window
+    # записи упорядочены, поэтому каждое окно - непрерывный кусок
+    starts = np.flatnonzero(np.r_[True, window_times[1:] != window_times[:-1]])
+    counts = np.diff(np.r_[starts, values.size])
+
+    result = np.empty(starts.size, ROLLUP_DTYPE)
+    result['time'] = window_times[starts]
+    result['count'] = counts
+    result['min'] = np.minimum.reduceat(values, starts)
+    result['max'] = np.maximum.reduceat(values, starts)
+    result['mean'] = np.add.reduceat(values, starts) / counts
+
+    # сортировка значений внутри каждого окна одной сортировкой: номер окна плюс значение, сжатое в [0, 1)
+    windows = np.repeat(np.arange(starts.size), counts)
+    value_min = values.min()
+    keys = windows + (values - value_min) / (values.max() - value_min + 1)
+    sorted_values = values[np.argsort(keys)]
+    for percentile in PERCENTILES:
+        positions = starts + (counts - 1) * (percentile / 100)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.minimum(lower + 1, starts + counts - 1)
+        fraction = positions - lower
+        result[f'p{percentile}'] = sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+
+    return result
+
+
+class HistoryRollup:
+    """Заранее посчитанные свёртки истории (TIERS): минимум, максимум, среднее и процентили за минуту, час и сутки.
+
+    Свёртки хранятся рядом с сегментами истории: `<path>/<гроубокс>/<канал>/rollup/<окно>.bin`. В них попадают
+    только закрытые окна: `update()` досчитывает окна, закрывшиеся с прошлого вызова, поэтому его можно вызывать
+    сколько угодно часто. Запрос за год по суточной или часовой свёртке читает лишь нужные записи из отображённого файла.
+    """
+    def __init__(self, store: HistoryStore):
+        self.store = store
+        self.processed_until = {}
+        self.lock = threading.Lock()
+
+    def _tier_path(self, box: str, channel: str, tier: str) -> Path:
+        return self.store.channel_path(box, channel) / 'rollup' / f'{tier}.bin'
+
+    def _load(self, box: str, channel: str, tier: str) -> np.ndarray:
+        path = self._tier_path(box, channel, tier)
+        count = path.stat().st_size // ROLLUP_DTYPE.itemsize if path.exists() else 0
+        if not count:
+            return np.empty(0, ROLLUP_DTYPE)
+
+        return np.memmap(path, ROLLUP_DTYPE, mode='r', shape=(count,))
+
+    def _processed_until(self, box: str, channel: str, tier: str) -> float | None:
+        key = (box, channel, tier)
+        if key not in self.processed_until:
+            rollup = self._load(box, channel, tier)
+            self.processed_until[key] = float(rollup['time'][-1]) + TIERS[tier] if rollup.size else None
+
+        return self.processed_until[key]
+
+    def update(self, box: str, channel: str) -> int:
+        """Досчитывает свёртки по закрытым окнам. Возвращает число добавленных записей свёрток"""
+        count_added = 0
+        with self.lock:
+            time_last = self.store.last_time(box, channel)
+            if time_last is None:
+                return 0
+
+            for tier, window in TIERS.items():
+                time_start = self._processed_until(box, channel, tier)
+                # окно, в которое попала последняя запись, ещё не закрыто
+                time_end = time_last // window * window
+                if time_start is not None and time_start >= time_end:
+                    continue
+
+                path = self._tier_path(box, channel, tier)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.open('ab') as rollup_file:
+                    for chunk in self.store.iter_range(box, channel, time_start, time_end):
+                        rollup = aggregate(chunk, window)
+                        rollup_file.write(rollup.tobytes())
+                        count_added += rollup.size
+
+                self.processed_until[box, channel, tier] = time_end
+
+        return count_added
+
+    def update_all(self, channels=SENSOR_CHANNELS) -> int:
+        return sum(
+            self.update(box, channel)
+            for box in self.store.boxes()
+            for channel in channels if channel in self.store.channels(box)
+        )
+
+    def sensor_subscriber(self, box: str):
+        """Подписчик TelemetryPoller, досчитывающий свёртки по мере поступления показаний.
+
+        Подписывать после `store.sensor_subscriber(box)`, чтобы показание уже было в истории.
+        """
+        def callback(sample):
+            if sample.channel in SENSOR_CHANNELS:
+                self.update(box, sample.channel)
+
+        return callback
+
+    def query(
+            self,
+            box: str,
+            channel: str,
+            tier: str,
+            time_start: float | None = None,
+            time_end: float | None = None,
+            include_open: bool = True,
+    ) -> np.ndarray:
+        """Записи свёртки (ROLLUP_DTYPE) по окнам, начавшимся в [time_start, time_end).
+
+        Если include_open, незакрытые окна (ещё не посчитанные update()) досчитываются по истории на лету.
+        """
+        with self.lock:
+            rollup = slice_by_time(self._load(box, channel, tier), time_start, time_end)
+            processed_until = self._processed_until(box, channel, tier)
+
+        if not include_open:
+            return np.array(rollup)
+
+        window = TIERS[tier]
+        if time_start is not None:
+            # окно, начавшееся раньше time_start, в результат не входит
+            time_start = -(-time_start // window) * window
+
+        open_start = max((value for value in (time_start, processed_until) if value is not None), default=None)
+        if time_end is not None and open_start is not None and open_start >= time_end:
+            return np.array(rollup)
+
+        open_chunks = [aggregate(chunk, window) for chunk in self.store.iter_range(box, channel, open_start, time_end)]
+        return np.concatenate([rollup, *open_chunks])
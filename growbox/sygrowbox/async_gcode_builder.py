@@ -0,0 +1,196 @@
+import asyncio
+import inspect
+from collections import deque
+
+from sygrowbox.gcode_builder import CommandResult, GrowboxGCodeBuilder, WriterInterface
+from sygrowbox.gcode_parser import parse_answer
+from sygrowbox.line_reader import AsyncLineReader
+
+
+class AsyncWriterInterface:
+    """Асинхронный двойник WriterInterface: те же команды и разбор ответов, но без блокировки потока.
+
+    Команды одного гроубокса выполняются по очереди, команды разных гроубоксов - параллельно.
+    """
+    def __init__(
+            self,
+            output,
+            need_wait_answer: bool = False,
+            callback_answer=None,
+            callback_write=None,
+            chunk_size: int = 256,
+            rx_buffer_size: int | None = None,
+            mirror=None,
+            metrics=None,
+    ):
+        self.output = output
+        self.callback_answer = callback_answer
+        self.callback_write = callback_write
+        self.need_wait_answer = need_wait_answer
+        self.mocked_answer = None
+        self.reader = AsyncLineReader(output, chunk_size)
+        self.unfinished_answers = 0
+        self.rx_buffer_size = rx_buffer_size
+        self.lock = asyncio.Lock()
+        self.mirror = mirror
+        self.in_flight_reads = {}
+        self.count_coalesced = 0
+        self.metrics = metrics
+        if metrics is not None:
+            self.reader.clock = metrics.clock
+
+    def mock_answer(self, answer):
+        self.mocked_answer = answer
+
+    async def _write_to_output(self, data: bytes):
+        result = self.output.write(data)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _read_answer(self, timeout=None) -> tuple[bytes, bool]:
+        while self.unfinished_answers:
+            stale_answer, is_complete = await self.reader.read_answer(timeout)
+            if is_complete:
+                self.unfinished_answers -= 1
+            else:
+                if not stale_answer:
+                    self.unfinished_answers = 0
+
+                break
+
+        if self.metrics is not None:
+            self.reader.start_answer()
+
+        answer, is_complete = await self.reader.read_answer(timeout)
+        if not is_complete:
+            self.unfinished_answers += 1
+
+        if self.callback_answer:
+            self.callback_answer(answer)
+
+        return answer, is_complete
+
+    _remember = WriterInterface._remember
+    _now = WriterInterface._now
+    _written_result = WriterInterface._written_result
+    _convert = WriterInterface._convert
+
+    async def _receive_result(self, data: str, timeout=None, time_sent=None, time_written=None) -> CommandResult:
+        result = self._remember(CommandResult(data, *await self._read_answer(timeout)))
+        if self.metrics is not None:
+            self.metrics.record(
+                data, time_sent, time_written, self.reader.time_first_byte, self.metrics.clock(),
+                len(result.answer), result.is_complete,
+            )
+
+        return result
+
+    async def write(self, data: str, timeout=None):
+        answer = None
+        data = f'{data.rstrip()}\n'
+
+        async with self.lock:
+            if self.callback_write:
+                self.callback_write(data)
+
+            if self.mocked_answer:
+                answer = self.mocked_answer
+                self.mocked_answer = None
+            else:
+                time_sent = self._now()
+                await self._write_to_output(data.encode('utf-8'))
+                time_written = self._now()
+                if self.need_wait_answer:
+                    answer = (await self._receive_result(data, timeout, time_sent, time_written)).answer
+                else:
+                    self._written_result(data, time_sent, time_written)
+
+        return answer
+
+    async def stream(self, lines, timeout=None):
+        in_flight = deque()
+        in_flight_bytes = 0
+        async with self.lock:
+            try:
+                for line in lines:
+                    data = f'{line.rstrip()}\n'
+                    encoded_data = data.encode('utf-8')
+                    if self.need_wait_answer and self.rx_buffer_size:
+                        while in_flight and in_flight_bytes + len(encoded_data) > self.rx_buffer_size:
+                            sent_data, sent_size, *times = in_flight.popleft()
+                            in_flight_bytes -= sent_size
+                            yield await self._receive_result(sent_data, timeout, *times)
+
+                    if self.callback_write:
+                        self.callback_write(data)
+
+                    time_sent = self._now()
+                    await self._write_to_output(encoded_data)
+                    time_written = self._now()
+                    if self.need_wait_answer:
+                        in_flight.append((data, len(encoded_data), time_sent, time_written))
+                        in_flight_bytes += len(encoded_data)
+                    else:
+                        yield self._written_result(data, time_sent, time_written)
+
+                while in_flight:
+                    sent_data, _, *times = in_flight.popleft()
+                    yield await self._receive_result(sent_data, timeout, *times)
+            finally:
+                self.unfinished_answers += len(in_flight)
+
+    async def write_many(self, lines, timeout=None) -> list[CommandResult]:
+        return [result async for result in self.stream(lines, timeout)]
+
+    async def write_and_parse(self, data: str, convert=None, timeout=None):
+        # подставленный ответ (execute(answer=...)) должен достаться этому чтению, а не следующей команде
+        if self.mirror is not None and self.need_wait_answer and not self.mocked_answer:
+            answer_lines = self.mirror.get(data)
+            if answer_lines is not None:
+                return convert(answer_lines) if convert else answer_lines
+
+        # такое же чтение уже отправлено другой задачей: ждём его ответа
+        key = data.strip()
+        future = self.in_flight_reads.get(key)
+        if future is None:
+            future = self.in_flight_reads[key] = asyncio.get_running_loop().create_future()
+            try:
+                answer = await self.write(data, timeout)
+                future.set_result(parse_answer(answer) if self.need_wait_answer else None)
+            except BaseException as error:
+                future.set_exception(error)
+                future.exception()  # ошибку получит и сам вызвавший, не только ждущие
+                raise
+            finally:
+                del self.in_flight_reads[key]
+        else:
+            self.count_coalesced += 1
+
+        answer_lines = await asyncio.shield(future)
+        if answer_lines is None:
+            return None
+
+        return self._convert(data, convert, answer_lines) if convert else answer_lines
+
+
+class AsyncGrowboxGCodeBuilder(GrowboxGCodeBuilder):
+    """Асинхронный GrowboxGCodeBuilder: методы возвращают корутины, например `await box.s_temperature.get()`"""
+    WRITER_CLASS = AsyncWriterInterface
+
+    def batch(self):
+        raise TypeError('AsyncWriterInterface не собирает команды в пакеты: используйте `await box.write_many(...)`')
+
+    async def snapshot(self):
+        """Читает все настройки и показания гроубокса, возвращает GrowboxSnapshot"""
+        from sygrowbox.snapshot import read_snapshot_async
+
+        return await read_snapshot_async(self)
+
+    async def refresh(self, only_stale: bool = True) -> int:
+        mirror = self.output.mirror
+        if mirror is None:
+            return 0
+
+        commands = mirror.commands(only_stale)
+        await self.output.write_many(commands)
+        return len(commands)
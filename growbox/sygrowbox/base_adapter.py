@@ -7,3 +7,22 @@ class BaseAdapter:
 
     def read(self, length: int) -> bytes:
         raise NotImplementedError()
+
+    def read_available(self, length: int) -> bytes:
+        """Возвращает уже пришедшие байты (не более length), дожидаясь хотя бы одного"""
+        return self.read(1)
+
+    def flush(self):
+        """Отправляет строки, которые адаптер придержал, чтобы отправить вместе со следующими"""
+
+
+class AsyncBaseAdapter:
+    async def write(self, data: bytes):
+        raise NotImplementedError()
+
+    def close(self):
+        raise NotImplementedError()
+
+    async def read_available(self, length: int, timeout: float | None = None) -> bytes:
+        """Возвращает уже пришедшие байты (не более length) или b'', если за timeout ничего не пришло"""
+        raise NotImplementedError()
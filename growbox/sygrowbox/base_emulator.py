@@ -1,38 +1,139 @@
+import re
+
 from sygrowbox.base_adapter import BaseAdapter
-from sygrowbox.gcode_parser import parse_gcode_line
+from sygrowbox.gcode_parser import CACHE_SIZE, GCodeError, parse_gcode_line
+from sygrowbox.settings import write_target
 
 
 class BaseEmulator(BaseAdapter):
+    HANDLER_NAME_RE = re.compile(r'[a-z]\d+')
+    # команды, которые меняют состояние, только записывая значения (не читая прежних); остальные load_gcode пропускает
+    STATE_COMMANDS = frozenset()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.answer = ''
+        self._answer = ''
+        self.answer_parts = []
+        # обработчики команд (`e1031` для `E1031`), чтобы не искать их getattr'ом на каждой строке
+        self.handlers = {
+            name.upper(): getattr(self, name) for name in dir(type(self)) if self.HANDLER_NAME_RE.fullmatch(name)
+        }
+        self.state_handlers = {
+            command: handler for command, handler in self.handlers.items()
+            if command in self.STATE_COMMANDS
+        }
+
+    @property
+    def answer(self) -> str:
+        # ответ копится частями: склеивать строку на каждый println - квадратичная сложность
+        if self.answer_parts:
+            self._answer = ''.join([self._answer, *self.answer_parts])
+            self.answer_parts.clear()
+
+        return self._answer
+
+    @answer.setter
+    def answer(self, value: str):
+        self._answer = value
+        self.answer_parts.clear()
 
     def println(self, data):
-        self.answer = f'{self.answer}{data}\r\n'
+        self.answer_parts.append(f'{data}\r\n')
 
     def print(self, data):
-        self.answer = f'{self.answer}{data}'
+        self.answer_parts.append(f'{data}')
 
     def comment(self, letter: str, value: float):
         self.println(f'{letter}:{value:.2f}')
 
+    def execute(self, gcode_line: str):
+        """Выполняет одну строку и печатает `ok` или, как и гроубокс, `error` на нераспознанную команду"""
+        if gcode_line.strip():
+            try:
+                g = parse_gcode_line(gcode_line)
+            except GCodeError as error:
+                self.println(f'error: {error}')
+                return
+
+            if g.command:
+                handler = self.handlers.get(g.command)
+                if handler is None:
+                    self.println(f'error: unknown command {g.command}')
+                    return
+
+                handler(g)
+
+        self.println('ok')
+
     def write(self, data: bytes):
-        str_data = data.decode('utf-8')
-        for gcode_line in str_data.split('\n'):
-            if not gcode_line:
-                continue
+        gcode_lines = data.decode('utf-8').split('\n')
+        if len(gcode_lines) > 1 and not gcode_lines[-1]:
+            gcode_lines.pop()
+
+        # как и гроубокс, отвечаем на каждую строку
+        for gcode_line in gcode_lines:
+            self.execute(gcode_line)
 
+    def load_gcode(self, gcode_lines) -> int:
+        """Применяет G-код к состоянию эмулятора, не формируя ответов: например, при открытии файла.
+
+        gcode_lines - строки (str или bytes), в том числе открытый файл, или весь текст целиком. Команды чтения
+        и нераспознанные строки пропускаются, одинаковые строки разбираются один раз. Команды STATE_COMMANDS
+        только записывают значения, поэтому из нескольких записей в одну ячейку выполняется последняя: в порядке
+        последних записей итог тот же, что и при выполнении всех строк подряд.
+        Возвращает число команд, изменивших состояние.
+        """
+        if isinstance(gcode_lines, (str, bytes)):
+            gcode_lines = gcode_lines.splitlines()
+
+        # строка -> (ячейка, обработчик, разобранная строка) или () для пропускаемой строки
+        parsed = {}
+        # ячейка -> последняя запись в неё; словарь упорядочен по последней записи
+        last_writes = {}
+        count_applied = 0
+        for gcode_line in gcode_lines:
+            entry = parsed.get(gcode_line)
+            if entry is None:
+                if len(parsed) >= CACHE_SIZE:
+                    parsed.clear()
+
+                entry = parsed[gcode_line] = self._state_entry(gcode_line)
+
+            if entry:
+                target = entry[0]
+                last_writes.pop(target, None)
+                last_writes[target] = entry
+                count_applied += 1
+
+        for _, handler, g in last_writes.values():
+            handler(g)
+
+        return count_applied
+
+    def _state_entry(self, gcode_line) -> tuple:
+        if not isinstance(gcode_line, str):
+            gcode_line = gcode_line.decode('utf-8')
+
+        try:
             g = parse_gcode_line(gcode_line)
-            func = getattr(self, g.command.lower())
-            if func:
-                func(g)
+        except GCodeError:
+            return ()
 
-        self.println('ok')
+        handler = self.state_handlers.get(g.command)
+        if handler is None:
+            return ()
+
+        # команда без ячейки (например, E3 без параметров) совпадает только с такой же командой
+        target = write_target(gcode_line) or (g.command, *sorted(g.params.items()))
+        return target, handler, g
 
     def read(self, length):
         data_to_return = self.answer[:length]
         self.answer = self.answer[length:]
         return data_to_return.encode('utf-8')
 
+    def read_available(self, length):
+        return self.read(length)
+
     def close(self):
         pass
\ No newline at end of file
@@ -0,0 +1,91 @@
+import re
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from sygrowbox.history import NAME_RE, day_name, day_of
+
+DIRECTION_WRITE = 'write'
+DIRECTION_ANSWER = 'answer'
+
+
+class CommandRecord(NamedTuple):
+    box: str
+    time: float
+    direction: str  # DIRECTION_WRITE или DIRECTION_ANSWER
+    data: str
+
+
+def escape(data: str) -> str:
+    return data.replace('\\', '\\\\').replace('\r', '\\r').replace('\n', '\\n').replace('\t', '\\t')
+
+
+def unescape(data: str) -> str:
+    return re.sub(r'\\(.)', lambda match: {'r': '\r', 'n': '\n', 't': '\t'}.get(match[1], match[1]), data)
+
+
+class CommandLog:
+    """Журнал обмена с гроубоксами: `<path>/<гроубокс>/<ГГГГ-ММ-ДД>.log`, строка на команду или ответ.
+
+    Строка: время Unix, направление и данные через табуляцию; переводы строк в данных экранируются.
+    Подключается вместо callback_write и callback_answer построителя: `write_callback(box)`, `answer_callback(box)`.
+    """
+    def __init__(self, path, clock=time.time):
+        self.path = Path(path)
+        self.clock = clock
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def append(self, box: str, direction: str, data: str | bytes):
+        if not NAME_RE.match(box):
+            raise ValueError(f'invalid box name: {box}')
+
+        if not isinstance(data, str):
+            data = data.decode('utf-8', errors='replace')
+
+        timestamp = self.clock()
+        day = day_of(timestamp)
+        with self.lock:
+            log_day, log_file = self.files.get(box, (None, None))
+            if log_day != day:
+                if log_file:
+                    log_file.close()
+
+                (self.path / box).mkdir(parents=True, exist_ok=True)
+                log_path = self.path / box / f'{day_name(day)}.log'
+                log_file = log_path.open('a', encoding='utf-8', buffering=1)
+                self.files[box] = (day, log_file)
+
+            log_file.write(f'{float(timestamp)!r}\t{direction}\t{escape(data)}\n')
+
+    def write_callback(self, box: str):
+        return lambda data: self.append(box, DIRECTION_WRITE, data)
+
+    def answer_callback(self, box: str):
+        return lambda answer: self.append(box, DIRECTION_ANSWER, answer)
+
+    def close(self):
+        with self.lock:
+            for _, log_file in self.files.values():
+                log_file.close()
+
+            self.files.clear()
+
+    def boxes(self) -> list[str]:
+        return sorted(path.name for path in self.path.iterdir() if path.is_dir()) if self.path.exists() else []
+
+    def iter_records(self, box: str, time_start: float | None = None, time_end: float | None = None):
+        """Записи с time_start <= time < time_end, файл за файлом и строка за строкой"""
+        name_start = None if time_start is None else day_name(day_of(time_start))
+        name_end = None if time_end is None else day_name(day_of(time_end))
+        for log_path in sorted((self.path / box).glob('*.log')):
+            if name_start and log_path.stem < name_start or name_end and log_path.stem > name_end:
+                continue
+
+            with log_path.open(encoding='utf-8') as log_file:
+                for line in log_file:
+                    timestamp, direction, data = line.rstrip('\n').split('\t', 2)
+                    timestamp = float(timestamp)
+                    if (time_start is None or timestamp >= time_start) and (time_end is None or timestamp < time_end):
+                        yield CommandRecord(box, timestamp, direction, unescape(data))
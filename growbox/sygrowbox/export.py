@@ -0,0 +1,180 @@
+import bz2
+import gzip
+import lzma
+import time
+from functools import partial
+from itertools import islice
+from typing import NamedTuple
+
+import numpy as np
+
+from sygrowbox.command_log import CommandLog
+from sygrowbox.history import HistoryStore
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CHUNK_ROWS = 65536  # строк, которые одновременно находятся в памяти
+# уровень 6 у gzip в разы быстрее 9 при почти том же размере
+CSV_OPENERS = {None: open, 'gzip': partial(gzip.open, compresslevel=6), 'bz2': bz2.open, 'xz': lzma.open}
+HISTORY_COLUMNS = ('box', 'channel', 'time', 'datetime', 'value')
+COMMAND_COLUMNS = ('box', 'time', 'datetime', 'direction', 'data')
+
+
+class ExportResult(NamedTuple):
+    count_rows: int
+    duration: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.count_rows / self.duration if self.duration else 0
+
+
+def to_datetimes(times: np.ndarray) -> np.ndarray:
+    """Время Unix в datetime64 (UTC) с миллисекундами: в Parquet это тип timestamp, в CSV - строка ISO 8601"""
+    return (times * 1000).astype('datetime64[ms]')
+
+
+def iter_history_chunks(
+        store: HistoryStore,
+        boxes=None,
+        channels=None,
+        time_start: float | None = None,
+        time_end: float | None = None,
+        chunk_rows: int = CHUNK_ROWS,
+):
+    """Показания из истории кусками не больше chunk_rows строк: словари колонок HISTORY_COLUMNS"""
+    for box in boxes or store.boxes():
+        for channel in store.channels(box):
+            if channels and channel not in channels:
+                continue
+
+            for records in store.iter_range(box, channel, time_start, time_end):
+                for index in range(0, records.size, chunk_rows):
+                    chunk = records[index:index + chunk_rows]
+                    yield {
+                        'box': np.full(chunk.size, box, dtype=object),
+                        'channel': np.full(chunk.size, channel, dtype=object),
+                        'time': np.asarray(chunk['time']),
+                        'datetime': to_datetimes(chunk['time']),
+                        'value': np.asarray(chunk['value']),
+                    }
+
+
+def iter_command_chunks(
+        command_log: CommandLog,
+        boxes=None,
+        directions=None,
+        time_start: float | None = None,
+        time_end: float | None = None,
+        chunk_rows: int = CHUNK_ROWS,
+):
+    """Записи журнала команд кусками не больше chunk_rows строк: словари колонок COMMAND_COLUMNS"""
+    for box in boxes or command_log.boxes():
+        records = (
+            record for record in command_log.iter_records(box, time_start, time_end)
+            if not directions or record.direction in directions
+        )
+        while chunk := list(islice(records, chunk_rows)):
+            times = np.array([record.time for record in chunk])
+            yield {
+                'box': np.full(len(chunk), box, dtype=object),
+                'time': times,
+                'datetime': to_datetimes(times),
+                'direction': np.array([record.direction for record in chunk], dtype=object),
+                'data': np.array([record.data for record in chunk], dtype=object),
+            }
+
+
+def _csv_value(value: str) -> str:
+    if any(char in value for char in ',"\r\n'):
+        return '"{}"'.format(value.replace('"', '""'))
+
+    return value
+
+
+def _csv_column(values: np.ndarray) -> list[str]:
+    """Колонка в строки CSV; строки в кавычки берутся, только если в колонке есть спецсимволы"""
+    if values.dtype == object:
+        values = values.tolist()
+        joined = '\0'.join(values)
+        if any(char in joined for char in ',"\r\n'):
+            return [_csv_value(value) for value in values]
+
+        return values
+
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values, unit='ms').tolist()
+
+    if values.dtype.kind == 'f':
+        # NaN - гроубокс не ответил: пустое значение
+        return np.where(np.isnan(values), '', values.astype(str)).tolist()
+
+    return values.astype(str).tolist()
+
+
+def write_csv(chunks, file_path, columns, compression: str | None = None, callback_progress=None) -> ExportResult:
+    """Пишет куски колонок в CSV; compression - None, 'gzip', 'bz2' или 'xz'"""
+    time_start = time.perf_counter()
+    count_rows = 0
+    with CSV_OPENERS[compression](file_path, 'wt', encoding='utf-8', newline='') as csv_file:
+        csv_file.write(','.join(columns) + '\n')
+        for chunk in chunks:
+            # колонки переводятся в строки целиком, а не по значению
+            text_columns = [_csv_column(chunk[column]) for column in columns]
+            csv_file.write('\n'.join(map(','.join, zip(*text_columns))) + '\n')
+            count_rows += len(chunk[columns[0]])
+            if callback_progress:
+                callback_progress(ExportResult(count_rows, time.perf_counter() - time_start))
+
+    return ExportResult(count_rows, time.perf_counter() - time_start)
+
+
+def write_parquet(chunks, file_path, columns, compression: str | None = 'zstd', callback_progress=None) -> ExportResult:
+    """Пишет куски колонок в Parquet, кусок - группа строк. Нужен pyarrow"""
+    if pyarrow is None:
+        raise RuntimeError('pyarrow is required for Parquet export: pip install pyarrow')
+
+    time_start = time.perf_counter()
+    count_rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pyarrow.table({column: chunk[column] for column in columns})
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(file_path, table.schema, compression=compression or 'none')
+
+            writer.write_table(table)
+            count_rows += table.num_rows
+            if callback_progress:
+                callback_progress(ExportResult(count_rows, time.perf_counter() - time_start))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return ExportResult(count_rows, time.perf_counter() - time_start)
+
+
+def export(chunks, file_path, columns, file_format: str = 'csv', compression: str | None = None, callback_progress=None):
+    if file_format == 'csv':
+        return write_csv(chunks, file_path, columns, compression, callback_progress)
+
+    if file_format == 'parquet':
+        return write_parquet(chunks, file_path, columns, compression, callback_progress)
+
+    raise ValueError(f'unknown export format: {file_format}')
+
+
+def export_history(store: HistoryStore, file_path, file_format='csv', compression=None, callback_progress=None, **filters):
+    """Выгружает показания; filters - boxes, channels, time_start, time_end, chunk_rows (см. iter_history_chunks)"""
+    chunks = iter_history_chunks(store, **filters)
+    return export(chunks, file_path, HISTORY_COLUMNS, file_format, compression, callback_progress)
+
+
+def export_commands(command_log: CommandLog, file_path, file_format='csv', compression=None, callback_progress=None, **filters):
+    """Выгружает журнал команд; filters - boxes, directions, time_start, time_end, chunk_rows"""
+    chunks = iter_command_chunks(command_log, **filters)
+    return export(chunks, file_path, COMMAND_COLUMNS, file_format, compression, callback_progress)
@@ -0,0 +1,99 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from sygrowbox.gcode_builder import GrowboxGCodeBuilder
+
+
+@dataclass()
+class BoxStatus:
+    name: str
+    data: dict = field(default_factory=dict)
+    latency: float = 0
+    error: str | None = None
+
+
+@dataclass()
+class FleetSnapshot:
+    boxes: dict[str, BoxStatus]
+    duration: float = 0
+
+    @property
+    def errors(self) -> dict[str, str]:
+        return {name: status.error for name, status in self.boxes.items() if status.error}
+
+
+def telemetry_or_none(future):
+    try:
+        return future.result()
+    except (IndexError, ValueError):
+        # датчик или часы не ответили
+        return None
+
+
+def poll_growbox(growbox: GrowboxGCodeBuilder) -> dict:
+    """Читает время, датчики, исполнительные устройства и включённость автоматик одного гроубокса за один пакет"""
+    with growbox.batch():
+        time_future = growbox.get_time()
+        sensor_futures = {code: sensor.get() for code, sensor in growbox.sensors.items()}
+        actuator_futures = {code: actuator.get() for code, actuator in growbox.actuators.items()}
+        auto_futures = {
+            auto_code: {actuator_code: auto.is_turn(actuator_code) for actuator_code in growbox.actuators}
+            for auto_code, auto in growbox.autos.items()
+        }
+
+    return {
+        'time': telemetry_or_none(time_future),
+        'sensors': {code: telemetry_or_none(future) for code, future in sensor_futures.items()},
+        'actuators': {code: future.result() for code, future in actuator_futures.items()},
+        'autos': {
+            auto_code: {actuator_code: future.result() for actuator_code, future in futures.items()}
+            for auto_code, futures in auto_futures.items()
+        },
+    }
+
+
+class Fleet:
+    """Множество гроубоксов (через любые адаптеры), опрашиваемых параллельно.
+
+    Каждый гроубокс опрашивается в своём потоке из пула, поэтому опрос всех длится примерно
+    столько же, сколько опрос самого медленного.
+    """
+    def __init__(self, max_workers: int = 64):
+        self.growboxes: dict[str, GrowboxGCodeBuilder] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fleet')
+        self.last_snapshot: FleetSnapshot | None = None
+
+    def add(self, name: str, growbox: GrowboxGCodeBuilder):
+        self.growboxes[name] = growbox
+
+    def remove(self, name: str):
+        return self.growboxes.pop(name, None)
+
+    def _run(self, name: str, task) -> BoxStatus:
+        status = BoxStatus(name)
+        time_start = time.perf_counter()
+        try:
+            status.data = task(self.growboxes[name])
+        except Exception as error:
+            status.error = f'{type(error).__name__}: {error}'
+
+        status.latency = time.perf_counter() - time_start
+        return status
+
+    def run(self, task, names=None) -> FleetSnapshot:
+        """Выполняет task(growbox) для каждого гроубокса параллельно и собирает результаты"""
+        names = list(self.growboxes) if names is None else names
+        time_start = time.perf_counter()
+        futures = {name: self.executor.submit(self._run, name, task) for name in names}
+        boxes = {name: future.result() for name, future in futures.items()}
+        return FleetSnapshot(boxes, time.perf_counter() - time_start)
+
+    def poll(self, names=None) -> FleetSnapshot:
+        self.last_snapshot = self.run(poll_growbox, names)
+        return self.last_snapshot
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for growbox in self.growboxes.values():
+            growbox.output.output.close()
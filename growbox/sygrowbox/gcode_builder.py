@@ -1,7 +1,14 @@
 import sys
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import NamedTuple
 
 from sygrowbox.base_adapter import BaseAdapter
 from sygrowbox.gcode_parser import parse_answer
+from sygrowbox.settings import normalize_getter_command, write_target, written_getter
+from sygrowbox.line_reader import LineReader
 
 # commands = {}
 
@@ -14,8 +21,131 @@ from sygrowbox.gcode_parser import parse_answer
 #     return dec2
 
 
+def answer_to_value(answer_lines):
+    return answer_lines[0][1]
+
+
+def answer_to_int(answer_lines) -> int:
+    return int(answer_lines[0][1])
+
+
+def answer_to_bool(answer_lines) -> bool:
+    return bool(answer_lines[0][1])
+
+
+def answer_to_pair(answer_lines) -> tuple[int, int]:
+    return int(answer_lines[0][1]), int(answer_lines[1][1])
+
+
+def answer_to_ints(answer_lines) -> list[int]:
+    return [int(line[1]) for line in answer_lines]
+
+
+class CommandResult(NamedTuple):
+    command: str
+    answer: bytes | None
+    is_complete: bool
+
+
+class Batch:
+    """Команды, собранные внутри `with writer.batch()`: при выходе из блока отправляются одной записью.
+
+    Вместо ответа методы построителя возвращают Future, который заполняется после отправки.
+    Одинаковые чтения без записи между ними отправляются один раз, из записей в одну ячейку подряд - последняя.
+    """
+    def __init__(self, writer):
+        self.writer = writer
+        # [команда, таймаут, разбирать ли ответ, [(convert, future), ...]]
+        self.commands = []
+        self.read_indexes = {}
+        self.write_indexes = {}
+        # настройки, которые изменят ещё не отправленные записи; None - неизвестно какие
+        self.pending_getters = set()
+
+    def is_pending_write(self, command: str) -> bool:
+        """Изменит ли значение, читаемое командой, запись, ждущая отправки в этом пакете"""
+        return self.pending_getters is None or normalize_getter_command(command) in self.pending_getters
+
+    def add(self, data: str, timeout=None, parse=False, convert=None) -> Future:
+        future = Future()
+        if parse:
+            key = data.strip()
+            index = self.read_indexes.get(key)
+            # запись, прочитанную после неё, нельзя заменить следующей записью
+            self.write_indexes.clear()
+        else:
+            key = write_target(data)
+            index = self.write_indexes.get(key)
+            # после записи то же чтение может вернуть другое значение
+            self.read_indexes.clear()
+            # объединяются только записи подряд: ячейки разных команд могут пересекаться (E252 меняет байты E251),
+            # и поднятая на место первой записи последняя обогнала бы записи между ними.
+            # Без цели (например, E3 без параметров) запись ни с чем не объединяется
+            self.write_indexes.clear()
+            if self.pending_getters is not None:
+                getter = written_getter(data)
+                if getter is None:
+                    self.pending_getters = None
+                else:
+                    self.pending_getters.add(getter)
+
+        if index is None:
+            indexes = self.read_indexes if parse else self.write_indexes
+            if key is not None:
+                indexes[key] = len(self.commands)
+
+            self.commands.append([data, timeout, parse, [(convert, future)]])
+        else:
+            command = self.commands[index]
+            if not parse:
+                command[0] = data
+                command[1] = timeout
+                self.write_indexes[key] = index
+
+            command[3].append((convert, future))
+            self.writer.count_coalesced += 1
+
+        return future
+
+    def flush(self):
+        commands, self.commands = self.commands, []
+        self.read_indexes.clear()
+        self.write_indexes.clear()
+        self.pending_getters = set()
+        if not commands:
+            return
+
+        timeout = max((command[1] for command in commands if command[1]), default=None)
+        results = self.writer.write_joined([command[0] for command in commands], timeout)
+        for (data, _, parse, callers), result in zip(commands, results):
+            for convert, future in callers:
+                if not parse:
+                    future.set_result(result.answer)
+                elif not self.writer.need_wait_answer:
+                    future.set_result(None)
+                else:
+                    try:
+                        answer_lines = parse_answer(result.answer)
+                        future.set_result(convert(answer_lines) if convert else answer_lines)
+                    except Exception as error:
+                        if self.writer.metrics is not None:
+                            self.writer.metrics.record_parse_error(data)
+
+                        future.set_exception(error)
+
+
 class WriterInterface:
-    def __init__(self, output, need_wait_answer: bool = False, callback_answer=None, callback_write=None):
+    def __init__(
+            self,
+            output,
+            need_wait_answer: bool = False,
+            callback_answer=None,
+            callback_write=None,
+            chunk_size: int = 256,
+            rx_buffer_size: int | None = None,
+            mirror=None,
+            metrics=None,
+    ):
         self.output = output
         self.callback_answer = callback_answer
         self.callback_write = callback_write
@@ -24,56 +154,275 @@ class WriterInterface:
         # else:
         self.need_wait_answer = need_wait_answer
         self.mocked_answer = None
+        self.reader = LineReader(output, chunk_size)
+        # количество ответов, не дочитанных до `ok` за таймаут: их хвосты придут раньше ответа на следующую команду
+        self.unfinished_answers = 0
+        # размер приёмного буфера гроубокса; None - буфер не ограничен (HTTP, эмулятор)
+        self.rx_buffer_size = rx_buffer_size
+        # пакет команд у каждого потока свой
+        self.local = threading.local()
+        # StateMirror: копия настроек гроубокса, из которой отдаются ответы на чтение настроек
+        self.mirror = mirror
+        # с гроубоксом одновременно общается только один поток
+        self.lock = threading.RLock()
+        self.state_lock = threading.Lock()
+        # чтения, ответа на которые ещё ждут: такое же чтение из другого потока дождётся того же ответа
+        self.in_flight_reads = {}
+        # последняя запись в каждую ячейку: ожидающая очереди запись, которую уже заменили, не отправляется
+        self.write_generations = {}
+        self.count_coalesced = 0
+        # CommandMetrics: время, байты, таймауты и ошибки разбора по кодам команд
+        self.metrics = metrics
+        if metrics is not None:
+            self.reader.clock = metrics.clock
 
     def mock_answer(self, answer):
         self.mocked_answer = answer
 
-    def _read_until_end(self, count_lines=1, end_byte=b'\n', max_bytes=100):
-        received_bytes = []
-        for _ in range(max_bytes):
-            received_byte = self.output.read(1)
-            if not received_byte:
+    @contextmanager
+    def _timeout(self, timeout):
+        if timeout and hasattr(self.output, 'timeout'):
+            prev_timeout = self.output.timeout
+            self.output.timeout = timeout
+            try:
+                yield
+            finally:
+                self.output.timeout = prev_timeout
+        else:
+            yield
+
+    def _read_answer(self) -> tuple[bytes, bool]:
+        while self.unfinished_answers:
+            stale_answer, is_complete = self.reader.read_answer()
+            if is_complete:
+                self.unfinished_answers -= 1
+            else:
+                if not stale_answer:
+                    # гроубокс молчит - опоздавших ответов больше нет
+                    self.unfinished_answers = 0
+
                 break
 
-            received_bytes.append(received_byte)
-            if received_byte == end_byte:
-                count_lines -= 1
+        if self.metrics is not None:
+            self.reader.start_answer()
 
-            if count_lines == 0:
-                break
+        answer, is_complete = self.reader.read_answer()
+        if not is_complete:
+            self.unfinished_answers += 1
 
-        return b''.join(received_bytes)
+        if self.callback_answer:
+            self.callback_answer(answer)
 
-    def write(self, data: str, count_lines_to_receive=1, timeout=None, max_bytes=100):
-        if timeout and hasattr(self.output, 'timeout'):
-            prev_timeout = self.output.timeout
-            self.output.timeout = timeout
+        return answer, is_complete
 
-        answer = None
-        data = f'{data}\n'
+    def _remember(self, result: CommandResult) -> CommandResult:
+        if self.mirror is not None and result.is_complete:
+            if result.answer is None or result.answer.rstrip().endswith(b'ok'):
+                self.mirror.apply_write(result.command)
 
-        if self.callback_write:
-            self.callback_write(data)
+            if result.answer:
+                self.mirror.put(result.command, parse_answer(result.answer))
 
-        if self.mocked_answer:
-            answer = self.mocked_answer
-            self.mocked_answer = None
-        else:
-            self.output.write(data.encode('utf-8'))
-            if self.need_wait_answer:
-                answer = self._read_until_end(count_lines_to_receive, max_bytes=max_bytes)  # self.output.read(100)
-                # answer = self.output.read(100)
-                if self.callback_answer:
-                    self.callback_answer(answer)
+        return result
 
-        if timeout and hasattr(self.output, 'timeout'):
-            self.output.timeout = prev_timeout
+    def _flush_output(self):
+        """Ответа не ждём, поэтому чтения, при котором адаптер (HttpAdapter) отправил бы придержанные строки,
+        не будет"""
+        flush = getattr(self.output, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def _now(self) -> float | None:
+        return None if self.metrics is None else self.metrics.clock()
+
+    def _receive_result(self, data: str, time_sent=None, time_written=None) -> CommandResult:
+        result = self._remember(CommandResult(data, *self._read_answer()))
+        if self.metrics is not None:
+            self.metrics.record(
+                data, time_sent, time_written, self.reader.time_first_byte, self.metrics.clock(),
+                len(result.answer), result.is_complete,
+            )
+
+        return result
+
+    def _written_result(self, data: str, time_sent=None, time_written=None) -> CommandResult:
+        """Результат команды, ответа на которую не ждём"""
+        if self.metrics is not None:
+            self.metrics.record(data, time_sent, time_written, None, time_written)
+
+        return self._remember(CommandResult(data, None, True))
+
+    def _convert(self, data: str, convert, answer_lines):
+        try:
+            return convert(answer_lines)
+        except (IndexError, ValueError, TypeError):
+            if self.metrics is not None:
+                self.metrics.record_parse_error(data)
+
+            raise
+
+    @contextmanager
+    def batch(self):
+        batch = getattr(self.local, 'batch', None)
+        if batch is not None:
+            # вложенный пакет отправится вместе с внешним
+            yield batch
+            return
+
+        batch = Batch(self)
+        self.local.batch = batch
+        try:
+            yield batch
+        finally:
+            self.local.batch = None
+
+        batch.flush()
+
+    def write(self, data: str, timeout=None):
+        batch = getattr(self.local, 'batch', None)
+        if batch is not None:
+            return batch.add(data, timeout)
+
+        answer = None
+        data = f'{data.rstrip()}\n'
+        target = write_target(data)
+        if target is not None:
+            generation = object()
+            with self.state_lock:
+                self.write_generations[target] = generation
+
+        with self.lock:
+            if target is not None and self.write_generations[target] is not generation:
+                # пока запись ждала очереди, в ту же ячейку записали новое значение
+                self.count_coalesced += 1
+                return None
+
+            if self.callback_write:
+                self.callback_write(data)
+
+            if self.mocked_answer:
+                answer = self.mocked_answer
+                self.mocked_answer = None
+            else:
+                with self._timeout(timeout):
+                    time_sent = self._now()
+                    self.output.write(data.encode('utf-8'))
+                    time_written = self._now()
+                    if self.need_wait_answer:
+                        answer = self._receive_result(data, time_sent, time_written).answer
+                    else:
+                        self._flush_output()
+                        self._written_result(data, time_sent, time_written)
 
         return answer
 
-    def write_and_parse(self, *args, **kwargs):
-        answer = self.write(*args, **kwargs)
-        return parse_answer(answer)
+    def stream(self, lines, timeout=None):
+        """Отправляет строки, не дожидаясь ответа на каждую.
+
+        В гроубоксе одновременно находится не больше `rx_buffer_size` неподтверждённых байт.
+        Ответы сопоставляются с командами по порядку и выдаются как CommandResult.
+        """
+        in_flight = deque()
+        in_flight_bytes = 0
+        with self.lock, self._timeout(timeout):
+            try:
+                for line in lines:
+                    data = f'{line.rstrip()}\n'
+                    encoded_data = data.encode('utf-8')
+                    if self.need_wait_answer and self.rx_buffer_size:
+                        while in_flight and in_flight_bytes + len(encoded_data) > self.rx_buffer_size:
+                            sent_data, sent_size, *times = in_flight.popleft()
+                            in_flight_bytes -= sent_size
+                            yield self._receive_result(sent_data, *times)
+
+                    if self.callback_write:
+                        self.callback_write(data)
+
+                    time_sent = self._now()
+                    self.output.write(encoded_data)
+                    time_written = self._now()
+                    if self.need_wait_answer:
+                        in_flight.append((data, len(encoded_data), time_sent, time_written))
+                        in_flight_bytes += len(encoded_data)
+                    else:
+                        yield self._written_result(data, time_sent, time_written)
+
+                while in_flight:
+                    sent_data, _, *times = in_flight.popleft()
+                    yield self._receive_result(sent_data, *times)
+            finally:
+                # если отправку прервали, ответы на уже отправленные команды ещё придут
+                self.unfinished_answers += len(in_flight)
+                if not self.need_wait_answer:
+                    self._flush_output()
+
+    def write_many(self, lines, timeout=None) -> list[CommandResult]:
+        return list(self.stream(lines, timeout))
+
+    def write_joined(self, lines, timeout=None) -> list[CommandResult]:
+        """Отправляет строки одной записью в адаптер, если приёмный буфер гроубокса не ограничен"""
+        if self.rx_buffer_size:
+            return self.write_many(lines, timeout)
+
+        lines_data = [f'{line.rstrip()}\n' for line in lines]
+        if self.callback_write:
+            for data in lines_data:
+                self.callback_write(data)
+
+        with self.lock, self._timeout(timeout):
+            time_sent = self._now()
+            self.output.write(''.join(lines_data).encode('utf-8'))
+            time_written = self._now()
+            if not self.need_wait_answer:
+                self._flush_output()
+                return [self._written_result(data, time_sent, time_written) for data in lines_data]
+
+            return [self._receive_result(data, time_sent, time_written) for data in lines_data]
+
+    def write_and_parse(self, data: str, convert=None, timeout=None):
+        batch = getattr(self.local, 'batch', None)
+        # копия ещё не знает о записях пакета, которые не отправлены; подставленный ответ (execute(answer=...))
+        # должен достаться этому чтению, а не следующей команде
+        use_mirror = not self.mocked_answer and (batch is None or not batch.is_pending_write(data))
+        if self.mirror is not None and self.need_wait_answer and use_mirror:
+            answer_lines = self.mirror.get(data)
+            if answer_lines is not None:
+                value = convert(answer_lines) if convert else answer_lines
+                if batch is None:
+                    return value
+
+                future = Future()
+                future.set_result(value)
+                return future
+
+        if batch is not None:
+            return batch.add(data, timeout, True, convert)
+
+        key = data.strip()
+        with self.state_lock:
+            future = self.in_flight_reads.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self.in_flight_reads[key] = Future()
+
+        if is_owner:
+            try:
+                answer = self.write(data, timeout)
+                future.set_result(parse_answer(answer) if self.need_wait_answer else None)
+            except BaseException as error:
+                future.set_exception(error)
+                raise
+            finally:
+                with self.state_lock:
+                    del self.in_flight_reads[key]
+        else:
+            self.count_coalesced += 1
+
+        answer_lines = future.result()
+        if answer_lines is None:
+            return None
+
+        return self._convert(data, convert, answer_lines) if convert else answer_lines
 
     # def write2(self, command: str, **kwargs):
     #     args = ' '.join([f'{k.upper()}{v}' for k, v in kwargs.items])
@@ -91,8 +440,7 @@ class Actuator:
         return str(self.code)
 
     def get(self) -> int:
-        answer_lines = self.output.write_and_parse(f'E1 A{self.code}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E1 A{self.code}', answer_to_int)
 
     def set(self, value: int):
         return self.output.write(f'E0 A{self.code} V{value}')
@@ -108,8 +456,7 @@ class Sensor:
         return str(self.code)
 
     def get(self) -> float:
-        answer_lines = self.output.write_and_parse(f'E2 S{self.code}', 2, 2.2)
-        return answer_lines[0][1] if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E2 S{self.code}', answer_to_value, timeout=2.2)
 
 
 class BaseAuto:
@@ -122,8 +469,7 @@ class BaseAuto:
         return self.output.write(f'E3 R{self.CODE} A{actuator} B{int(status)}')
 
     def is_turn(self, actuator: Actuator | int | str) -> bool:
-        answer_lines = self.output.write_and_parse(f'E4 R{self.CODE} A{actuator}', 2)
-        return bool(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E4 R{self.CODE} A{actuator}', answer_to_bool)
 
 
 class AutoCycleHard(BaseAuto):
@@ -137,22 +483,19 @@ class AutoCycleHard(BaseAuto):
     PERIODS = [DAY, NIGHT]
 
     def get_current(self, actuator: Actuator | int | str):
-        answer_lines = self.output.write_and_parse(f'E102 A{actuator}', 3)
-        return (int(answer_lines[0][1]), int(answer_lines[1][1])) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E102 A{actuator}', answer_to_pair)
 
     def set_duration(self, actuator: Actuator | int | str, period: int, duration: int):  # TODO: duration - объект Time
         return self.output.write(f'E101 A{actuator} B{period} D{duration}')
 
     def get_duration(self, actuator: Actuator | int | str, period: int):  # TODO: duration - объект Time
-        answer_lines = self.output.write_and_parse(f'E1011 A{actuator} B{period}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E1011 A{actuator} B{period}', answer_to_int)
 
     def set_value(self, actuator: Actuator | int | str, period: int, value: int):
         return self.output.write(f'E103 A{actuator} B{period} V{value}')
 
     def get_value(self, actuator: Actuator | int | str, period: int):
-        answer_lines = self.output.write_and_parse(f'E1031 A{actuator} B{period}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E1031 A{actuator} B{period}', answer_to_int)
 
 
 class AutoCycleSoft(BaseAuto):
@@ -168,22 +511,19 @@ class AutoCycleSoft(BaseAuto):
     PERIODS = [SUNRISE, DAY, SUNSET, NIGHT]
 
     def get_current(self, actuator: Actuator | int | str):
-        answer_lines = self.output.write_and_parse(f'E152 A{actuator}', 3)
-        return (int(answer_lines[0][1]), int(answer_lines[1][1])) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E152 A{actuator}', answer_to_pair)
 
     def set_duration(self, actuator: Actuator | int | str, period: int, duration: int):  # TODO: duration - объект Time
         return self.output.write(f'E151 A{actuator} P{period} D{duration}')
 
     def get_duration(self, actuator: Actuator | int | str, period: int):  # TODO: duration - объект Time
-        answer_lines = self.output.write_and_parse(f'E1511 A{actuator} P{period}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E1511 A{actuator} P{period}', answer_to_int)
 
     def set_value(self, actuator: Actuator | int | str, period: int, value: int):
         return self.output.write(f'E153 A{actuator} P{period} V{value}')
 
     def get_value(self, actuator: Actuator | int | str, period: int):
-        answer_lines = self.output.write_and_parse(f'E1531 A{actuator} P{period}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E1531 A{actuator} P{period}', answer_to_int)
 
 
 class AutoClimateControl(BaseAuto):
@@ -196,22 +536,19 @@ class AutoClimateControl(BaseAuto):
         return self.output.write(f'E202 A{actuator} V{value}')
 
     def get_min(self, actuator: Actuator | int | str):
-        answer_lines = self.output.write_and_parse(f'E2021 A{actuator}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E2021 A{actuator}', answer_to_int)
 
     def set_max(self, actuator: Actuator | int | str, value: int):
         return self.output.write(f'E203 A{actuator} V{value}')
 
     def get_max(self, actuator: Actuator | int | str):
-        answer_lines = self.output.write_and_parse(f'E2031 A{actuator}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E2031 A{actuator}', answer_to_int)
 
     def set_sensor(self, actuator: Actuator | int | str, sensor: Sensor | int | str):
         return self.output.write(f'E201 A{actuator} S{sensor}')
 
     def get_sensor(self, actuator: Actuator | int | str):
-        answer_lines = self.output.write_and_parse(f'E2011 A{actuator}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E2011 A{actuator}', answer_to_int)
 
 
 class AutoTimer(BaseAuto):
@@ -226,14 +563,9 @@ class AutoTimer(BaseAuto):
         return minutes_bits[index_byte] >> (7 - index_bit_inside_byte) & 1
 
     def get_minute_bits(self, actuator: Actuator | int | str):
-        answer_lines = self.output.write_and_parse(f'E2511 A{actuator}', 13, max_bytes=123)
-        return [int(line[1]) for line in answer_lines] if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E2511 A{actuator}', answer_to_ints)
 
-    def set_minute_bits(self, actuator: Actuator | int | str, byte_index: int, byte_value: int):
-        return self.output.write(f'E251 A{actuator} B{byte_index} V{byte_value}')
-
-    def get_minute_flags(self, actuator: Actuator | int | str):
-        minutes_bits = self.get_minute_bits(actuator)
+    def bits_to_flags(self, minutes_bits):
         if not minutes_bits:
             return
 
@@ -245,6 +577,15 @@ class AutoTimer(BaseAuto):
 
         return minute_flags
 
+    def set_minute_bits(self, actuator: Actuator | int | str, byte_index: int, byte_value: int):
+        return self.output.write(f'E251 A{actuator} B{byte_index} V{byte_value}')
+
+    def get_minute_flags(self, actuator: Actuator | int | str):
+        return self.output.write_and_parse(
+            f'E2511 A{actuator}',
+            lambda answer_lines: self.bits_to_flags(answer_to_ints(answer_lines)),
+        )
+
     def set_minute_flag(self, actuator: Actuator | int | str, hour_index: int, minute_index: None | int, value: bool):
         if minute_index is None:
             return self.output.write(f'E252 A{actuator} H{hour_index} B{int(value)}')
@@ -252,12 +593,12 @@ class AutoTimer(BaseAuto):
             return self.output.write(f'E252 A{actuator} H{hour_index} M{minute_index} B{int(value)}')
 
     def get_minute_flag(self, actuator: Actuator | int | str, hour_index: int, minute_index: int):
-        answer_lines = self.output.write_and_parse(f'E2521 A{actuator} H{hour_index} M{minute_index}', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse(f'E2521 A{actuator} H{hour_index} M{minute_index}', answer_to_int)
 
 
 class GrowboxGCodeBuilder:
     """Генерирует G-код и отправляет в гроубокс"""
+    WRITER_CLASS = WriterInterface
     A_HUMID = 0
     A_EXTRACTOR = 1
     A_WHITE_LIGHT = 2
@@ -268,12 +609,18 @@ class GrowboxGCodeBuilder:
             callback_answer=None,
             callback_write=None,
             need_wait_answer=False,
+            rx_buffer_size=None,
+            mirror=None,
+            metrics=None,
     ):
-        self.output = WriterInterface(
+        self.output = self.WRITER_CLASS(
             output,
             callback_answer=callback_answer,
             callback_write=callback_write,
             need_wait_answer=need_wait_answer,
+            rx_buffer_size=rx_buffer_size,
+            mirror=mirror,
+            metrics=metrics,
         )
 
         self.a_humid = Actuator(self.A_HUMID, self.output)
@@ -317,22 +664,47 @@ class GrowboxGCodeBuilder:
     def set_actuator_value(self, actuator, value: int):
         return self.actuators[actuator].set(value)
 
-    def write(self, gcode_line: str, count_lines=1):
-        return self.output.write(gcode_line, count_lines)
+    def write(self, gcode_line: str):
+        return self.output.write(gcode_line)
+
+    def write_many(self, gcode_lines, timeout=None):
+        return self.output.write_many(gcode_lines, timeout)
+
+    def batch(self):
+        """`with box.batch(): ...` - команды внутри блока уходят в гроубокс одной записью"""
+        return self.output.batch()
+
+    def refresh(self, only_stale: bool = True) -> int:
+        """Перечитывает из гроубокса настройки, хранящиеся в копии (StateMirror), за один конвейерный проход"""
+        mirror = self.output.mirror
+        if mirror is None:
+            return 0
+
+        commands = mirror.commands(only_stale)
+        self.output.write_many(commands)
+        return len(commands)
+
+    def snapshot(self):
+        """Читает все настройки и показания гроубокса за один конвейерный проход, возвращает GrowboxSnapshot"""
+        from sygrowbox.snapshot import read_snapshot
+
+        return read_snapshot(self)
+
+    def invalidate_mirror(self):
+        if self.output.mirror is not None:
+            self.output.mirror.invalidate()
 
     def turn_off_all_autos(self):
         return self.output.write('E3')
 
     def get_time(self): # TODO: отдавать объект Time
-        answer_lines = self.output.write_and_parse('E81', 3)
-        return (int(answer_lines[0][1]), int(answer_lines[1][1])) if self.output.need_wait_answer else None
+        return self.output.write_and_parse('E81', answer_to_pair)
 
     def set_time(self, hours, minutes): # TODO: передавать объект Time
         return self.output.write(f'E8 H{hours} M{minutes}')
 
     def get_time_source(self):
-        answer_lines = self.output.write_and_parse('E91', 2)
-        return int(answer_lines[0][1]) if self.output.need_wait_answer else None
+        return self.output.write_and_parse('E91', answer_to_int)
 
     def set_time_source(self, source_code):
         return self.output.write(f'E9 T{source_code}')
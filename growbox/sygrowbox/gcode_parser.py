@@ -1,7 +1,18 @@
+import re
 from dataclasses import dataclass, field
+from typing import NamedTuple
 
+COMMENT_RE = re.compile(r'\([^)]*\)|;.*')
+CHECKSUM_RE = re.compile(r'^(.*?)\*\s*(\d+)\s*$')
+ANSWER_VALUE_RE = re.compile(r'^\W*([A-Za-z])\s*:\s*(\S+)$')
+CACHE_SIZE = 4096
 
-@dataclass()
+
+class GCodeError(ValueError):
+    pass
+
+
+@dataclass(slots=True)
 class GCodeLine:
     command: str = None
     cletter: str = None
@@ -15,29 +26,166 @@ class GCodeLine:
         return key.upper() in self.params
 
 
-def parse_gcode_line(gcode_line):
-    gcode_parts = gcode_line.split()
-    if not gcode_parts:
-        return GCodeLine(command='', cletter='', cvalue=0)
+def gcode_checksum(gcode_line: str) -> int:
+    checksum = 0
+    for byte in gcode_line.encode('utf-8'):
+        checksum ^= byte
+
+    return checksum
 
-    gcode_parts[0] = gcode_parts[0].upper()
-    gcode_line = GCodeLine(command=gcode_parts[0], cletter=gcode_parts[0][0], cvalue=int(gcode_parts[0][1:]))
-    for part in gcode_parts[1:]:
-        gcode_line.params[part[0].upper()] = int(part[1:])
+
+def _clean_gcode_line(gcode_line: str) -> str:
+    """Убирает комментарии, номер строки и проверяет контрольную сумму: `N12 E0 A1 V5 *93 ; комментарий`"""
+    gcode_line = COMMENT_RE.sub(' ', gcode_line)
+    match = CHECKSUM_RE.match(gcode_line)
+    if match:
+        gcode_line, checksum = match.groups()
+        if gcode_checksum(gcode_line) != int(checksum):
+            raise GCodeError(f'checksum mismatch: {gcode_line.strip()}')
+
+    gcode_line = gcode_line.strip()
+    if gcode_line[:1] in ('N', 'n'):
+        gcode_line = gcode_line.partition(' ')[2]
 
     return gcode_line
 
 
+def _parse_words(gcode_line: str) -> tuple:
+    if ';' in gcode_line or '(' in gcode_line or '*' in gcode_line or gcode_line.lstrip()[:1] in ('N', 'n'):
+        gcode_line = _clean_gcode_line(gcode_line)
+
+    gcode_parts = gcode_line.upper().split()
+    if not gcode_parts:
+        return '', '', 0, {}
+
+    command = gcode_parts[0]
+    try:
+        cvalue = int(command[1:])
+        params = {part[0]: int(part[1:]) for part in gcode_parts[1:]}
+        if not command[0].isalpha() or params and not ''.join(params).isalpha():
+            raise ValueError()
+    except ValueError:
+        raise GCodeError(f'malformed G-code line: {gcode_line.strip()}') from None
+
+    return command, command[0], cvalue, params
+
+
+# разобранные строки: в логах команд одни и те же строки повторяются тысячи раз
+_parsed_words = {}
+
+
+def parse_gcode_line(gcode_line):
+    words = _parsed_words.get(gcode_line)
+    if words is None:
+        words = _parse_words(gcode_line)
+        if len(_parsed_words) >= CACHE_SIZE:
+            _parsed_words.clear()
+
+        _parsed_words[gcode_line] = words
+
+    command, cletter, cvalue, params = words
+    return GCodeLine(command, cletter, cvalue, params.copy())
+
+
+def iter_gcode_lines(buffer):
+    """Лениво разбирает буфер (str или bytes) из многих строк, пропуская пустые строки и строки-комментарии"""
+    if not isinstance(buffer, str):
+        buffer = buffer.decode('utf-8')
+
+    for gcode_line in buffer.splitlines():
+        g = parse_gcode_line(gcode_line)
+        if g.command:
+            yield g
+
+
+class AnswerValue(NamedTuple):
+    """Строка ответа `X:value`; value равно None для `NAN`"""
+    letter: str
+    value: float | None
+
+
+class AnswerEnd(NamedTuple):
+    """`ok` или `error...` - ответ на команду завершён"""
+    is_error: bool = False
+    message: str = ''
+
+
+class AnswerMessage(NamedTuple):
+    """Строка, которую не удалось разобрать как значение: например, сообщение прошивки при запуске"""
+    text: str
+
+
+def decode_answer_line(line: bytes | str) -> AnswerValue | AnswerEnd | AnswerMessage | None:
+    """Разбирает одну строку ответа гроубокса, никогда не бросая исключений. Для пустой строки возвращает None"""
+    if not isinstance(line, str):
+        line = line.decode('utf-8', errors='replace')
+
+    line = line.strip()
+    if not line:
+        return None
+
+    if line == 'ok':
+        return AnswerEnd()
+
+    if line.startswith('error'):
+        return AnswerEnd(True, line[5:].lstrip(' :'))
+
+    match = ANSWER_VALUE_RE.match(line)
+    if match:
+        letter, value = match.groups()
+        if value.upper() == 'NAN':
+            return AnswerValue(letter, None)
+
+        try:
+            return AnswerValue(letter, float(value))
+        except ValueError:
+            pass
+
+    return AnswerMessage(line)
+
+
+class AnswerDecoder:
+    """Разбирает ответы гроубокса по мере поступления байтов.
+
+    `feed(data)` принимает любой кусок (хоть половину строки) и возвращает события по завершённым строкам:
+    AnswerValue, AnswerMessage и AnswerEnd. Неполная строка ждёт следующего куска.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def _decode_lines(self, lines) -> list:
+        events = []
+        for line in lines:
+            event = decode_answer_line(line)
+            if event is not None:
+                events.append(event)
+
+        return events
+
+    def feed(self, data: bytes | str) -> list:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        self.buffer += data
+        index = self.buffer.rfind(b'\n')
+        if index == -1:
+            return []
+
+        lines = self.buffer[:index].split(b'\n')
+        del self.buffer[:index + 1]
+        return self._decode_lines(lines)
+
+    def flush(self) -> list:
+        """Разбирает остаток без перевода строки, например, когда данных больше не будет"""
+        lines, self.buffer = [self.buffer], bytearray()
+        return self._decode_lines(lines)
+
+
 def parse_answer(answer):
-    values = []
-    if answer:
-        if not isinstance(answer, str):
-            answer = answer.decode('utf-8')
-
-        answer_lines = answer.strip().split('\r\n')[:-1]
-        for line in answer_lines:
-            value = line[2:].strip()
-            value = None if value.upper() == 'NAN' else float(value)
-            values.append((line[1], value))
-
-    return values
+    """Значения `(буква, значение)` из полного ответа. Строки, не похожие на значения, пропускаются"""
+    if not answer:
+        return []
+
+    decoder = AnswerDecoder()
+    events = decoder.feed(answer) + decoder.flush()
+    return [event for event in events if isinstance(event, AnswerValue)]
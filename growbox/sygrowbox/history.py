@@ -0,0 +1,261 @@
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from sygrowbox.gcode_parser import GCodeError, parse_gcode_line
+
+# запись истории: время Unix и значение (NaN - гроубокс не ответил)
+RECORD_DTYPE = np.dtype([('time', '<f8'), ('value', '<f4')])
+SECONDS_PER_DAY = 86400
+# имя гроубокса или канала становится именем каталога: `.` и `..` вывели бы запись за пределы хранилища
+NAME_RE = re.compile(r'^(?!\.+\Z)[\w.-]+\Z')
+
+
+def day_of(timestamp: float) -> int:
+    return int(timestamp // SECONDS_PER_DAY)
+
+
+def day_name(day: int) -> str:
+    return f'{datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc):%Y-%m-%d}'
+
+
+def segment_name(day: int) -> str:
+    return f'{day_name(day)}.bin'
+
+
+def load_segment(path: Path) -> np.ndarray:
+    """Отображает файл сегмента в память, не читая его. Недописанная последняя запись отбрасывается"""
+    count = path.stat().st_size // RECORD_DTYPE.itemsize
+    if not count:
+        return np.empty(0, RECORD_DTYPE)
+
+    return np.memmap(path, RECORD_DTYPE, mode='r', shape=(count,))
+
+
+def slice_by_time(records: np.ndarray, time_start: float | None, time_end: float | None) -> np.ndarray:
+    """Записи с time_start <= time < time_end; записи упорядочены по времени, поэтому поиск двоичный"""
+    times = records['time']
+    index_start = 0 if time_start is None else np.searchsorted(times, time_start, 'left')
+    index_end = len(records) if time_end is None else np.searchsorted(times, time_end, 'left')
+    return records[index_start:index_end]
+
+
+class ChannelWriter:
+    """Дописывает записи одного канала в сегмент текущего дня, накапливая их в массиве"""
+    def __init__(self, path: Path, buffer_size: int):
+        self.path = path
+        self.buffer = np.empty(buffer_size, RECORD_DTYPE)
+        self.count_buffered = 0
+        self.day = None
+        self.file = None
+        self.last_time = None
+        segments = sorted(path.glob('*.bin'))
+        if segments:
+            records = load_segment(segments[-1])
+            if records.size:
+                self.last_time = float(records['time'][-1])
+
+    def flush(self):
+        if self.count_buffered:
+            self.file.write(self.buffer[:self.count_buffered].tobytes())
+            self.file.flush()
+            self.count_buffered = 0
+
+    def close(self):
+        self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def open(self, day: int):
+        self.close()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.file = (self.path / segment_name(day)).open('ab')
+        # недописанную запись (например, после сбоя питания) отрезаем, чтобы не сдвинуть следующие
+        size = self.file.tell()
+        if size % RECORD_DTYPE.itemsize:
+            self.file.truncate(size - size % RECORD_DTYPE.itemsize)
+
+        self.day = day
+
+    def append(self, timestamp: float, value: float):
+        day = day_of(timestamp)
+        if day != self.day:
+            self.open(day)
+
+        self.buffer[self.count_buffered] = (timestamp, value)
+        self.count_buffered += 1
+        self.last_time = timestamp
+        if self.count_buffered == len(self.buffer):
+            self.flush()
+
+    def append_records(self, records: np.ndarray):
+        """Дописывает упорядоченные записи, разбивая их по суткам"""
+        self.flush()
+        days = (records['time'] // SECONDS_PER_DAY).astype(np.int64)
+        for day_records in np.split(records, np.flatnonzero(np.diff(days)) + 1):
+            day = day_of(day_records['time'][0])
+            if day != self.day:
+                self.open(day)
+
+            self.file.write(day_records.tobytes())
+
+        self.file.flush()
+        self.last_time = float(records['time'][-1])
+
+
+class HistoryStore:
+    """История показаний на диске: `<path>/<гроубокс>/<канал>/<ГГГГ-ММ-ДД>.bin`.
+
+    Сегмент - это массив записей фиксированной ширины (RECORD_DTYPE, 12 байт) за сутки UTC, только дописываемый.
+    Запросы отображают сегменты в память (numpy.memmap) и находят диапазон двоичным поиском, поэтому
+    история за месяцы не читается в память целиком. Сегменты старше retention_days удаляются.
+
+    Подключается подписчиком к TelemetryPoller (`sensor_subscriber`) и к callback_write построителя
+    (`write_subscriber`), чтобы записывать изменения исполнительных устройств.
+    """
+    BUFFER_SIZE = 256  # записей канала, которые копятся перед записью в файл
+
+    def __init__(self, path, retention_days: int | None = None):
+        self.path = Path(path)
+        self.retention_days = retention_days
+        self.writers = {}
+        self.count_rejected = 0
+        self.lock = threading.RLock()
+
+    def channel_path(self, box: str, channel: str) -> Path:
+        if not NAME_RE.match(box) or not NAME_RE.match(channel):
+            raise ValueError(f'invalid box or channel name: {box}/{channel}')
+
+        return self.path / box / channel
+
+    def _writer(self, box: str, channel: str) -> ChannelWriter:
+        writer = self.writers.get((box, channel))
+        if writer is None:
+            writer = self.writers[box, channel] = ChannelWriter(self.channel_path(box, channel), self.BUFFER_SIZE)
+
+        return writer
+
+    def append(self, box: str, channel: str, timestamp: float, value: float | None):
+        """Добавляет запись. Запись старше последней в канале отбрасывается (count_rejected): сегменты только дописываются"""
+        with self.lock:
+            writer = self._writer(box, channel)
+            if writer.last_time is not None and timestamp < writer.last_time:
+                self.count_rejected += 1
+                return
+
+            day = writer.day
+            writer.append(timestamp, np.nan if value is None else value)
+            if day is not None and writer.day != day:
+                # начались новые сутки
+                self.apply_retention(timestamp)
+
+    def append_many(self, box: str, channel: str, timestamps, values):
+        """Добавляет массивы записей, упорядоченных по времени"""
+        records = np.empty(len(timestamps), RECORD_DTYPE)
+        records['time'] = timestamps
+        records['value'] = values
+        with self.lock:
+            writer = self._writer(box, channel)
+            if writer.last_time is not None:
+                is_new = records['time'] >= writer.last_time
+                self.count_rejected += int(np.count_nonzero(~is_new))
+                records = records[is_new]
+
+            if records.size:
+                writer.append_records(records)
+
+    def flush(self):
+        with self.lock:
+            for writer in self.writers.values():
+                writer.flush()
+
+    def close(self):
+        with self.lock:
+            for writer in self.writers.values():
+                writer.close()
+
+            self.writers.clear()
+
+    def last_time(self, box: str, channel: str) -> float | None:
+        """Время последней записи канала"""
+        with self.lock:
+            return self._writer(box, channel).last_time
+
+    def boxes(self) -> list[str]:
+        return sorted(path.name for path in self.path.iterdir() if path.is_dir()) if self.path.exists() else []
+
+    def channels(self, box: str) -> list[str]:
+        box_path = self.path / box
+        return sorted(path.name for path in box_path.iterdir() if path.is_dir()) if box_path.exists() else []
+
+    def segments(self, box: str, channel: str, time_start: float | None = None, time_end: float | None = None):
+        """Файлы сегментов канала, которые пересекаются с диапазоном, по порядку"""
+        channel_path = self.channel_path(box, channel)
+        names = sorted(path.name for path in channel_path.glob('*.bin'))
+        name_start = None if time_start is None else segment_name(day_of(time_start))
+        name_end = None if time_end is None else segment_name(day_of(time_end))
+        return [
+            channel_path / name for name in names
+            if (name_start is None or name >= name_start) and (name_end is None or name <= name_end)
+        ]
+
+    def iter_range(self, box: str, channel: str, time_start: float | None = None, time_end: float | None = None):
+        """Записи диапазона кусками по сегментам (отображениями файлов, без копирования)"""
+        with self.lock:
+            writer = self.writers.get((box, channel))
+            if writer:
+                writer.flush()
+
+        for path in self.segments(box, channel, time_start, time_end):
+            records = slice_by_time(load_segment(path), time_start, time_end)
+            if records.size:
+                yield records
+
+    def query(self, box: str, channel: str, time_start: float | None = None, time_end: float | None = None) -> np.ndarray:
+        """Записи с time_start <= time < time_end одним массивом RECORD_DTYPE"""
+        chunks = list(self.iter_range(box, channel, time_start, time_end))
+        return np.concatenate(chunks) if chunks else np.empty(0, RECORD_DTYPE)
+
+    def apply_retention(self, now: float | None = None) -> int:
+        """Удаляет сегменты старше retention_days. Возвращает число удалённых файлов"""
+        if self.retention_days is None:
+            return 0
+
+        day_first = day_of(time.time() if now is None else now) - self.retention_days
+        name_first = segment_name(day_first)
+        count_removed = 0
+        with self.lock:
+            for box in self.boxes():
+                for channel in self.channels(box):
+                    for path in self.channel_path(box, channel).glob('*.bin'):
+                        if path.name < name_first:
+                            path.unlink()
+                            count_removed += 1
+
+        return count_removed
+
+    def sensor_subscriber(self, box: str):
+        """Подписчик TelemetryPoller: `poller.subscribe(store.sensor_subscriber('box1'))`"""
+        def callback(sample):
+            if sample.channel.startswith('sensor_'):
+                self.append(box, sample.channel, sample.timestamp or time.time(), sample.value)
+
+        return callback
+
+    def write_subscriber(self, box: str, clock=time.time):
+        """callback_write построителя: записывает в канал `actuator_<код>` значения, отправленные командой E0"""
+        def callback(data: str):
+            try:
+                g = parse_gcode_line(data)
+            except GCodeError:
+                return
+
+            if g.command == 'E0' and 'A' in g and 'V' in g:
+                self.append(box, f'actuator_{g["A"]}', clock(), g['V'])
+
+        return callback
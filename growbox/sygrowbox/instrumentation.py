@@ -0,0 +1,197 @@
+"""Замеры обмена с гроубоксом по кодам команд: сколько времени уходит на отправку, до первого байта ответа
+и до `ok`, сколько байт ушло и пришло, сколько ответов не дождались и сколько не удалось разобрать.
+
+Подключается к построителю: `GrowboxGCodeBuilder(adapter, need_wait_answer=True, metrics=CommandMetrics())`.
+Время копится в гистограммах с корзинами фиксированных границ, поэтому запись - несколько операций
+над списком, а память не растёт с числом команд: замеры можно не выключать.
+"""
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+
+# границы корзин: HISTOGRAM_MIN * 2 ** (номер / BUCKETS_PER_DOUBLING), от 10 мкс до ~40 с
+HISTOGRAM_MIN = 1e-5
+BUCKETS_PER_DOUBLING = 4
+COUNT_BUCKETS = 22 * BUCKETS_PER_DOUBLING + 1
+PERCENTILES = (50, 90, 99)
+
+
+def bucket_bound(index: int) -> float:
+    """Верхняя граница корзины"""
+    return HISTOGRAM_MIN * 2 ** (index / BUCKETS_PER_DOUBLING)
+
+
+def bucket_index(seconds: float) -> int:
+    if seconds <= HISTOGRAM_MIN:
+        return 0
+
+    return min(math.ceil(math.log2(seconds / HISTOGRAM_MIN) * BUCKETS_PER_DOUBLING), COUNT_BUCKETS - 1)
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей в секундах. Процентили точны до корзины: не хуже 19 %"""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * COUNT_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bucket_index(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, percentile: float) -> float:
+        """Верхняя граница корзины, в которую попал процентиль (но не больше максимума)"""
+        if not self.count:
+            return 0
+
+        rank = self.count * percentile / 100
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if count and cumulative >= rank:
+                return min(bucket_bound(index), self.max)
+
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'max': self.max,
+            **{f'p{percentile}': self.percentile(percentile) for percentile in PERCENTILES},
+            # непустые корзины: верхняя граница -> число
+            'buckets': {f'{bucket_bound(index):.6g}': count for index, count in enumerate(self.counts) if count},
+        }
+
+
+@dataclass()
+class CommandStats:
+    count: int = 0
+    count_timeouts: int = 0  # ответ не дочитан до `ok` за таймаут
+    count_parse_errors: int = 0  # ответ пришёл, но значение из него не получилось
+    bytes_out: int = 0
+    bytes_in: int = 0
+    send: LatencyHistogram = field(default_factory=LatencyHistogram)  # запись в адаптер
+    first_byte: LatencyHistogram = field(default_factory=LatencyHistogram)  # от отправки до первого байта ответа
+    total: LatencyHistogram = field(default_factory=LatencyHistogram)  # от отправки до конца ответа
+
+    def merge(self, other: 'CommandStats'):
+        self.count += other.count
+        self.count_timeouts += other.count_timeouts
+        self.count_parse_errors += other.count_parse_errors
+        self.bytes_out += other.bytes_out
+        self.bytes_in += other.bytes_in
+        self.send.merge(other.send)
+        self.first_byte.merge(other.first_byte)
+        self.total.merge(other.total)
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'count_timeouts': self.count_timeouts,
+            'count_parse_errors': self.count_parse_errors,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'send': self.send.to_dict(),
+            'first_byte': self.first_byte.to_dict(),
+            'total': self.total.to_dict(),
+        }
+
+
+def command_code(data: str) -> str:
+    """`E2` для `E2 S0\\n`"""
+    return data.lstrip().partition(' ')[0].rstrip().upper()
+
+
+class CommandMetrics:
+    """Замеры по кодам команд (`E2`, `E1031`, ...). Один экземпляр можно подключить к нескольким построителям.
+
+    Время first_byte включает ожидание в самом адаптере: у HttpAdapter запрос уходит при чтении ответа,
+    поэтому накладные расходы HTTP видны как разница между first_byte и временем ответа гроубокса.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.commands: dict[str, CommandStats] = {}
+        self.lock = threading.Lock()
+        self.time_start = clock()
+
+    def record(
+            self,
+            data: str,
+            time_sent: float,
+            time_written: float,
+            time_first_byte: float | None,
+            time_done: float,
+            bytes_in: int = 0,
+            is_complete: bool = True,
+    ):
+        """Одна команда: время отправки, окончания записи в адаптер, первого байта ответа (None - ответа
+        не было) и окончания ответа по clock"""
+        code = command_code(data)
+        with self.lock:
+            stats = self.commands.get(code)
+            if stats is None:
+                stats = self.commands[code] = CommandStats()
+
+            stats.count += 1
+            stats.bytes_out += len(data)
+            stats.bytes_in += bytes_in
+            stats.send.record(time_written - time_sent)
+            if time_first_byte is not None:
+                stats.first_byte.record(max(time_first_byte - time_sent, 0))
+
+            stats.total.record(time_done - time_sent)
+            if not is_complete:
+                stats.count_timeouts += 1
+
+    def record_parse_error(self, data: str):
+        code = command_code(data)
+        with self.lock:
+            stats = self.commands.get(code)
+            if stats is None:
+                stats = self.commands[code] = CommandStats()
+
+            stats.count_parse_errors += 1
+
+    def totals(self) -> CommandStats:
+        """Все команды вместе"""
+        totals = CommandStats()
+        with self.lock:
+            for stats in self.commands.values():
+                totals.merge(stats)
+
+        return totals
+
+    def snapshot(self) -> dict:
+        """Копия замеров: `{'duration': секунд с начала, 'commands': {код: {...}}}`"""
+        with self.lock:
+            commands = {code: stats.to_dict() for code, stats in sorted(self.commands.items())}
+
+        return {'duration': self.clock() - self.time_start, 'commands': commands}
+
+    def dump(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as dump_file:
+            json.dump(self.snapshot(), dump_file, indent=2)
+
+    def reset(self):
+        with self.lock:
+            self.commands = {}
+            self.time_start = self.clock()
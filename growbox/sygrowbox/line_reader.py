@@ -0,0 +1,120 @@
+import inspect
+
+from sygrowbox.gcode_parser import AnswerEnd, decode_answer_line
+
+
+def is_answer_end(line: bytes) -> bool:
+    """Строка `ok` (или `error...`) завершает ответ гроубокса на команду"""
+    return isinstance(decode_answer_line(line), AnswerEnd)
+
+
+class LineReader:
+    """Читает байты из адаптера пачками и выдаёт целые строки, оканчивающиеся на `\\r\\n`.
+
+    Байты, прочитанные сверх текущего ответа, остаются в буфере для следующей команды.
+    """
+    def __init__(self, output, chunk_size: int = 256):
+        self.output = output
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        # часы CommandMetrics: если заданы, запоминается время первого байта текущего ответа
+        self.clock = None
+        self.time_first_byte = None
+
+    def start_answer(self):
+        """Начало ожидания ответа. Байты, уже лежащие в буфере, считаются пришедшими сейчас"""
+        self.time_first_byte = self.clock() if self.buffer else None
+
+    def read_chunk(self) -> bytes:
+        read_available = getattr(self.output, 'read_available', None)
+        if read_available:
+            return read_available(self.chunk_size)
+
+        # например, serial.Serial, переданный напрямую
+        in_waiting = getattr(self.output, 'in_waiting', 0)
+        return self.output.read(min(max(in_waiting, 1), self.chunk_size))
+
+    def feed(self, data: bytes):
+        self.buffer += data
+
+    def pop_line(self) -> bytes | None:
+        index = self.buffer.find(b'\n')
+        if index == -1:
+            return None
+
+        line = bytes(self.buffer[:index + 1])
+        del self.buffer[:index + 1]
+        return line
+
+    def read_line(self) -> bytes | None:
+        """Возвращает строку целиком или None, если адаптер перестал отдавать данные (таймаут)"""
+        line = self.pop_line()
+        while line is None:
+            chunk = self.read_chunk()
+            if not chunk:
+                return None
+
+            if self.clock is not None and self.time_first_byte is None:
+                self.time_first_byte = self.clock()
+
+            self.feed(chunk)
+            line = self.pop_line()
+
+        return line
+
+    def read_answer(self) -> tuple[bytes, bool]:
+        """Читает строки до `ok`. Возвращает ответ и признак того, что ответ получен полностью"""
+        lines = []
+        while True:
+            line = self.read_line()
+            if line is None:
+                return b''.join(lines), False
+
+            lines.append(line)
+            if is_answer_end(line):
+                return b''.join(lines), True
+
+    def clear(self):
+        self.buffer.clear()
+
+
+class AsyncLineReader(LineReader):
+    """То же, что LineReader, но для асинхронных адаптеров (AsyncBaseAdapter).
+
+    Синхронные адаптеры, которые не блокируют чтение (эмуляторы), тоже поддерживаются.
+    """
+    def __init__(self, output, chunk_size: int = 256):
+        super().__init__(output, chunk_size)
+        self.is_async_output = inspect.iscoroutinefunction(getattr(output, 'read_available', None))
+
+    async def read_chunk(self, timeout=None) -> bytes:
+        if self.is_async_output:
+            return await self.output.read_available(self.chunk_size, timeout)
+
+        return super().read_chunk()
+
+    async def read_line(self, timeout=None) -> bytes | None:
+        line = self.pop_line()
+        while line is None:
+            chunk = await self.read_chunk(timeout)
+            if not chunk:
+                return None
+
+            if self.clock is not None and self.time_first_byte is None:
+                self.time_first_byte = self.clock()
+
+            self.feed(chunk)
+            line = self.pop_line()
+
+        return line
+
+    async def read_answer(self, timeout=None) -> tuple[bytes, bool]:
+        lines = []
+        while True:
+            line = await self.read_line(timeout)
+            if line is None:
+                return b''.join(lines), False
+
+            lines.append(line)
+            if is_answer_end(line):
+                return b''.join(lines), True
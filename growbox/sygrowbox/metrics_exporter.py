@@ -0,0 +1,285 @@
+"""Метрики гроубоксов в текстовом формате Prometheus: `GET /metrics` на локальном порту или Unix-сокете.
+
+Всё отдаётся из памяти: счётчики WriterInterface и CommandMetrics, последний опрос Fleet, очереди заданий
+и последние показания TelemetryPoller. Запрос метрик не обращается к гроубоксу и не берёт блокировку порта,
+поэтому частый сбор метрик не мешает обмену.
+
+    exporter = MetricsExporter()
+    exporter.add_growbox('box1', gcode)
+    exporter.add_queue('gui', workers_manager.queue)
+    poller.subscribe(exporter.telemetry_subscriber('box1'))
+    exporter.serve(port=9105)
+"""
+import math
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sygrowbox.instrumentation import BUCKETS_PER_DOUBLING, COUNT_BUCKETS, LatencyHistogram, bucket_bound
+from sygrowbox.scheduler import JobQueue
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# границы `le` гистограмм: каждое удвоение, а не все корзины LatencyHistogram, чтобы рядов было немного.
+# В последнюю корзину LatencyHistogram попадает и всё, что длиннее её границы, поэтому она входит только в `+Inf`
+EXPORT_BUCKETS = tuple(range(0, COUNT_BUCKETS - 1, BUCKETS_PER_DOUBLING))
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value) -> str:
+    if value is None:
+        return 'NaN'
+
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+
+    return repr(int(value)) if value.is_integer() and abs(value) < 2 ** 53 else repr(value)
+
+
+class MetricFamily:
+    """Метрика с описанием и типом и её ряды `(суффикс имени, метки, значение)`"""
+    def __init__(self, name: str, metric_type: str, help_text: str):
+        self.name = name
+        self.metric_type = metric_type
+        self.help_text = help_text
+        self.samples = []
+
+    def add(self, labels: dict, value, suffix: str = ''):
+        self.samples.append((suffix, labels, value))
+
+    def add_histogram(self, labels: dict, histogram: LatencyHistogram):
+        counts = histogram.counts
+        cumulative = 0
+        previous = 0
+        for index in EXPORT_BUCKETS:
+            cumulative += sum(counts[previous:index + 1])
+            previous = index + 1
+            self.add({**labels, 'le': f'{bucket_bound(index):.6g}'}, cumulative, '_bucket')
+
+        self.add({**labels, 'le': '+Inf'}, histogram.count, '_bucket')
+        self.add(labels, histogram.total, '_sum')
+        self.add(labels, histogram.count, '_count')
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.metric_type}']
+        for suffix, labels, value in self.samples:
+            labels_text = ','.join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+            lines.append(f'{self.name}{suffix}{{{labels_text}}} {format_value(value)}')
+
+        return lines
+
+
+class MetricsExporter:
+    """Собирает метрики из зарегистрированных источников и отдаёт их в формате Prometheus.
+
+    Готовый текст кэшируется на cache_seconds: частые запросы не пересчитывают метрики заново.
+    """
+    def __init__(self, cache_seconds: float = 1, clock=time.monotonic):
+        self.cache_seconds = cache_seconds
+        self.clock = clock
+        self.growboxes = {}
+        self.fleets = []
+        self.queues = {}
+        # последние показания опросчиков {(гроубокс, канал): Sample}
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.cached_text = None
+        self.cached_time = None
+        self.servers = []
+
+    def add_growbox(self, box: str, growbox):
+        """Гроубокс (GrowboxGCodeBuilder): счётчики его WriterInterface и CommandMetrics, если они подключены"""
+        self.growboxes[box] = growbox
+
+    def add_fleet(self, fleet):
+        """Fleet: доступность, время опроса, датчики и устройства гроубоксов из последнего `poll()`"""
+        self.fleets.append(fleet)
+
+    def add_queue(self, name: str, queue: JobQueue):
+        """Очередь заданий, например, `SerialWorkersManager.queue`"""
+        self.queues[name] = queue
+
+    def telemetry_subscriber(self, box: str):
+        """Подписчик TelemetryPoller: запоминает последнее показание каждого канала"""
+        def callback(sample):
+            self.samples[box, sample.channel] = sample
+
+        return callback
+
+    def collect(self) -> list[MetricFamily]:
+        families = {}
+
+        def family(name, metric_type, help_text):
+            if name not in families:
+                families[name] = MetricFamily(name, metric_type, help_text)
+
+            return families[name]
+
+        for box, growbox in list(self.growboxes.items()):
+            self._collect_growbox(family, box, growbox)
+
+        for fleet in self.fleets:
+            self._collect_fleet(family, fleet)
+
+        for name, queue in list(self.queues.items()):
+            self._collect_queue(family, name, queue)
+
+        for (box, channel), sample in list(self.samples.items()):
+            labels = {'box': box, 'channel': channel}
+            # часы гроубокса (пара часы-минуты) и другие нечисловые показания не выгружаются
+            if sample.value is None or isinstance(sample.value, (int, float)):
+                family('growbox_telemetry_value', 'gauge', 'Last value read by the telemetry poller').add(
+                    labels, sample.value,
+                )
+
+            if sample.timestamp:
+                family('growbox_telemetry_timestamp_seconds', 'gauge', 'Unix time of the last reading').add(
+                    labels, sample.timestamp,
+                )
+
+        return list(families.values())
+
+    def _collect_growbox(self, family, box: str, growbox):
+        # счётчики читаются без блокировки порта: значение может отстать на одну команду
+        writer = growbox.output
+        labels = {'box': box}
+        family('growbox_coalesced_total', 'counter', 'Reads and writes merged instead of sent').add(
+            labels, writer.count_coalesced,
+        )
+        family('growbox_unfinished_answers', 'gauge', 'Answers not read to ok within the timeout').add(
+            labels, writer.unfinished_answers,
+        )
+        family('growbox_in_flight_reads', 'gauge', 'Reads waiting for an answer').add(
+            labels, len(writer.in_flight_reads),
+        )
+
+        metrics = getattr(writer, 'metrics', None)
+        if metrics is None:
+            return
+
+        with metrics.lock:
+            for code, stats in metrics.commands.items():
+                command_labels = {'box': box, 'command': code}
+                family('growbox_commands_total', 'counter', 'Commands sent').add(command_labels, stats.count)
+                family('growbox_command_timeouts_total', 'counter', 'Answers not completed within the timeout').add(
+                    command_labels, stats.count_timeouts,
+                )
+                family('growbox_command_parse_errors_total', 'counter', 'Answers that could not be parsed').add(
+                    command_labels, stats.count_parse_errors,
+                )
+                family('growbox_command_bytes_out_total', 'counter', 'Bytes sent').add(command_labels, stats.bytes_out)
+                family('growbox_command_bytes_in_total', 'counter', 'Bytes received').add(command_labels, stats.bytes_in)
+                family(
+                    'growbox_command_duration_seconds', 'histogram', 'Time from sending to the end of the answer',
+                ).add_histogram(command_labels, stats.total)
+                first_byte = family(
+                    'growbox_command_first_byte_seconds', 'summary', 'Time from sending to the first answer byte',
+                )
+                first_byte.add(command_labels, stats.first_byte.total, '_sum')
+                first_byte.add(command_labels, stats.first_byte.count, '_count')
+
+    def _collect_fleet(self, family, fleet):
+        snapshot = fleet.last_snapshot
+        if snapshot is None:
+            return
+
+        for box, status in snapshot.boxes.items():
+            labels = {'box': box}
+            family('growbox_up', 'gauge', 'Whether the last fleet poll succeeded').add(labels, int(status.error is None))
+            family('growbox_poll_duration_seconds', 'gauge', 'Duration of the last fleet poll').add(labels, status.latency)
+            for sensor, value in (status.data.get('sensors') or {}).items():
+                family('growbox_sensor_value', 'gauge', 'Sensor value from the last fleet poll').add(
+                    {'box': box, 'sensor': sensor}, value,
+                )
+
+            for actuator, value in (status.data.get('actuators') or {}).items():
+                family('growbox_actuator_value', 'gauge', 'Actuator value from the last fleet poll').add(
+                    {'box': box, 'actuator': actuator}, value,
+                )
+
+    def _collect_queue(self, family, name: str, queue: JobQueue):
+        with queue.lock:
+            for lane, stats in queue.stats.items():
+                labels = {'queue': name, 'lane': lane}
+                family('growbox_queue_depth', 'gauge', 'Jobs waiting in the queue lane').add(labels, stats.depth)
+                family('growbox_queue_jobs_total', 'counter', 'Jobs taken from the queue lane').add(
+                    labels, stats.count_done,
+                )
+                family('growbox_queue_cancelled_total', 'counter', 'Jobs cancelled before start').add(
+                    labels, stats.count_cancelled,
+                )
+                family('growbox_queue_wait_seconds', 'histogram', 'Time jobs waited in the queue lane').add_histogram(
+                    labels, stats.wait_histogram,
+                )
+
+    def render(self) -> str:
+        """Текст метрик; пересчитывается не чаще, чем раз в cache_seconds"""
+        with self.lock:
+            now = self.clock()
+            if self.cached_text is None or now - self.cached_time >= self.cache_seconds:
+                lines = []
+                for metric_family in self.collect():
+                    lines.extend(metric_family.render())
+
+                self.cached_text = '\n'.join(lines) + '\n'
+                self.cached_time = now
+
+            return self.cached_text
+
+    def serve(self, host: str = '127.0.0.1', port: int = 9105, unix_socket: str | None = None):
+        """Запускает сервер метрик в фоновом потоке: на порту или, если указан unix_socket, на Unix-сокете"""
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+
+            server = UnixMetricsServer(unix_socket, MetricsRequestHandler)
+        else:
+            server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+            server.daemon_threads = True
+
+        server.exporter = self
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        self.servers.append(server)
+        return server
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+        self.servers.clear()
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = self.server.exporter.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # у клиента Unix-сокета адреса нет
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixMetricsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from sygrowbox.instrumentation import LatencyHistogram
+
+# Очереди (полосы) заданий: из более важной полосы задания берутся раньше
+LANE_INTERACTIVE = 0  # действия пользователя: запись значения, включение автоматики
+LANE_POLL = 1  # фоновое чтение показаний и настроек
+LANE_BULK = 2  # загрузка файлов, массовое обновление
+LANES = (LANE_INTERACTIVE, LANE_POLL, LANE_BULK)
+
+
+@dataclass()
+class LaneStats:
+    depth: int = 0  # заданий в очереди сейчас
+    count_done: int = 0
+    count_cancelled: int = 0
+    wait_total: float = 0
+    wait_max: float = 0
+    wait_histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def wait_average(self) -> float:
+        return self.wait_total / self.count_done if self.count_done else 0
+
+
+class Job:
+    __slots__ = ('item', 'lane', 'group', 'time_queued', 'is_queued', 'is_cancelled')
+
+    def __init__(self, item, lane: int, group=None):
+        self.item = item
+        self.lane = lane
+        self.group = group
+        self.time_queued = time.monotonic()
+        self.is_queued = True
+        self.is_cancelled = False
+
+
+class JobQueue:
+    """Очередь заданий с полосами приоритета.
+
+    Добавление и извлечение - O(1). Отменённые задания остаются в очереди помеченными и пропускаются при извлечении.
+    """
+    def __init__(self):
+        self.lanes = {lane: deque() for lane in LANES}
+        self.stats = {lane: LaneStats() for lane in LANES}
+        self.lock = threading.Lock()
+
+    def push(self, item, lane: int = LANE_POLL, group=None) -> Job:
+        job = Job(item, lane, group)
+        with self.lock:
+            self.lanes[lane].append(job)
+            self.stats[lane].depth += 1
+
+        return job
+
+    def pop(self) -> Job | None:
+        """Самое старое задание из самой важной непустой полосы"""
+        with self.lock:
+            for lane in LANES:
+                queue = self.lanes[lane]
+                while queue:
+                    job = queue.popleft()
+                    if job.is_cancelled:
+                        continue
+
+                    job.is_queued = False
+                    stats = self.stats[lane]
+                    wait = time.monotonic() - job.time_queued
+                    stats.depth -= 1
+                    stats.count_done += 1
+                    stats.wait_total += wait
+                    stats.wait_max = max(stats.wait_max, wait)
+                    stats.wait_histogram.record(wait)
+                    return job
+
+        return None
+
+    def cancel(self, job: Job) -> bool:
+        with self.lock:
+            return self._cancel(job)
+
+    def _cancel(self, job: Job) -> bool:
+        if not job.is_queued:
+            return False
+
+        job.is_queued = False
+        job.is_cancelled = True
+        self.stats[job.lane].depth -= 1
+        self.stats[job.lane].count_cancelled += 1
+        return True
+
+    def cancel_group(self, group) -> int:
+        """Отменяет ещё не начатые задания группы (например, окна, которое закрыли). Возвращает их количество"""
+        count_cancelled = 0
+        with self.lock:
+            for queue in self.lanes.values():
+                for job in queue:
+                    if job.group is group and self._cancel(job):
+                        count_cancelled += 1
+
+        return count_cancelled
+
+    def is_waiting(self, lane: int) -> bool:
+        """Ждут ли задания в полосе lane: длинное задание менее важной полосы может уступить им место"""
+        with self.lock:
+            return self.stats[lane].depth > 0
+
+    def __len__(self):
+        return sum(stats.depth for stats in self.stats.values())
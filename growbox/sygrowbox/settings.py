@@ -0,0 +1,100 @@
+from typing import NamedTuple
+
+from sygrowbox.gcode_parser import GCodeError, parse_gcode_line
+
+# коды автоматик (BaseAuto.CODE): таблица настроек нужна построителю, поэтому не импортирует его
+AUTO_CYCLE_HARD = 0
+AUTO_CYCLE_SOFT = 1
+AUTO_CLIMATE_CONTROL = 2
+AUTO_TIMER = 3
+
+
+class Setting(NamedTuple):
+    """Настройка гроубокса: команда чтения, команда записи и параметры, которые определяют ячейку настройки"""
+    getter: str
+    setter: str
+    key_letters: str
+    value_letter: str
+    auto_code: int | None = None
+
+    def getter_command(self, params: dict) -> str:
+        return ' '.join([self.getter, *(f'{letter}{params[letter]}' for letter in self.key_letters)])
+
+    def setter_command(self, params: dict, value) -> str:
+        key_parts = [f'{letter}{params[letter]}' for letter in self.key_letters]
+        return ' '.join([self.setter, *key_parts, f'{self.value_letter}{value}'])
+
+
+SETTINGS = (
+    Setting('E91', 'E9', '', 'T'),
+    Setting('E1', 'E0', 'A', 'V'),
+    Setting('E4', 'E3', 'RA', 'B'),
+    Setting('E1011', 'E101', 'AB', 'D', AUTO_CYCLE_HARD),
+    Setting('E1031', 'E103', 'AB', 'V', AUTO_CYCLE_HARD),
+    Setting('E1511', 'E151', 'AP', 'D', AUTO_CYCLE_SOFT),
+    Setting('E1531', 'E153', 'AP', 'V', AUTO_CYCLE_SOFT),
+    Setting('E2011', 'E201', 'A', 'S', AUTO_CLIMATE_CONTROL),
+    Setting('E2021', 'E202', 'A', 'V', AUTO_CLIMATE_CONTROL),
+    Setting('E2031', 'E203', 'A', 'V', AUTO_CLIMATE_CONTROL),
+    # все 12 байт таймера читаются одной командой, а записываются по байту: E251 A B V
+    Setting('E2511', 'E251', 'A', 'V', AUTO_TIMER),
+    Setting('E2521', 'E252', 'AHM', 'B', AUTO_TIMER),
+)
+SETTINGS_BY_GETTER = {setting.getter: setting for setting in SETTINGS}
+SETTINGS_BY_SETTER = {setting.setter: setting for setting in SETTINGS}
+
+
+def normalize_getter_command(command: str) -> str | None:
+    """Приводит команду чтения настройки к виду, в котором её формирует GrowboxGCodeBuilder.
+
+    Для команд, не читающих настройки (датчики, время, текущий период), возвращает None.
+    """
+    g = parse_gcode_line(command)
+    setting = SETTINGS_BY_GETTER.get(g.command)
+    if setting is None or any(letter not in g for letter in setting.key_letters):
+        return None
+
+    return setting.getter_command(g.params)
+
+
+def write_target(command: str) -> str | None:
+    """Ячейка, которую меняет команда записи (`E103 A2 B1`), или None, если команда ничего не записывает.
+
+    Из нескольких записей в одну ячейку подряд достаточно отправить последнюю.
+    """
+    try:
+        g = parse_gcode_line(command)
+    except GCodeError:
+        return None
+
+    if g.command == 'E8':
+        return g.command
+
+    setting = SETTINGS_BY_SETTER.get(g.command)
+    if setting is None:
+        return None
+
+    # E251 пишет один байт таймера из двенадцати
+    key_letters = 'AB' if g.command == 'E251' else setting.key_letters
+    if any(letter not in g for letter in key_letters):
+        return None
+
+    return ' '.join([g.command, *(f'{letter}{g[letter]}' for letter in key_letters)])
+
+
+def written_getter(command: str) -> str | None:
+    """Команда чтения настройки (`E1031 A2 B1`), значение которой меняет команда записи (`E103 A2 B1 V5`).
+
+    None - команда меняет несколько настроек (E3 без параметров, E251 и E252 - байты и флаги таймера)
+    или неизвестно какие.
+    """
+    try:
+        g = parse_gcode_line(command)
+    except GCodeError:
+        return None
+
+    setting = SETTINGS_BY_SETTER.get(g.command)
+    if setting is None or g.command in ('E251', 'E252') or any(letter not in g for letter in setting.key_letters):
+        return None
+
+    return setting.getter_command(g.params)
@@ -0,0 +1,119 @@
+import asyncio
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from sygrowbox.fleet import telemetry_or_none
+from sygrowbox.gcode_builder import AutoClimateControl, AutoCycleHard, AutoCycleSoft, AutoTimer, GrowboxGCodeBuilder
+from sygrowbox.gcode_parser import parse_gcode_line
+from sygrowbox.sync import request_settings, settings_from_futures
+
+
+@dataclass(frozen=True)
+class GrowboxSnapshot:
+    """Неизменяемый снимок гроубокса.
+
+    settings - настройки в виде `{команда чтения: значение}`, как у read_settings,
+    currents - текущие периоды циклических автоматик `{(код автоматики, устройство): (период, минуты)}`.
+    """
+    settings: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    time: tuple[int, int] | None = None
+    sensors: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    currents: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    def __post_init__(self):
+        for name in ('settings', 'sensors', 'currents'):
+            value = getattr(self, name)
+            if not isinstance(value, MappingProxyType):
+                object.__setattr__(self, name, MappingProxyType(dict(value)))
+
+    def get(self, command: str, default=None):
+        return self.settings.get(command, default)
+
+    @property
+    def time_source(self) -> int | None:
+        return self.settings.get('E91')
+
+    def actuator_value(self, actuator) -> int | None:
+        return self.settings.get(f'E1 A{actuator}')
+
+    def is_turn(self, auto_code, actuator) -> bool:
+        return bool(self.settings.get(f'E4 R{auto_code} A{actuator}'))
+
+    def to_buff(self) -> dict:
+        """Словарь в формате BuffEmulator.buff, например, для сохранения в JSON"""
+        auto_codes = (AutoCycleHard.CODE, AutoCycleSoft.CODE, AutoClimateControl.CODE, AutoTimer.CODE)
+        buff = {str(auto_code): {} for auto_code in auto_codes}
+        buff['time'] = {}
+        if self.time is not None:
+            buff['time']['time'] = self.time
+
+        for command, value in self.settings.items():
+            g = parse_gcode_line(command)
+            if g.command == 'E91':
+                buff['time']['source'] = value
+            elif g.command == 'E1':
+                buff.setdefault('actuators', {}).setdefault(str(g['A']), {})['value'] = value
+            elif g.command == 'E4':
+                buff.setdefault(str(g['R']), {}).setdefault(str(g['A']), {})['turn'] = value
+            elif g.command in ('E1011', 'E1031', 'E1511', 'E1531'):
+                auto_code = AutoCycleHard.CODE if g.command in ('E1011', 'E1031') else AutoCycleSoft.CODE
+                period = g['B'] if auto_code == AutoCycleHard.CODE else g['P']
+                name = 'duration' if g.command in ('E1011', 'E1511') else 'value'
+                actuator_buff = buff[str(auto_code)].setdefault(str(g['A']), {})
+                actuator_buff.setdefault(str(period), {})[name] = str(value)
+            elif g.command == 'E2011':
+                buff[str(AutoClimateControl.CODE)].setdefault(str(g['A']), {})['sensor'] = value
+            elif g.command in ('E2021', 'E2031'):
+                name = 'min' if g.command == 'E2021' else 'max'
+                buff[str(AutoClimateControl.CODE)].setdefault(str(g['A']), {})[name] = str(value)
+            elif g.command == 'E2511':
+                buff[str(AutoTimer.CODE)].setdefault(str(g['A']), {})['bytes'] = list(value)
+
+        return buff
+
+
+def request_snapshot(growbox: GrowboxGCodeBuilder) -> dict:
+    """Запрашивает все настройки и показания гроубокса; возвращает то, что вернули методы построителя"""
+    return {
+        'settings': request_settings(growbox),
+        'time': growbox.get_time(),
+        'sensors': {code: sensor.get() for code, sensor in growbox.sensors.items()},
+        'currents': {
+            (auto.CODE, actuator): auto.get_current(actuator)
+            for auto in (growbox.cycle_hard, growbox.cycle_soft)
+            for actuator in growbox.actuators
+        },
+    }
+
+
+def snapshot_from_futures(futures: dict) -> GrowboxSnapshot:
+    return GrowboxSnapshot(
+        settings=settings_from_futures(futures['settings']),
+        time=telemetry_or_none(futures['time']),
+        sensors={code: telemetry_or_none(future) for code, future in futures['sensors'].items()},
+        currents={key: telemetry_or_none(future) for key, future in futures['currents'].items()},
+    )
+
+
+def read_snapshot(growbox: GrowboxGCodeBuilder) -> GrowboxSnapshot:
+    """Читает все настройки и показания гроубокса за один пакет"""
+    with growbox.batch():
+        futures = request_snapshot(growbox)
+
+    return snapshot_from_futures(futures)
+
+
+async def read_snapshot_async(growbox) -> GrowboxSnapshot:
+    """read_snapshot для AsyncGrowboxGCodeBuilder. Пакетов у AsyncWriterInterface нет: команды уходят по очереди"""
+    coroutines = request_snapshot(growbox)
+    futures = {
+        'settings': {command: asyncio.ensure_future(coroutine) for command, coroutine in coroutines['settings'].items()},
+        'time': asyncio.ensure_future(coroutines['time']),
+        'sensors': {code: asyncio.ensure_future(coroutine) for code, coroutine in coroutines['sensors'].items()},
+        'currents': {key: asyncio.ensure_future(coroutine) for key, coroutine in coroutines['currents'].items()},
+    }
+    await asyncio.gather(
+        *futures['settings'].values(), futures['time'], *futures['sensors'].values(), *futures['currents'].values(),
+        return_exceptions=True,
+    )
+    return snapshot_from_futures(futures)
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from sygrowbox.gcode_builder import AutoTimer
+from sygrowbox.gcode_parser import parse_gcode_line
+from sygrowbox.settings import SETTINGS_BY_SETTER, normalize_getter_command
+
+
+class StateMirror:
+    """Копия настроек гроубокса на стороне клиента.
+
+    Ключ - команда чтения настройки в том виде, в котором её формирует GrowboxGCodeBuilder (`E1031 A2 B1`),
+    значение - разобранный ответ на неё. Команды записи сразу обновляют копию (write-through).
+    Показания датчиков, время и текущий период автоматик не кэшируются.
+    Запись старше ttl секунд считается устаревшей и снова читается из гроубокса.
+    """
+    def __init__(self, ttl: float | None = None):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _is_fresh(self, entry, now) -> bool:
+        return self.ttl is None or now - entry[1] < self.ttl
+
+    def _put(self, key, answer_lines):
+        self.entries[key] = (tuple(answer_lines), time.monotonic())
+
+    def get(self, command: str) -> list | None:
+        key = normalize_getter_command(command)
+        if key is None:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+        if entry is None or not self._is_fresh(entry, time.monotonic()):
+            return None
+
+        return list(entry[0])
+
+    def put(self, command: str, answer_lines: list):
+        key = normalize_getter_command(command)
+        if key is None or not answer_lines:
+            return
+
+        with self.lock:
+            self._put(key, answer_lines)
+
+    def _set_timer_flag(self, actuator, hour_index: int, minute_index: int, value: bool):
+        self._put(f'E2521 A{actuator} H{hour_index} M{minute_index}', [('B', float(value))])
+        entry = self.entries.get(f'E2511 A{actuator}')
+        if entry is None:
+            return
+
+        index_bit = AutoTimer.PARTS_PER_HOUR * hour_index + minute_index
+        index_byte = index_bit // 8
+        mask = 1 << (7 - index_bit % 8)
+        bytes_lines = list(entry[0])
+        byte_value = int(bytes_lines[index_byte][1])
+        byte_value = byte_value | mask if value else byte_value & ~mask
+        bytes_lines[index_byte] = ('V', float(byte_value))
+        self.entries[f'E2511 A{actuator}'] = (tuple(bytes_lines), entry[1])
+
+    def apply_write(self, command: str):
+        """Обновляет копию по отправленной в гроубокс команде записи"""
+        g = parse_gcode_line(command)
+        with self.lock:
+            if g.command == 'E3':
+                if 'R' in g and 'A' in g and 'B' in g:
+                    self._put(f'E4 R{g["R"]} A{g["A"]}', [('B', float(bool(g['B'])))])
+                else:
+                    for key in [key for key in self.entries if key.startswith('E4 ')]:
+                        self._put(key, [('B', 0.0)])
+            elif g.command == 'E251':
+                key = f'E2511 A{g["A"]}'
+                entry = self.entries.get(key)
+                if entry is not None:
+                    bytes_lines = list(entry[0])
+                    bytes_lines[g['B']] = ('V', float(g['V']))
+                    self.entries[key] = (tuple(bytes_lines), entry[1])
+
+                prefix = f'E2521 A{g["A"]} '
+                for key in [key for key in self.entries if key.startswith(prefix)]:
+                    del self.entries[key]
+            elif g.command == 'E252':
+                minute_indexes = [g['M']] if 'M' in g else range(AutoTimer.PARTS_PER_HOUR)
+                for minute_index in minute_indexes:
+                    self._set_timer_flag(g['A'], g['H'], minute_index, bool(g['B']))
+            else:
+                setting = SETTINGS_BY_SETTER.get(g.command)
+                if setting is not None and setting.value_letter in g:
+                    self._put(setting.getter_command(g.params), [(setting.value_letter, float(g[setting.value_letter]))])
+
+    def commands(self, only_stale: bool = True) -> list[str]:
+        now = time.monotonic()
+        with self.lock:
+            return [key for key, entry in self.entries.items() if not only_stale or not self._is_fresh(entry, now)]
+
+    def invalidate(self, command: str | None = None):
+        with self.lock:
+            if command is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(normalize_getter_command(command), None)
@@ -0,0 +1,157 @@
+"""Синхронизация настроек: в гроубокс отправляются только те команды записи, которые что-то меняют.
+
+Состояние - словарь `{команда чтения: значение}`, например `{'E1031 A2 B1': 255, 'E2511 A0': (0, ..., 255)}`.
+Его можно прочитать из гроубокса (`read_settings`) или из GrowboxGCodeBuilder поверх BuffEmulator,
+в который загрузили JSON (`set_buff`) или записали профиль.
+"""
+from sygrowbox.gcode_builder import (
+    AutoCycleSoft,
+    GrowboxGCodeBuilder,
+    answer_to_int,
+    answer_to_ints,
+)
+from sygrowbox.gcode_parser import parse_gcode_line
+from sygrowbox.settings import SETTINGS_BY_GETTER, normalize_getter_command
+
+
+def setting_commands(growbox: GrowboxGCodeBuilder) -> list[str]:
+    """Команды чтения всех настроек гроубокса в том порядке, в котором их нужно записывать"""
+    commands = ['E91']
+    commands.extend(f'E1 A{actuator}' for actuator in growbox.actuators)
+    for actuator in growbox.actuators:
+        for period in growbox.cycle_hard.PERIODS:
+            commands.append(f'E1031 A{actuator} B{period}')
+            commands.append(f'E1011 A{actuator} B{period}')
+
+        for period in growbox.cycle_soft.PERIODS:
+            # значение задаётся только для дня и ночи, на рассвете и закате оно плавно меняется
+            if period in (AutoCycleSoft.DAY, AutoCycleSoft.NIGHT):
+                commands.append(f'E1531 A{actuator} P{period}')
+
+            commands.append(f'E1511 A{actuator} P{period}')
+
+        commands.append(f'E2021 A{actuator}')
+        commands.append(f'E2031 A{actuator}')
+        commands.append(f'E2011 A{actuator}')
+        commands.append(f'E2511 A{actuator}')
+
+    for actuator in growbox.actuators:
+        commands.extend(f'E4 R{auto_code} A{actuator}' for auto_code in growbox.autos)
+
+    return commands
+
+
+def answer_to_bytes(answer_lines) -> tuple[int, ...]:
+    return tuple(answer_to_ints(answer_lines))
+
+
+def request_settings(growbox: GrowboxGCodeBuilder) -> dict:
+    """Добавляет чтение всех настроек в текущий пакет `with growbox.batch()` и возвращает Future по командам"""
+    futures = {}
+    for command in setting_commands(growbox):
+        convert = answer_to_bytes if command.startswith('E2511 ') else answer_to_int
+        futures[command] = growbox.output.write_and_parse(command, convert)
+
+    return futures
+
+
+def settings_from_futures(futures: dict) -> dict:
+    settings = {}
+    for command, future in futures.items():
+        try:
+            settings[command] = future.result()
+        except (IndexError, ValueError, TypeError):
+            # настройка не прочиталась - при синхронизации она будет записана
+            pass
+
+    return settings
+
+
+def read_settings(growbox: GrowboxGCodeBuilder) -> dict:
+    """Читает все настройки гроубокса за один пакет"""
+    with growbox.batch():
+        futures = request_settings(growbox)
+
+    return settings_from_futures(futures)
+
+
+def normalize_settings(settings: dict) -> dict:
+    """Приводит ключи и значения (например, загруженные из JSON) к виду, который возвращает read_settings"""
+    normalized_settings = {}
+    for command, value in settings.items():
+        key = normalize_getter_command(command)
+        if key is not None:
+            normalized_settings[key] = tuple(value) if isinstance(value, (list, tuple)) else int(value)
+
+    return normalized_settings
+
+
+def _owner(command: str):
+    """Автоматика и исполнительное устройство, к которым относится настройка"""
+    g = parse_gcode_line(command)
+    setting = SETTINGS_BY_GETTER[g.command]
+    if setting.auto_code is None:
+        return None
+
+    return setting.auto_code, g['A']
+
+
+def plan_sync(current: dict, desired: dict) -> list[str]:
+    """Минимальный упорядоченный список команд, переводящий гроубокс из current в desired.
+
+    Ключи, которых нет в desired, не меняются. Автоматика, настройки которой меняются, на время записи
+    выключается и затем включается снова.
+    """
+    current = normalize_settings(current)
+    desired = normalize_settings(desired)
+
+    changed = [command for command, value in desired.items() if current.get(command) != value]
+    changed_owners = {_owner(command) for command in changed if not command.startswith('E4 ')}
+
+    turn_commands = [command for command in desired if command.startswith('E4 ')]
+    turn_off_commands = []
+    turn_on_commands = []
+    for command in turn_commands:
+        g = parse_gcode_line(command)
+        owner = (g['R'], g['A'])
+        is_on = bool(current.get(command))
+        must_be_on = bool(desired[command])
+        if is_on and (not must_be_on or owner in changed_owners):
+            turn_off_commands.append(f'E3 R{owner[0]} A{owner[1]} B0')
+            is_on = False
+
+        if must_be_on and not is_on:
+            turn_on_commands.append(f'E3 R{owner[0]} A{owner[1]} B1')
+
+    write_commands = []
+    for command in changed:
+        if command.startswith('E4 '):
+            continue
+
+        g = parse_gcode_line(command)
+        value = desired[command]
+        if g.command == 'E2511':
+            # таймер пишется по байту, меняем только отличающиеся байты
+            current_bytes = current.get(command) or ()
+            for byte_index, byte_value in enumerate(value):
+                if byte_index >= len(current_bytes) or current_bytes[byte_index] != byte_value:
+                    write_commands.append(f'E251 A{g["A"]} B{byte_index} V{byte_value}')
+        else:
+            write_commands.append(SETTINGS_BY_GETTER[g.command].setter_command(g.params, value))
+
+    return turn_off_commands + write_commands + turn_on_commands
+
+
+def sync(growbox: GrowboxGCodeBuilder, desired: dict, dry_run: bool = False, current: dict | None = None) -> list[str]:
+    """Записывает в гроубокс только отличающиеся от desired настройки и возвращает отправленные команды.
+
+    При dry_run=True ничего не записывает, а только возвращает план.
+    """
+    if current is None:
+        current = read_settings(growbox)
+
+    commands = plan_sync(current, desired)
+    if commands and not dry_run:
+        growbox.write_many(commands)
+
+    return commands
@@ -0,0 +1,246 @@
+import math
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from sygrowbox.gcode_builder import GrowboxGCodeBuilder
+
+
+class Sample(NamedTuple):
+    channel: str
+    value: object  # None, если гроубокс не ответил или вернул NAN
+    time: float  # по часам опросчика (TelemetryPoller.clock)
+    error: str | None = None
+    timestamp: float = 0  # время Unix (TelemetryPoller.wall_clock), например, для хранения истории
+
+
+@dataclass()
+class Channel:
+    """Показание, которое опрашивается со своей частотой: датчик или часы гроубокса.
+
+    Пока чтение не удаётся, интервал растёт вдвое до max_interval. Если значение меняется быстрее fast_change
+    единиц в секунду, интервал уменьшается вдвое до min_interval, а когда изменения замедлятся, возвращается к interval.
+    """
+    name: str
+    read: object  # read(growbox) возвращает значение или Future внутри пакета
+    interval: float = 5
+    min_interval: float = 1
+    max_interval: float = 300
+    fast_change: float | None = None
+    current_interval: float = 0
+    next_time: float = 0
+    count_fails: int = 0
+    last_value: object = None
+    last_time: float | None = None
+
+    def __post_init__(self):
+        self.current_interval = self.interval
+
+    def update(self, value, now: float) -> bool:
+        """Учитывает результат чтения и назначает время следующего. Возвращает False для неудачного чтения"""
+        if value is None or isinstance(value, float) and math.isnan(value):
+            self.count_fails += 1
+            # удваивается текущий интервал, а не interval * 2 ** count_fails: степень переполнилась бы за сотни неудач
+            self.current_interval = min(max(self.current_interval, self.interval) * 2, self.max_interval)
+            self.next_time = now + self.current_interval
+            return False
+
+        is_fast = False
+        if self.fast_change is not None and self.last_time is not None and now > self.last_time:
+            rate = abs(value - self.last_value) / (now - self.last_time)
+            is_fast = rate >= self.fast_change
+
+        if is_fast:
+            self.current_interval = max(self.current_interval / 2, self.min_interval)
+        else:
+            self.current_interval = min(self.current_interval * 2, self.interval)
+
+        self.count_fails = 0
+        self.last_value = value
+        self.last_time = now
+        self.next_time = now + self.current_interval
+        return True
+
+
+def default_channels(growbox: GrowboxGCodeBuilder) -> list[Channel]:
+    """Часы раз в минуту и датчики раз в 5 секунд (чаще, если показание меняется больше чем на 0.1 в секунду)"""
+    channels = [Channel('time', lambda growbox: growbox.get_time(), interval=60, min_interval=60)]
+    for code, sensor in growbox.sensors.items():
+        channels.append(Channel(f'sensor_{code}', lambda growbox, sensor=sensor: sensor.get(), fast_change=0.1))
+
+    return channels
+
+
+class TelemetryPoller:
+    """Фоновый опрос показаний гроубокса с переменной частотой.
+
+    Каналы, которым пора, читаются одним пакетом. После каждого опроса опросчик молчит столько, чтобы доля времени,
+    занятого линией, не превышала duty_cycle: остальное время линия свободна для команд пользователя.
+    Показания отдаются подписчикам из отдельного потока через очередь, поэтому медленный подписчик не задерживает
+    опрос. Если подписчики не успевают и очередь заполнена, новые показания отбрасываются (count_dropped).
+
+    Без GUI опрос запускается в своём потоке (`start()`/`stop()`) или в текущем (`run()`); GUI может сам вызывать
+    `poll()` через очередь заданий, а ждать между вызовами `delay()` секунд.
+    """
+    QUEUE_SIZE = 1000
+    STOP = object()  # кладётся в очередь показаний, чтобы завершить поток рассылки
+
+    def __init__(
+            self,
+            growbox: GrowboxGCodeBuilder,
+            channels: list[Channel] | None = None,
+            duty_cycle: float = 0.2,
+            clock=time.monotonic,
+            wall_clock=time.time,
+    ):
+        if not 0 < duty_cycle <= 1:
+            raise ValueError('duty_cycle must be in (0, 1]')
+
+        self.growbox = growbox
+        self.channels = {channel.name: channel for channel in channels or default_channels(growbox)}
+        self.duty_cycle = duty_cycle
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.time_idle_until = 0
+        self.time_started = None
+        self.busy_total = 0
+        self.count_dropped = 0
+        self.subscribers = []
+        self.samples = queue.Queue(self.QUEUE_SIZE)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.dispatcher = None
+
+    def subscribe(self, callback):
+        """callback(sample) вызывается из потока рассылки для каждого показания"""
+        self.subscribers.append(callback)
+        self._start_dispatcher()
+
+    def _start_dispatcher(self):
+        if self.dispatcher is None and self.subscribers:
+            self.dispatcher = threading.Thread(target=self._dispatch, name='telemetry-dispatcher', daemon=True)
+            self.dispatcher.start()
+
+    def _stop_dispatcher(self):
+        """Рассылает показания, уже стоящие в очереди, и завершает поток рассылки"""
+        dispatcher, self.dispatcher = self.dispatcher, None
+        if dispatcher is None:
+            return
+
+        self.samples.put(self.STOP)
+        if dispatcher is not threading.current_thread():
+            dispatcher.join()
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def _dispatch(self):
+        while True:
+            sample = self.samples.get()
+            if sample is self.STOP:
+                return
+
+            for callback in list(self.subscribers):
+                try:
+                    callback(sample)
+                except Exception as error:
+                    print('ERROR in telemetry subscriber:', error)
+
+    def _publish(self, sample: Sample):
+        if not self.subscribers:
+            return
+
+        try:
+            self.samples.put_nowait(sample)
+        except queue.Full:
+            self.count_dropped += 1
+
+    @property
+    def duty(self) -> float:
+        """Доля времени, которое опрос занимал линию с момента первого опроса"""
+        if self.time_started is None:
+            return 0
+
+        elapsed = self.clock() - self.time_started
+        return self.busy_total / elapsed if elapsed > 0 else 1
+
+    def delay(self) -> float:
+        """Секунд до следующего опроса с учётом бюджета duty_cycle"""
+        now = self.clock()
+        next_time = min(channel.next_time for channel in self.channels.values())
+        return max(next_time - now, self.time_idle_until - now, 0)
+
+    def poll(self) -> list[Sample]:
+        """Читает каналы, которым пора, и рассылает показания. Ничего не делает, если бюджет линии исчерпан"""
+        time_start = self.clock()
+        if self.time_started is None:
+            self.time_started = time_start
+
+        if time_start < self.time_idle_until:
+            return []
+
+        due_channels = [channel for channel in self.channels.values() if channel.next_time <= time_start]
+        if not due_channels:
+            return []
+
+        results = {}
+        try:
+            with self.growbox.batch():
+                futures = {channel.name: channel.read(self.growbox) for channel in due_channels}
+
+            for name, future in futures.items():
+                try:
+                    results[name] = (future.result(), None)
+                except (IndexError, ValueError, TypeError) as error:
+                    # датчик или часы не ответили
+                    results[name] = (None, f'{type(error).__name__}: {error}')
+        except Exception as error:
+            # линия недоступна: неудачными считаются все каналы
+            results = {channel.name: (None, f'{type(error).__name__}: {error}') for channel in due_channels}
+
+        now = self.clock()
+        busy = now - time_start
+        self.busy_total += busy
+        self.time_idle_until = now + busy * (1 - self.duty_cycle) / self.duty_cycle
+
+        samples = []
+        timestamp = self.wall_clock()
+        for channel in due_channels:
+            value, error = results[channel.name]
+            if not channel.update(value, now):
+                value = None
+
+            sample = Sample(channel.name, value, now, error, timestamp)
+            samples.append(sample)
+            self._publish(sample)
+
+        return samples
+
+    def run(self, duration: float | None = None):
+        """Опрашивает в текущем потоке, пока не вызван stop() или не прошло duration секунд"""
+        time_end = None if duration is None else self.clock() + duration
+        while not self.stop_event.is_set():
+            self.poll()
+            delay = self.delay()
+            if time_end is not None and self.clock() + delay >= time_end:
+                break
+
+            self.stop_event.wait(delay)
+
+        self.stop_event.clear()
+
+    def start(self):
+        self.stop_event.clear()
+        self._start_dispatcher()
+        self.thread = threading.Thread(target=self.run, name='telemetry', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+            self.thread = None
+
+        self._stop_dispatcher()
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import NamedTuple
+
+from sygrowbox.gcode_builder import GrowboxGCodeBuilder
+from sygrowbox.gcode_parser import AnswerEnd, decode_answer_line
+
+
+class UploadProgress(NamedTuple):
+    offset: int  # байт файла, подтверждённых гроубоксом
+    size: int
+    count_lines: int  # строк, подтверждённых гроубоксом (с начала файла, включая прошлые попытки)
+    count_errors: int = 0
+    is_finished: bool = False
+
+    @property
+    def percent(self) -> float:
+        return 100 * self.offset / self.size if self.size else 100
+
+
+class GCodeUploader:
+    """Отправляет G-код из файла в гроубокс без участия GUI.
+
+    Файл читается построчно, строки уходят конвейером (`WriterInterface.stream`), прогресс считается по смещению
+    в файле. Смещение последней подтверждённой строки сохраняется в файл контрольной точки, поэтому прерванную
+    отправку можно продолжить с того же места. После успешной отправки контрольная точка удаляется.
+    """
+    CHECKPOINT_EVERY_LINES = 100
+    CHUNK_LINES = 32  # строк за раз, если адаптер не ограничивает их число в пути (rx_buffer_size не задан)
+    PROGRESS_INTERVAL = 0.1  # секунд между сообщениями о прогрессе
+
+    def __init__(
+            self,
+            growbox: GrowboxGCodeBuilder,
+            file_path,
+            checkpoint_path=None,
+            callback_progress=None,
+            timeout=None,
+    ):
+        self.growbox = growbox
+        self.file_path = Path(file_path)
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else self.file_path.with_suffix('.checkpoint')
+        self.callback_progress = callback_progress
+        self.timeout = timeout
+        self.stop_event = threading.Event()
+        self.is_file_read = False
+
+    def stop(self):
+        """Прекращает отправку: уже отправленные строки дожидаются подтверждения, остальные не отправляются"""
+        self.stop_event.set()
+
+    def _file_signature(self) -> dict:
+        stat = self.file_path.stat()
+        return {'file': str(self.file_path.resolve()), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load_checkpoint(self) -> tuple[int, int]:
+        """Смещение и число строк, на которых прервалась прошлая отправка этого же файла"""
+        try:
+            with self.checkpoint_path.open() as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except (OSError, ValueError):
+            return 0, 0
+
+        signature = self._file_signature()
+        if any(checkpoint.get(key) != value for key, value in signature.items()):
+            return 0, 0
+
+        return checkpoint['offset'], checkpoint['count_lines']
+
+    def save_checkpoint(self, offset: int, count_lines: int):
+        checkpoint = {**self._file_signature(), 'offset': offset, 'count_lines': count_lines}
+        temp_path = self.checkpoint_path.with_name(f'{self.checkpoint_path.name}.tmp')
+        with temp_path.open('w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+
+        os.replace(temp_path, self.checkpoint_path)
+
+    def remove_checkpoint(self):
+        self.checkpoint_path.unlink(missing_ok=True)
+
+    def _read_lines(self, offset: int, offsets: deque, max_lines: int | None = None, should_pause=None):
+        """Строки файла, начиная со смещения; смещение конца каждой отправленной строки кладётся в offsets.
+
+        Пустые строки и комментарии не отправляются, их байты засчитываются вместе со следующей строкой.
+        Если should_pause() вернул True, чтение прекращается (но хотя бы одна строка отправляется).
+        """
+        self.is_file_read = False
+        count_lines = 0
+        with self.file_path.open('rb') as gcode_file:
+            gcode_file.seek(offset)
+            for raw_line in gcode_file:
+                if self.stop_event.is_set() or count_lines == max_lines:
+                    return
+
+                if count_lines and should_pause is not None and should_pause():
+                    return
+
+                offset += len(raw_line)
+                gcode_line = raw_line.decode('utf-8').strip()
+                if gcode_line and not gcode_line.startswith(';'):
+                    offsets.append(offset)
+                    count_lines += 1
+                    yield gcode_line
+
+        self.is_file_read = True
+
+    def _notify(self, progress: UploadProgress):
+        if self.callback_progress:
+            self.callback_progress(progress)
+
+    def run(self, resume: bool = True, max_lines: int | None = None, should_pause=None) -> UploadProgress:
+        """Отправляет файл или, если задан max_lines, не больше max_lines строк - следующий вызов продолжит с них.
+
+        should_pause проверяется перед каждой строкой: если он вернул True, отправка прерывается так же,
+        как по max_lines, - например, чтобы пропустить вперёд действие пользователя.
+        """
+        offset, count_lines = self.load_checkpoint() if resume else (0, 0)
+        size = self.file_path.stat().st_size
+        count_errors = 0
+        is_finished = False
+        offsets = deque()
+        self.stop_event.clear()
+
+        writer = self.growbox.output
+        lines = self._read_lines(offset, offsets, max_lines, should_pause)
+        if writer.rx_buffer_size:
+            chunks = [lines]
+        else:
+            # без управления потоком stream отправил бы весь файл, не дожидаясь ответов
+            chunks = iter(lambda: list(islice(lines, self.CHUNK_LINES)), [])
+
+        is_answered = True
+        time_last_progress = 0
+        try:
+            for chunk in chunks:
+                results = writer.stream(chunk, self.timeout)
+                try:
+                    for result in results:
+                        if writer.need_wait_answer and not result.is_complete:
+                            # гроубокс не ответил: строка не подтверждена, в следующий раз начнём с неё
+                            is_answered = False
+                            break
+
+                        if result.answer:
+                            answer_end = decode_answer_line(result.answer.rstrip().rsplit(b'\n', 1)[-1])
+                            if isinstance(answer_end, AnswerEnd) and answer_end.is_error:
+                                count_errors += 1
+
+                        offset = offsets.popleft()
+                        count_lines += 1
+                        if count_lines % self.CHECKPOINT_EVERY_LINES == 0:
+                            self.save_checkpoint(offset, count_lines)
+
+                        if time.monotonic() - time_last_progress > self.PROGRESS_INTERVAL:
+                            time_last_progress = time.monotonic()
+                            self._notify(UploadProgress(offset, size, count_lines, count_errors))
+                finally:
+                    results.close()
+
+                if not is_answered:
+                    break
+
+            if is_answered and self.is_file_read:
+                # комментарии в конце файла
+                offset = size
+                is_finished = True
+        finally:
+            if is_finished:
+                self.remove_checkpoint()
+            else:
+                self.save_checkpoint(offset, count_lines)
+
+        progress = UploadProgress(offset, size, count_lines, count_errors, is_finished)
+        self._notify(progress)
+        return progress
@@ -3,6 +3,8 @@ import traceback
 
 from PyQt6.QtCore import QRunnable, pyqtSlot, QObject, pyqtSignal, QThreadPool
 
+from growbox.sygrowbox.scheduler import JobQueue, LANE_INTERACTIVE, LANE_POLL
+
 
 class WorkerSignals(QObject):
     finished = pyqtSignal()
@@ -35,8 +37,13 @@ class Worker(QRunnable):
 
 
 class SerialWorkersManager:
+    """Выполняет задания для гроубокса по одному, беря их из очереди с приоритетами (JobQueue).
+
+    Действия пользователя (LANE_INTERACTIVE) обгоняют фоновый опрос (LANE_POLL) и загрузку файлов (LANE_BULK),
+    поэтому ждут только задания, которое уже выполняется.
+    """
     def __init__(self, print_to_log, callback_write):
-        self.workers = []
+        self.queue = JobQueue()
         self.is_started = False
         self.threadpool = QThreadPool()
         self.print_to_log = print_to_log
@@ -52,15 +59,16 @@ class SerialWorkersManager:
             print('   ', err)
             traceback.print_exc()
 
-        if self.workers:
-            worker = self.workers.pop(0)
-            self.threadpool.start(worker)
-            self.current_worker = worker
+        job = self.queue.pop()
+        if job:
+            self.threadpool.start(job.item)
+            self.current_worker = job.item
         else:
             self.current_worker = None
             self.is_started = False
 
-    def add_and_start_worker(self, result_func, task_func, *args, **kwargs):
+    def add_and_start_worker(self, result_func, task_func, *args, lane=LANE_POLL, group=None, **kwargs):
+        """Ставит задание в очередь полосы lane. По group задания можно отменить, пока они не начались"""
         def safe_task_func(*args, **kwargs):
             try:
                 return task_func(*args, **kwargs)
@@ -74,10 +82,25 @@ class SerialWorkersManager:
         worker.signals.print_to_log.connect(self.print_to_log)
         worker.signals.callback_write.connect(self.callback_write)
         if self.is_started:
-            self.workers.append(worker)
+            self.queue.push(worker, lane, group)
         else:
             self.threadpool.start(worker)
             self.current_worker = worker
             self.is_started = True
 
         return worker
+
+    def send(self, task_func, *args, **kwargs):
+        """Действие пользователя: выполняется раньше всех фоновых заданий"""
+        return self.add_and_start_worker(None, task_func, *args, lane=LANE_INTERACTIVE, **kwargs)
+
+    def cancel_group(self, group) -> int:
+        return self.queue.cancel_group(group)
+
+    def is_interactive_waiting(self) -> bool:
+        """Ждёт ли очереди действие пользователя; вызывается из потока задания"""
+        return self.queue.is_waiting(LANE_INTERACTIVE)
+
+    def stats(self) -> dict:
+        """Глубина очереди и время ожидания заданий по полосам"""
+        return self.queue.stats
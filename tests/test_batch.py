@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / 'growbox')]
+
+from growbox.adapters.buff_emulator import BuffEmulator  # noqa: E402
+from sygrowbox.gcode_builder import GrowboxGCodeBuilder  # noqa: E402
+from sygrowbox.state_mirror import StateMirror  # noqa: E402
+
+
+def set_minute_bits_around_flag(box):
+    # E252 хранит флаг в тех же байтах, что пишет E251
+    box.timer.set_minute_bits(0, 0, 5)
+    box.timer.set_minute_flag(0, 0, 0, True)
+    box.timer.set_minute_bits(0, 0, 7)
+
+
+def test_batch_keeps_order_of_overlapping_writes():
+    box = GrowboxGCodeBuilder(BuffEmulator(), need_wait_answer=True)
+    set_minute_bits_around_flag(box)
+    expected = box.timer.get_minute_bits(0)
+
+    batched_box = GrowboxGCodeBuilder(BuffEmulator(), need_wait_answer=True)
+    with batched_box.batch():
+        set_minute_bits_around_flag(batched_box)
+
+    assert batched_box.timer.get_minute_bits(0) == expected
+    assert expected[0] == 7
+
+
+def test_batch_collapses_consecutive_writes():
+    emulator = BuffEmulator()
+    box = GrowboxGCodeBuilder(emulator, need_wait_answer=True)
+    with box.batch():
+        for value in (1, 2, 3):
+            box.a_humid.set(value)
+
+    assert box.output.count_coalesced == 2
+    assert box.a_humid.get() == 3
+
+
+def test_batch_reads_pending_write_from_growbox():
+    box = GrowboxGCodeBuilder(BuffEmulator(), need_wait_answer=True, mirror=StateMirror())
+    box.a_humid.set(255)
+    with box.batch():
+        box.a_humid.set(5)
+        value = box.a_humid.get()
+        light_value = box.a_white_light.get()
+
+    assert value.result() == 5
+    assert light_value.result() == box.a_white_light.get()
+
+
+def test_mocked_answer_is_used_by_mirrored_read():
+    box = GrowboxGCodeBuilder(BuffEmulator(), need_wait_answer=True, mirror=StateMirror())
+    box.a_humid.set(255)
+    assert box.execute('a_humid.get', {}, b'V:7\r\nok\r\n') == 7
+    assert box.output.mocked_answer is None
+    assert box.a_humid.set(5) == b'ok\r\n'
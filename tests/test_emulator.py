@@ -0,0 +1,64 @@
+import random
+import sys
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / 'growbox')]
+
+from growbox.adapters.buff_emulator import BuffEmulator  # noqa: E402
+
+EXAMPLES_PATH = ROOT_PATH / 'examples'
+# байты и флаги таймера пересекаются (E252 меняет байт, записанный E251), E3 без параметров выключает все автоматики
+OVERLAPPING_LINES = [
+    'E251 A0 B0 V5',
+    'E252 A0 H0 M0 B1',
+    'E3 R3 A0 B1',
+    'E251 A0 B0 V7',
+    'E3',
+    'E252 A0 H0 B1',
+    'E251 A0 B1 V0',
+    'E3 R3 A0 B1',
+    'E252 A0 H0 M0 B0',
+    'E0 A1 V10',
+    'E1 A1',
+    'E0 A1 V20',
+]
+
+
+def write_lines(gcode_lines) -> dict:
+    emulator = BuffEmulator()
+    for gcode_line in gcode_lines:
+        emulator.write(f'{gcode_line}\n'.encode('utf-8'))
+
+    return emulator.buff
+
+
+def load_lines(gcode_lines) -> dict:
+    emulator = BuffEmulator()
+    emulator.load_gcode(gcode_lines)
+    return emulator.buff
+
+
+def test_load_gcode_matches_write_on_example():
+    gcode_lines = (EXAMPLES_PATH / 'default.gcode').read_text().splitlines()
+    assert load_lines(gcode_lines) == write_lines(gcode_lines)
+
+
+def test_load_gcode_matches_write_on_overlapping_commands():
+    assert load_lines(OVERLAPPING_LINES) == write_lines(OVERLAPPING_LINES)
+
+
+def test_load_gcode_matches_write_on_random_sequences():
+    choices = (
+        lambda rng: f'E251 A0 B{rng.randrange(2)} V{rng.randrange(256)}',
+        lambda rng: f'E252 A0 H{rng.randrange(2)} M{rng.randrange(4)} B{rng.randrange(2)}',
+        lambda rng: f'E252 A0 H{rng.randrange(2)} B{rng.randrange(2)}',
+        lambda rng: f'E3 R{rng.randrange(4)} A0 B{rng.randrange(2)}',
+        lambda rng: 'E3',
+        lambda rng: f'E0 A0 V{rng.randrange(256)}',
+        lambda rng: f'E8 H{rng.randrange(24)} M{rng.randrange(60)}',
+    )
+    rng = random.Random(0)
+    for _ in range(500):
+        gcode_lines = [rng.choice(choices)(rng) for _ in range(rng.randrange(1, 20))]
+        assert load_lines(gcode_lines) == write_lines(gcode_lines), gcode_lines
@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / 'growbox')]
+
+from sygrowbox.history import SECONDS_PER_DAY, HistoryStore  # noqa: E402
+
+DAY_START = 1714521600  # 2024-05-01 00:00 UTC
+
+
+def segment_names(store: HistoryStore, box='box1', channel='sensor_0') -> list[str]:
+    return [path.name for path in store.segments(box, channel)]
+
+
+def test_append_rolls_over_to_new_segment_at_midnight(tmp_path):
+    store = HistoryStore(tmp_path)
+    timestamps = DAY_START + SECONDS_PER_DAY + np.arange(-30, 30, 10.0)
+    for index, timestamp in enumerate(timestamps):
+        store.append('box1', 'sensor_0', timestamp, index)
+
+    assert segment_names(store) == ['2024-05-01.bin', '2024-05-02.bin']
+    records = store.query('box1', 'sensor_0')
+    assert records['time'].tolist() == timestamps.tolist()
+    assert records['value'].tolist() == list(range(len(timestamps)))
+    # диапазон на границе суток берёт записи из обоих сегментов
+    records = store.query('box1', 'sensor_0', DAY_START + SECONDS_PER_DAY - 10, DAY_START + SECONDS_PER_DAY + 10)
+    assert records['time'].tolist() == [DAY_START + SECONDS_PER_DAY - 10, DAY_START + SECONDS_PER_DAY]
+
+
+def test_append_many_splits_records_by_day(tmp_path):
+    store = HistoryStore(tmp_path)
+    timestamps = DAY_START + np.arange(0, 3 * SECONDS_PER_DAY, 3600.0)
+    store.append_many('box1', 'sensor_0', timestamps, np.arange(len(timestamps)))
+
+    assert segment_names(store) == ['2024-05-01.bin', '2024-05-02.bin', '2024-05-03.bin']
+    for path in store.segments('box1', 'sensor_0'):
+        assert path.stat().st_size == 24 * 12
+
+    assert store.query('box1', 'sensor_0')['time'].tolist() == timestamps.tolist()
+
+
+def test_reopened_store_continues_history(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append('box1', 'sensor_0', DAY_START, 1)
+    store.append('box1', 'sensor_0', DAY_START + 60, 2)
+    store.close()
+
+    store = HistoryStore(tmp_path)
+    assert store.last_time('box1', 'sensor_0') == DAY_START + 60
+    # сегменты только дописываются: запись старше последней отбрасывается
+    store.append('box1', 'sensor_0', DAY_START + 30, 3)
+    store.append('box1', 'sensor_0', DAY_START + 120, 4)
+    assert store.count_rejected == 1
+    assert store.query('box1', 'sensor_0')['value'].tolist() == [1, 2, 4]
+    assert segment_names(store) == ['2024-05-01.bin']
+
+
+def test_apply_retention_removes_old_segments(tmp_path):
+    store = HistoryStore(tmp_path, retention_days=2)
+    for channel in ('sensor_0', 'sensor_1'):
+        timestamps = DAY_START + np.arange(5) * SECONDS_PER_DAY
+        store.append_many('box1', channel, timestamps, np.arange(5))
+
+    assert store.apply_retention(DAY_START + 4 * SECONDS_PER_DAY + 10) == 4
+    for channel in ('sensor_0', 'sensor_1'):
+        assert segment_names(store, channel=channel) == ['2024-05-03.bin', '2024-05-04.bin', '2024-05-05.bin']
+        assert store.query('box1', channel)['value'].tolist() == [2, 3, 4]
+
+    assert store.apply_retention(DAY_START + 4 * SECONDS_PER_DAY + 10) == 0
+
+
+def test_retention_is_applied_on_day_rollover(tmp_path):
+    store = HistoryStore(tmp_path, retention_days=1)
+    for day in range(4):
+        store.append('box1', 'sensor_0', DAY_START + day * SECONDS_PER_DAY, day)
+
+    assert segment_names(store) == ['2024-05-03.bin', '2024-05-04.bin']
+    assert store.query('box1', 'sensor_0')['value'].tolist() == [2, 3]
+
+
+def test_without_retention_nothing_is_removed(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.append_many('box1', 'sensor_0', DAY_START + np.arange(3) * SECONDS_PER_DAY, np.arange(3))
+    assert store.apply_retention(DAY_START + 100 * SECONDS_PER_DAY) == 0
+    assert len(segment_names(store)) == 3
+
+
+@pytest.mark.parametrize('box, channel', [('..', 'sensor_0'), ('box1', '.'), ('box1', '...'), ('box/1', 'sensor_0')])
+def test_invalid_names_are_rejected(tmp_path, box, channel):
+    store = HistoryStore(tmp_path / 'history')
+    with pytest.raises(ValueError):
+        store.append(box, channel, DAY_START, 1)
+
+    assert not (tmp_path / 'history').exists()
@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / 'growbox')]
+
+from growbox.adapters.buff_emulator import BuffEmulator  # noqa: E402
+from sygrowbox.gcode_builder import GrowboxGCodeBuilder  # noqa: E402
+from sygrowbox.uploader import GCodeUploader  # noqa: E402
+
+COUNT_LINES = 500
+
+
+class RecordingEmulator(BuffEmulator):
+    """Запоминает принятые строки; после max_lines строк перестаёт отвечать, как отключённый гроубокс"""
+    def __init__(self, max_lines=None):
+        super().__init__()
+        self.max_lines = max_lines
+        self.lines = []
+        self.timeout = 0
+
+    def write(self, data: bytes):
+        for gcode_line in data.decode('utf-8').splitlines():
+            if self.max_lines is not None and len(self.lines) >= self.max_lines:
+                return
+
+            self.lines.append(gcode_line)
+            super().write(f'{gcode_line}\n'.encode('utf-8'))
+
+
+def write_gcode_file(path: Path) -> list[str]:
+    gcode_lines = [f'E103 A{index % 3} B1 V{index % 256}' for index in range(COUNT_LINES)]
+    path.write_text('; header\n\n' + ''.join(f'{gcode_line}\n' for gcode_line in gcode_lines) + '; tail\n')
+    return gcode_lines
+
+
+def upload(path: Path, emulator: RecordingEmulator, rx_buffer_size=64):
+    growbox = GrowboxGCodeBuilder(emulator, need_wait_answer=True, rx_buffer_size=rx_buffer_size)
+    return GCodeUploader(growbox, path).run()
+
+
+def test_interrupted_upload_resumes_from_checkpoint(tmp_path):
+    path = tmp_path / 'profile.gcode'
+    gcode_lines = write_gcode_file(path)
+
+    progress = upload(path, RecordingEmulator(max_lines=300))
+    count_confirmed = progress.count_lines
+    assert not progress.is_finished
+    assert 0 < count_confirmed <= 300
+    assert path.with_suffix('.checkpoint').exists()
+
+    emulator = RecordingEmulator()
+    progress = upload(path, emulator)
+    assert progress.is_finished
+    assert progress.count_lines == COUNT_LINES
+    assert progress.offset == path.stat().st_size
+    assert not path.with_suffix('.checkpoint').exists()
+    # продолжение начинается со строки после последней подтверждённой
+    assert emulator.lines == gcode_lines[count_confirmed:]
+
+
+def test_unbuffered_upload_resumes_from_checkpoint(tmp_path):
+    path = tmp_path / 'profile.gcode'
+    gcode_lines = write_gcode_file(path)
+
+    first = RecordingEmulator(max_lines=123)
+    count_confirmed = upload(path, first, rx_buffer_size=None).count_lines
+    second = RecordingEmulator()
+    upload(path, second, rx_buffer_size=None)
+
+    # подтверждённые первым гроубоксом строки не отправляются повторно, неподтверждённые - отправляются
+    assert 0 < count_confirmed <= 123
+    assert first.lines[:count_confirmed] == gcode_lines[:count_confirmed]
+    assert second.lines == gcode_lines[count_confirmed:]
+
+
+def test_checkpoint_of_changed_file_is_ignored(tmp_path):
+    path = tmp_path / 'profile.gcode'
+    write_gcode_file(path)
+    upload(path, RecordingEmulator(max_lines=100))
+
+    with path.open('a') as gcode_file:
+        gcode_file.write('E0 A0 V1\n')
+
+    emulator = RecordingEmulator()
+    progress = upload(path, emulator)
+    assert progress.is_finished
+    assert len(emulator.lines) == COUNT_LINES + 1